@@ -1,5 +1,8 @@
 __all__ = [
     "ax",
+    "batch",
+    "cassette",
+    "tracing",
     "input_control",
     "recorder",
     "player",
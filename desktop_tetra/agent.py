@@ -1,90 +1,383 @@
 from __future__ import annotations
 
+import asyncio
 import json
-import time
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
 
 from .connectors import get_connector
-from .connectors.base import DesktopConnector
+from .connectors.base import DesktopConnector, ScanBudget, expectation_selector, nodes_to_tree
+from .connectors.resolver import ElementResolver
+from .agent_core.fast_path import FastPathPlanner
+from .agent_core.plan_cache import PlanCache, has_salient, plan_key, ui_fingerprint
+from .agent_core.prompt_state import PromptStateBuilder, estimate_tokens
+from .agent_core.step_stream import StepStream
 from .agent_core.wrapper_rules import OPERATING_PRINCIPLES, SYSTEM_PROMPT
+from .cassette import prompt_scope
+from .clock import SYSTEM_CLOCK, Clock
 from .llm import build_provider, LLMProvider
+from .tracing import NOOP_TRACER, NoopTracer, TracedConnector, Tracer
 from .interaction.engine import LiveEngine
+from .interaction.perception import get_nodes
 from .interaction.selector import score_candidates
 
+# Default budget for plan `scan` steps; results are kept in history, so keep them bounded
+SCAN_MAX_NODES = 500
+SCAN_MAX_SECONDS = 5.0
+# Completed steps quoted back to the model when asking for a plan repair
+REPAIR_MAX_DONE = 10
+# Fallback scan used to fingerprint the UI when live perception has no windows or controls; it runs before every plan,
+# so it is kept short and reused until the connector reports a change
+FINGERPRINT_MAX_NODES = 200
+FINGERPRINT_DEPTH = 3
+FINGERPRINT_MAX_SECONDS = 0.25
+# Upper bound on reuse, since change counters only cover watched apps
+FINGERPRINT_REUSE_SECONDS = 2.0
+
+
+def _perceived(nodes: Iterable[Dict[str, Any]], sel: Dict[str, Any]) -> List[Dict[str, Any]]:
+    # Scores reward partial evidence (role alone, OCR source); a titled selector needs a title match
+    out = []
+    for node, _score, reasons in score_candidates(nodes, sel, top_k=3):
+        if sel.get("title") and not (reasons.get("title_exact") or reasons.get("title_contains")):
+            continue
+        if reasons.keys() - {"ocr_bias"}:
+            out.append(node)
+    return out
+
 
 class Agent:
-    def __init__(self, model: str = "gpt-4o-mini", provider: str = "openai", api_key: Optional[str] = None, base_url: Optional[str] = None, os_override: Optional[str] = None) -> None:
+    def __init__(self, model: str = "gpt-4o-mini", provider: str = "openai", api_key: Optional[str] = None, base_url: Optional[str] = None, os_override: Optional[str] = None, plan_cache: Optional[PlanCache] = None, state_mode: str = "full", state_tokens: int = 600, llm_options: Optional[Dict[str, Any]] = None, tracer: Optional[Tracer] = None, fast_path: Optional[FastPathPlanner] = None, clock: Optional[Clock] = None) -> None:
         self.model = model
         self.provider_name = provider
-        self.provider: LLMProvider = build_provider(provider, model=model, api_key=api_key, base_url=base_url)
         self.conn: DesktopConnector = get_connector(os_override=os_override)
+        # Deadlines, timings and sleeps use this; the sim connector supplies its (possibly virtual) clock
+        self.clock: Clock = clock if clock is not None else getattr(self.conn, "clock", SYSTEM_CLOCK)
+        # llm_options: timeout, retries, hedge, hedge_after (see build_provider)
+        self.provider: LLMProvider = build_provider(provider, model=model, api_key=api_key, base_url=base_url, **dict(llm_options or {}, clock=self.clock))
+        self.tracer: Union[Tracer, NoopTracer] = tracer if tracer is not None else NOOP_TRACER
+        if isinstance(self.tracer, Tracer) and self.clock.virtual:
+            self.tracer.clock = self.clock
+        if self.tracer.enabled:
+            # Only wrapped when tracing, so the no-op path keeps direct connector calls
+            self.conn = TracedConnector(self.conn, self.tracer)  # type: ignore[assignment]
+        self.resolver = ElementResolver(self.conn)
+        self._resolved_key: Optional[str] = None
+        # (app, connector change version, scanned at, nodes) from the last fallback scan
+        self._scanned: Optional[Tuple[Optional[str], Optional[int], float, List[Dict[str, Any]]]] = None
+        self.plan_cache = plan_cache if plan_cache is not None else PlanCache()
+        # Rule-based plans for simple goals; None sends every cache miss to the provider
+        self.fast_path = fast_path
+        # (plan, cache key, served from cache) for the most recent plan() call
+        self._last_plan: Optional[Tuple[Dict[str, Any], str, bool]] = None
+        # full: compact state every call; diff: baseline once, then only changes; off: goal only
+        self.state_mode = state_mode
+        self.prompt_state = PromptStateBuilder(max_tokens=state_tokens)
+        self._state_messages: List[str] = []
+        self.prompt_stats: Dict[str, int] = {"llm_calls": 0, "input_tokens_est": 0, "state_tokens_est": 0}
 
-    def plan(self, goal: str, context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    def close(self) -> None:
+        # Releases connector threads and OS event subscriptions (UIA handlers, AX run loop)
+        close = getattr(self.conn, "close", None)
+        if close is not None:
+            close()
+
+    def ui_nodes(self, context: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        nodes = get_nodes()
+        if has_salient(nodes):
+            return nodes
+        # Screen perception alone (OCR text, CV regions) has no windows or controls; add the connector's view
+        return nodes + self._scan_nodes(context)
+
+    def _scan_nodes(self, context: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        app = (context or {}).get("app")
+        version = getattr(getattr(self.conn, "changes", None), "version", None)
+        now = self.clock.time()
+        last = self._scanned
+        if last is not None and last[0] == app and last[1] == version and now - last[2] < FINGERPRINT_REUSE_SECONDS:
+            return last[3]
+        try:
+            budget = ScanBudget(max_nodes=FINGERPRINT_MAX_NODES, max_seconds=FINGERPRINT_MAX_SECONDS)
+            nodes = list(self.conn.iter_semantic_map(app=app, max_depth=FINGERPRINT_DEPTH, budget=budget))
+        except Exception:
+            nodes = []
+        self._scanned = (app, version, now, nodes)
+        return nodes
+
+    def ui_fingerprint(self, context: Optional[Dict[str, Any]] = None, nodes: Optional[List[Dict[str, Any]]] = None) -> str:
+        return ui_fingerprint(nodes if nodes is not None else self.ui_nodes(context), app=(context or {}).get("app"))
+
+    def _state_updates(self, nodes: List[Dict[str, Any]]) -> List[str]:
+        if self.state_mode == "off":
+            return []
+        if self.state_mode == "diff":
+            update = self.prompt_state.diff(nodes)
+            # Rebase once the accumulated diffs cost more than a fresh snapshot would
+            if update is None or estimate_tokens("\n".join(self._state_messages + [update])) > self.prompt_state.max_tokens:
+                self._state_messages = [self.prompt_state.render(nodes)]
+            else:
+                self._state_messages.append(update)
+            return list(self._state_messages)
+        return [self.prompt_state.render(nodes)]
+
+    def reset_prompt_state(self) -> None:
+        self.prompt_state.reset()
+        self._state_messages = []
+
+    def _messages(self, goal: str, context: Optional[Dict[str, Any]], nodes: Optional[List[Dict[str, Any]]] = None, extra: Optional[str] = None) -> Tuple[List[Dict[str, str]], Dict[str, Any]]:
         messages = [
             {"role": "user", "content": OPERATING_PRINCIPLES},
             {"role": "user", "content": f"Goal: {goal}\nOptional context: {json.dumps(context or {}, ensure_ascii=False)}"},
         ]
-        return self.provider.generate_json(system=SYSTEM_PROMPT, messages=messages)
+        if nodes is None:
+            nodes = self.ui_nodes(context)
+        states = self._state_updates(nodes)
+        # Cassettes key on this instead of the state text (see cassette.prompt_key)
+        scope = {"goal": goal.strip(), "context": context or {}, "ui": self.ui_fingerprint(context, nodes=nodes), "extra": " ".join((extra or "").split())}
+        messages.extend({"role": "user", "content": text} for text in states)
+        if extra:
+            messages.append({"role": "user", "content": extra})
+        self.prompt_stats["llm_calls"] += 1
+        self.prompt_stats["state_tokens_est"] += sum(estimate_tokens(t) for t in states)
+        self.prompt_stats["input_tokens_est"] += estimate_tokens(SYSTEM_PROMPT) + sum(estimate_tokens(m["content"]) for m in messages)
+        return messages, scope
+
+    def _cached_plan(self, goal: str, context: Optional[Dict[str, Any]]) -> Tuple[str, Optional[Dict[str, Any]], List[Dict[str, Any]]]:
+        with self.tracer.span("plan.lookup") as span:
+            nodes = self.ui_nodes(context)
+            key = plan_key(goal, context, self.ui_fingerprint(context, nodes=nodes))
+            cached = self.plan_cache.get(key)
+            span.set(nodes=len(nodes), hit=cached is not None)
+        if cached is None and self.fast_path is not None:
+            # Served like a cache hit: no LLM call, and never stored since it is cheap to rebuild
+            with self.tracer.span("plan.fast_path") as span:
+                running = getattr(self.conn, "running_apps", None)
+                if running is not None:
+                    context = dict(context or {}, apps=list((context or {}).get("apps") or []) + list(running()))
+                cached = self.fast_path.plan(goal, nodes, context)
+                span.set(hit=cached is not None)
+        return key, cached, nodes
+
+    def _record_llm(self, name: str, started: float, tokens_before: int, **attrs: Any) -> None:
+        if self.tracer.enabled:
+            self.tracer.record(name, started, self.clock.time(), provider=self.provider_name, model=self.model, input_tokens_est=self.prompt_stats["input_tokens_est"] - tokens_before, **attrs)
+
+    def plan(self, goal: str, context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        key, cached, nodes = self._cached_plan(goal, context)
+        if cached is not None:
+            self._last_plan = (cached, key, True)
+            return cached
+        self.plan_cache.record_llm_call()
+        llm_started, tokens_before = self.clock.time(), self.prompt_stats["input_tokens_est"]
+        messages, scope = self._messages(goal, context, nodes)
+        with prompt_scope(scope):
+            plan = self.provider.generate_json(system=SYSTEM_PROMPT, messages=messages)
+        self._record_llm("llm", llm_started, tokens_before, steps=len(plan.get("steps", [])))
+        self._last_plan = (plan, key, False)
+        return plan
+
+    def _run_steps(
+        self, steps: Iterable[Dict[str, Any]], started: float, success: Optional[Dict[str, Any]] = None, stop_on_failure: bool = False
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], Dict[str, Any]]:
+        # Returns (steps actually run, their results, timing); "stopped" says why a plan was cut short
+        timing: Dict[str, Any] = {"first_action_s": None, "total_s": None, "stopped": None}
+        ran: List[Dict[str, Any]] = []
+        results: List[Dict[str, Any]] = []
+        for step in steps:
+            if timing["first_action_s"] is None:
+                timing["first_action_s"] = round(self.clock.time() - started, 4)
+            ran.append(step)
+            results.append(self.execute_step(step))
+            if stop_on_failure and not results[-1]["ok"]:
+                timing["stopped"] = "failure"
+                break
+            if success and self.is_goal_satisfied(success, timeout_seconds=0.0):
+                timing["stopped"] = "success"
+                break
+        timing["total_s"] = round(self.clock.time() - started, 4)
+        return ran, results, timing
+
+    def plan_and_execute(
+        self, goal: str, context: Optional[Dict[str, Any]] = None, success: Optional[Dict[str, Any]] = None, stop_on_failure: bool = False
+    ) -> Tuple[Dict[str, Any], List[Dict[str, Any]], Dict[str, Any]]:
+        # Streams the plan and runs each step as soon as its JSON object closes
+        started = self.clock.time()
+        key, cached, nodes = self._cached_plan(goal, context)
+        if cached is not None:
+            steps: Iterable[Dict[str, Any]] = cached.get("steps", [])
+            stream = None
+        else:
+            self.plan_cache.record_llm_call()
+            llm_started, tokens_before = self.clock.time(), self.prompt_stats["input_tokens_est"]
+            messages, scope = self._messages(goal, context, nodes)
+            with prompt_scope(scope):
+                stream = self.provider.generate_json_stream(system=SYSTEM_PROMPT, messages=messages)
+            steps = stream
+        try:
+            ran, results, timing = self._run_steps(steps, started, success=success, stop_on_failure=stop_on_failure)
+        finally:
+            if stream is not None:
+                stream.close()
+        if stream is None:
+            plan = cached
+        else:
+            plan = self._streamed_plan(stream, ran, timing)
+            # Streamed generation overlaps step execution, so this span brackets both
+            self._record_llm("llm.stream", llm_started, tokens_before, steps=len(stream.parser.steps), first_action_s=timing["first_action_s"])
+        self._last_plan = (plan, key, stream is None)
+        return plan, results, timing
+
+    def _streamed_plan(self, stream: StepStream, ran: List[Dict[str, Any]], timing: Dict[str, Any]) -> Dict[str, Any]:
+        if not stream.truncated:
+            return stream.plan or {"steps": ran}
+        # Generation was stopped early; only the steps that closed before that are known
+        timing["truncated"] = True
+        return {"steps": list(stream.parser.steps) or ran, "truncated": True}
+
+    def repair_and_execute(
+        self,
+        goal: str,
+        context: Optional[Dict[str, Any]],
+        done: List[Tuple[Dict[str, Any], Dict[str, Any]]],
+        failed: Optional[Tuple[Dict[str, Any], Dict[str, Any]]],
+        remaining: List[Dict[str, Any]],
+        success: Optional[Dict[str, Any]] = None,
+        truncated: bool = False,
+    ) -> Tuple[Dict[str, Any], List[Dict[str, Any]], Dict[str, Any]]:
+        # Asks only for the steps still to run, given what already happened, instead of a fresh plan
+        started = self.clock.time()
+        evidence = self._repair_evidence(done, failed, remaining, truncated=truncated)
+        self.plan_cache.record_llm_call()
+        tokens_before = self.prompt_stats["input_tokens_est"]
+        messages, scope = self._messages(goal, context, extra=evidence)
+        with prompt_scope(scope):
+            stream = self.provider.generate_json_stream(system=SYSTEM_PROMPT, messages=messages)
+        try:
+            ran, results, timing = self._run_steps(stream, started, success=success, stop_on_failure=True)
+        finally:
+            stream.close()
+        repair = self._streamed_plan(stream, ran, timing)
+        self._record_llm("llm.stream", started, tokens_before, steps=len(stream.parser.steps), first_action_s=timing["first_action_s"], repair=True)
+        return repair, results, timing
+
+    def _repair_evidence(
+        self, done: List[Tuple[Dict[str, Any], Dict[str, Any]]], failed: Optional[Tuple[Dict[str, Any], Dict[str, Any]]], remaining: List[Dict[str, Any]], truncated: bool = False
+    ) -> str:
+        def brief(step: Dict[str, Any]) -> str:
+            return f"{step.get('action')} {json.dumps(step.get('params', {}), ensure_ascii=False, separators=(',', ':'))}"
+
+        lines = ["Progress on this goal so far (already executed, do not repeat):"]
+        if len(done) > REPAIR_MAX_DONE:
+            lines.append(f"... {len(done) - REPAIR_MAX_DONE} earlier steps succeeded")
+        lines.extend(f"OK {brief(step)}" for step, _ in done[-REPAIR_MAX_DONE:])
+        if failed is not None:
+            step, result = failed
+            reason = result.get("error") or ("expectation not met: " + json.dumps(step.get("expect"), separators=(",", ":")) if step.get("expect") else "action returned false")
+            lines.append(f"FAILED {brief(step)} -> {reason}")
+        else:
+            lines.append("All planned steps succeeded but the goal is not satisfied yet.")
+        if remaining:
+            lines.append("Not yet run: " + "; ".join(brief(step) for step in remaining[:REPAIR_MAX_DONE]))
+        if truncated:
+            lines.append("The previous plan was cut off at that point; any steps after it were never generated.")
+        lines.append('Reply with {"steps": [...]} containing only the steps to run next.')
+        return "\n".join(lines)
+
+    def record_outcome(self, goal: str, plan: Dict[str, Any], results: List[Dict[str, Any]]) -> None:
+        # Only plans that ran cleanly are replayed; a cached plan that stops working is dropped
+        if self._last_plan is None or self._last_plan[0] is not plan:
+            return
+        _, key, from_cache = self._last_plan
+        self._store_outcome(goal, plan, key, from_cache, results)
+
+    def _store_outcome(self, goal: str, plan: Dict[str, Any], key: str, from_cache: bool, results: List[Dict[str, Any]]) -> None:
+        succeeded = bool(results) and all(r.get("ok") for r in results)
+        if succeeded and not from_cache and not plan.get("truncated"):
+            self.plan_cache.put(key, plan, goal=goal)
+        elif not succeeded and from_cache:
+            self.plan_cache.invalidate(key)
 
     def _find(self, sel: Dict[str, Any], timeout: float = 3.0) -> Any:
-        # Prefer live CRDT perception first; fall back to OS connector
-        snap = LiveEngine.instance().snapshot()
-        scored = score_candidates(snap, sel, top_k=3)
-        if scored:
-            # Return enriched selector node for downstream use; actions still executed via connector
-            return {"node": scored[0][0], "selector": sel}
-        return self.conn.find_element(sel, timeout_seconds=timeout)
+        # Prefer live CRDT perception first, hit-testing the matched node to a native element; fall back to OS connector
+        with self.tracer.span("find") as span:
+            for node in _perceived(LiveEngine.instance().iter_nodes(), sel):
+                el = self.resolver.resolve(node, selector=sel, fallback=False)
+                if el is not None:
+                    self._resolved_key = self.resolver.node_key(node)
+                    span.set(source="perception")
+                    return el
+            span.set(source="connector")
+            return self.conn.find_element(sel, timeout_seconds=timeout)
 
     def _verify(self, expect: Dict[str, Any]) -> bool:
-        return self.conn.wait_for(expect, timeout_seconds=1.5)
+        with self.tracer.span("verify") as span:
+            ok = self.conn.wait_for(expect, timeout_seconds=1.5)
+            span.set(ok=ok)
+            return ok
+
+    def execute_step(self, step: Dict[str, Any]) -> Dict[str, Any]:
+        with self.tracer.span("step", action=step.get("action")) as span:
+            result = self._act(step)
+            expect = step.get("expect", {})
+            if result["ok"] and expect and "tree" not in result:
+                result["ok"] = self._verify(expect)
+            span.set(ok=result["ok"])
+            return result
+
+    def _act(self, step: Dict[str, Any]) -> Dict[str, Any]:
+        self._resolved_key = None
+        if self._scanned is not None and self._scanned[1] is None:
+            # No change counter to tell whether this step changed the UI
+            self._scanned = None
+        action = step.get("action")
+        params = step.get("params", {})
+        ok = False
+        error: Optional[str] = None
+        try:
+            if action == "scan":
+                budget = ScanBudget(
+                    max_nodes=int(params.get("max_nodes", SCAN_MAX_NODES)),
+                    max_bytes=int(params["max_bytes"]) if params.get("max_bytes") else None,
+                    max_seconds=float(params.get("max_seconds", SCAN_MAX_SECONDS)),
+                )
+                nodes = self.conn.iter_semantic_map(app=params.get("app"), max_depth=int(params.get("depth", 4)), budget=budget)
+                tree = nodes_to_tree(nodes)
+                return {"action": action, "ok": True, "tree": tree, "truncated": budget.truncated}
+            if action == "focus_app":
+                ok = self.conn.focus_app(params["app"])  # type: ignore[index]
+            elif action == "press":
+                el = self._find(params)
+                ok = bool(el and self.conn.press(el))
+            elif action == "set_value":
+                el = self._find(params)
+                ok = bool(el and self.conn.set_value(el, params.get("value")))
+            elif action == "menu_select":
+                ok = self.conn.menu_select(path=list(params.get("path", [])), app=params.get("app"))
+            elif action == "scroll_to":
+                ok = self.conn.scroll_to(selector=params)
+            elif action == "wait_for":
+                ok = self.conn.wait_for(expect=params, timeout_seconds=float(params.get("timeout", 3.0)))
+            else:
+                error = f"Unknown action: {action}"
+        except Exception as e:  # noqa: BLE001
+            error = str(e)
+        if not ok and self._resolved_key is not None:
+            # The cached handle may be stale (window closed, element recreated)
+            self.resolver.invalidate(self._resolved_key)
+        return {"action": action, "ok": ok, "error": error}
 
     def execute_steps(self, plan: Dict[str, Any]) -> List[Dict[str, Any]]:
-        results: List[Dict[str, Any]] = []
         steps: List[Dict[str, Any]] = plan.get("steps", [])
-        for step in steps:
-            action = step.get("action")
-            params = step.get("params", {})
-            expect = step.get("expect", {})
-            ok = False
-            error: Optional[str] = None
-            try:
-                if action == "scan":
-                    tree = self.conn.build_semantic_map(app=params.get("app"), max_depth=int(params.get("depth", 4)))
-                    ok = True
-                    results.append({"action": action, "ok": ok, "tree": tree})
-                    continue
-                if action == "focus_app":
-                    ok = self.conn.focus_app(params["app"])  # type: ignore[index]
-                elif action == "press":
-                    el = self._find(params)
-                    ok = bool(el and self.conn.press(el))
-                elif action == "set_value":
-                    el = self._find(params)
-                    ok = bool(el and self.conn.set_value(el, params.get("value")))
-                elif action == "menu_select":
-                    ok = self.conn.menu_select(path=list(params.get("path", [])), app=params.get("app"))
-                elif action == "scroll_to":
-                    ok = self.conn.scroll_to(selector=params)
-                elif action == "wait_for":
-                    ok = self.conn.wait_for(expect=params, timeout_seconds=float(params.get("timeout", 3.0)))
-                else:
-                    error = f"Unknown action: {action}"
-            except Exception as e:  # noqa: BLE001
-                error = str(e)
-            if ok and expect:
-                ok = self._verify(expect)
-            results.append({"action": action, "ok": ok, "error": error})
-        return results
-
-    def is_goal_satisfied(self, success: Optional[Dict[str, Any]]) -> bool:
+        return [self.execute_step(step) for step in steps]
+
+    def is_goal_satisfied(self, success: Optional[Dict[str, Any]], timeout_seconds: float = 0.5) -> bool:
         if not success:
             return False
-        # Try live perception first
-        snap = LiveEngine.instance().snapshot()
-        if score_candidates(snap, success, top_k=1):
-            return True
-        # Fall back to connector wait (quick check)
-        return self.conn.wait_for(success, timeout_seconds=0.5)
+        with self.tracer.span("success_check"):
+            # Try live perception first, with the same evidence _find needs
+            if _perceived(LiveEngine.instance().iter_nodes(), expectation_selector(success)):
+                return True
+            # Fall back to connector wait (quick check)
+            return self.conn.wait_for(success, timeout_seconds=timeout_seconds)
 
     def run_continuous(
         self,
@@ -95,24 +388,162 @@ class Agent:
         max_time_seconds: float = 120.0,
         stagnation_limit: int = 2,
     ) -> Dict[str, Any]:
-        start = time.time()
+        # Cycle 1 plans the whole goal; later cycles only repair the suffix after the first failed step
+        start = self.clock.time()
         cycles = 0
         stagnation = 0
         history: List[Dict[str, Any]] = []
-        while cycles < max_cycles and (time.time() - start) < max_time_seconds:
-            if self.is_goal_satisfied(success):
-                return {"done": True, "cycles": cycles, "history": history}
-            plan = self.plan(goal, context=context)
-            results = self.execute_steps(plan)
-            history.append({"plan": plan, "results": results})
-            ok_count = sum(1 for r in results if r.get("ok"))
-            if ok_count == 0:
-                stagnation += 1
-            else:
+        self.reset_prompt_state()
+        done_steps: List[Tuple[Dict[str, Any], Dict[str, Any]]] = []
+        failed: Optional[Tuple[Dict[str, Any], Dict[str, Any]]] = None
+        remaining: List[Dict[str, Any]] = []
+        truncated = False
+        first: Optional[Tuple[Dict[str, Any], str, bool]] = None
+        satisfied = self.is_goal_satisfied(success)
+        while not satisfied and cycles < max_cycles and (self.clock.time() - start) < max_time_seconds:
+            with self.tracer.span("cycle", cycle=cycles, kind="plan" if first is None else "repair"):
+                if first is None:
+                    plan, results, timing = self.plan_and_execute(goal, context=context, success=success, stop_on_failure=True)
+                    first = self._last_plan
+                    steps = plan.get("steps", [])
+                    entry: Dict[str, Any] = {"plan": plan}
+                else:
+                    plan, results, timing = self.repair_and_execute(goal, context, done_steps, failed, remaining, success=success, truncated=truncated)
+                    steps = plan.get("steps", [])
+                    entry = {"repair": plan}
+            ran = steps[:len(results)]
+            if results:
+                failed = None
+                remaining = steps[len(results):]
+                truncated = bool(timing.get("truncated"))
+            for step, result in zip(ran, results):
+                if result.get("ok"):
+                    done_steps.append((step, result))
+                else:
+                    failed = (step, result)
+            if cycles == 0 and first is not None:
+                # A cached plan that breaks is dropped; a fresh one is stored only if every step it ran succeeded
+                self._store_outcome(goal, {"steps": ran} if timing.get("stopped") == "success" else plan, first[1], first[2], results)
+            history.append(dict(entry, results=results, timing=timing))
+            satisfied = timing.get("stopped") == "success" or self.is_goal_satisfied(success)
+            if any(r.get("ok") for r in results):
                 stagnation = 0
+            else:
+                stagnation += 1
             if stagnation >= stagnation_limit:
                 # Small adaptive delay; could broaden search or refocus app here
-                time.sleep(0.4)
+                with self.tracer.span("sleep"):
+                    self.clock.sleep(0.4)
                 stagnation = 0
             cycles += 1
-        return {"done": self.is_goal_satisfied(success), "cycles": cycles, "history": history}
+        if satisfied and cycles > 1 and first is not None and not first[2]:
+            # Remember the route that actually worked, repairs included
+            self.plan_cache.put(first[1], {"steps": [step for step, _ in done_steps]}, goal=goal)
+        out = {"done": satisfied, "cycles": cycles, "history": history, "plan_cache": self.plan_cache.report(), "prompt": dict(self.prompt_stats)}
+        if self.fast_path is not None:
+            out["fast_path"] = dict(self.fast_path.stats)
+        if self.tracer.enabled:
+            out["trace"] = self.tracer.summary()
+        return out
+
+    async def aplan(self, goal: str, context: Optional[Dict[str, Any]] = None) -> Tuple[Dict[str, Any], str, bool]:
+        # Returns (plan, cache key, from cache) so overlapping cycles do not race on _last_plan
+        key, cached, nodes = await asyncio.to_thread(self._cached_plan, goal, context)
+        if cached is not None:
+            return cached, key, True
+        self.plan_cache.record_llm_call()
+        # Recorded rather than a span: speculative requests interleave with other work on the loop thread
+        llm_started, tokens_before = self.clock.time(), self.prompt_stats["input_tokens_est"]
+        messages, scope = self._messages(goal, context, nodes)
+        with prompt_scope(scope):
+            plan = await self.provider.agenerate_json(system=SYSTEM_PROMPT, messages=messages)
+        self._record_llm("llm", llm_started, tokens_before, steps=len(plan.get("steps", [])))
+        return plan, key, False
+
+    async def arun_continuous(
+        self,
+        goal: str,
+        context: Optional[Dict[str, Any]] = None,
+        success: Optional[Dict[str, Any]] = None,
+        max_cycles: int = 10,
+        max_time_seconds: float = 120.0,
+        stagnation_limit: int = 2,
+    ) -> Dict[str, Any]:
+        # Same loop as run_continuous, but the last step's verification, the success check and the
+        # next (speculative) plan request run concurrently instead of back to back
+        start = self.clock.time()
+        cycles = 0
+        stagnation = 0
+        history: List[Dict[str, Any]] = []
+        speculation = {"requested": 0, "used": 0, "stale": 0, "discarded": 0}
+        self.reset_prompt_state()
+        pending: Optional["asyncio.Task[Tuple[Dict[str, Any], str, bool]]"] = None
+        done = await asyncio.to_thread(self.is_goal_satisfied, success)
+        try:
+            while not done and cycles < max_cycles and (self.clock.time() - start) < max_time_seconds:
+                cycle_started = self.clock.time()
+                speculative: Optional[Tuple[Dict[str, Any], str, bool]] = None
+                if pending is not None:
+                    speculative = await pending
+                    pending = None
+                    # The key embeds the UI fingerprint the plan was made for; a changed UI means a stale plan
+                    current_key = await asyncio.to_thread(lambda: plan_key(goal, context, self.ui_fingerprint(context)))
+                    if speculative[1] == current_key:
+                        speculation["used"] += 1
+                    else:
+                        speculation["stale"] += 1
+                        speculative = None
+                if speculative is not None:
+                    plan, key, from_cache = speculative
+                else:
+                    plan, key, from_cache = await self.aplan(goal, context)
+                steps: List[Dict[str, Any]] = plan.get("steps", [])
+                results: List[Dict[str, Any]] = []
+                for i, step in enumerate(steps):
+                    step_started = self.clock.time()
+                    result = await asyncio.to_thread(self._act, step)
+                    results.append(result)
+                    expect = step.get("expect", {})
+                    if result["ok"] and expect and "tree" not in result and i < len(steps) - 1:
+                        result["ok"] = await asyncio.to_thread(self._verify, expect)
+                    self.tracer.record("step", step_started, self.clock.time(), action=step.get("action"), ok=result["ok"])
+                pending = asyncio.ensure_future(self.aplan(goal, context))
+                speculation["requested"] += 1
+                checks = [asyncio.to_thread(self.is_goal_satisfied, success)]
+                last_expect = steps[-1].get("expect", {}) if steps else {}
+                if results and results[-1]["ok"] and last_expect and "tree" not in results[-1]:
+                    checks.append(asyncio.to_thread(self._verify, last_expect))
+                verdicts = await asyncio.gather(*checks)
+                done = bool(verdicts[0])
+                if done:
+                    pending.cancel()
+                    pending = None
+                    speculation["discarded"] += 1
+                if len(verdicts) > 1:
+                    results[-1]["ok"] = bool(verdicts[1])
+                self._store_outcome(goal, plan, key, from_cache, results)
+                history.append({"plan": plan, "results": results, "timing": {"cycle_s": round(self.clock.time() - cycle_started, 4)}})
+                self.tracer.record("cycle", cycle_started, self.clock.time(), cycle=cycles, kind="plan")
+                if any(r.get("ok") for r in results):
+                    stagnation = 0
+                else:
+                    stagnation += 1
+                if stagnation >= stagnation_limit:
+                    sleep_started = self.clock.time()
+                    if self.clock.virtual:
+                        self.clock.sleep(0.4)
+                    else:
+                        await asyncio.sleep(0.4)
+                    self.tracer.record("sleep", sleep_started, self.clock.time())
+                    stagnation = 0
+                cycles += 1
+        finally:
+            if pending is not None:
+                pending.cancel()
+                speculation["discarded"] += 1
+        out = {"done": done, "cycles": cycles, "history": history, "plan_cache": self.plan_cache.report(), "prompt": dict(self.prompt_stats), "speculation": speculation}
+        if self.fast_path is not None:
+            out["fast_path"] = dict(self.fast_path.stats)
+        if self.tracer.enabled:
+            out["trace"] = self.tracer.summary()
+        return out
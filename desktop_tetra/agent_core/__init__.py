@@ -1,5 +1,9 @@
 __all__ = [
     "agent",
+    "fast_path",
     "llm",
+    "plan_cache",
+    "prompt_state",
+    "step_stream",
     "wrapper_rules",
 ]
@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+import re
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from ..interaction.roles import normalize_role
+
+PRESSABLE_ROLES = {"Button", "MenuItem", "MenuBarItem", "CheckBox", "RadioButton", "Tab", "Link", "PopUpButton", "MenuButton", "Cell", "Row"}
+TEXT_ROLES = {"TextField", "TextArea", "SearchField", "ComboBox", "SecureTextField"}
+ROLE_WORDS = {
+    "button": "Button", "checkbox": "CheckBox", "check box": "CheckBox", "tab": "Tab", "link": "Link",
+    "menu item": "MenuItem", "radio button": "RadioButton", "popup": "PopUpButton", "pop-up": "PopUpButton",
+}
+# Confidence for patterns that do not depend on what is on screen
+MENU_CONFIDENCE = 0.9
+# Focus/wait only score high when the name is known to be an app / on screen; otherwise the provider decides
+FOCUS_CONFIDENCE = 0.85
+WAIT_CONFIDENCE = 0.9
+GUESS_CONFIDENCE = 0.5
+WAIT_TIMEOUT = 3.0
+ARTICLES = {"a", "an", "the", "my", "this", "that", "some", "another", "new"}
+
+_SPLIT = re.compile(r"\s*(?:[,;]\s*)?\b(?:and then|then)\b\s*|\s*;\s*", re.I)
+_MENU_SEP = re.compile(r"\s*(?:>|→|->)\s*")
+_MENU = re.compile(r"^(?:(?:open|choose|select|click|pick|use|go to)\s+)?(?:the\s+)?(?:menu\s+)?(?P<path>.+)$", re.I)
+_APP_SUFFIX = re.compile(r"^(?P<head>.+?)\s+(?:in|from|on)\s+(?:the\s+)?(?P<app>[\w .&-]+?)(?:\s+app)?$", re.I)
+_FOCUS = re.compile(r"^(?:open|launch|start|activate|focus|switch to|bring up)\s+(?:the\s+)?(?P<app>[\w .&-]+?)(?:\s+app(?:lication)?)?$", re.I)
+_PRESS = re.compile(r"^(?:click|press|tap|hit|push|select|choose|check|toggle|open)\s+(?:on\s+)?(?:the\s+)?(?P<target>.+)$", re.I)
+_TYPE = re.compile(r"^(?:type|enter|write|input|fill in)\s+(?P<value>.+?)\s+(?:in|into)\s+(?:the\s+)?(?P<field>.+)$", re.I)
+_SET = re.compile(r"^(?:set|change)\s+(?:the\s+)?(?P<field>.+?)\s+to\s+(?P<value>.+)$", re.I)
+_WAIT = re.compile(r"^wait\s+(?:for|until)\s+(?:the\s+)?(?P<target>.+?)(?:\s+(?:appears|shows|is shown|is visible))?$", re.I)
+_NOT_TITLE = re.compile(r"\d|\b(?:seconds?|secs?|minutes?|mins?|ms|moment|while|bit)\b|\s(?:loads|finishes|completes|is done|changes)$", re.I)
+_FIELD_SUFFIX = re.compile(r"\s+(?:text\s+)?(?:field|box|input)$", re.I)
+
+Steps = List[Dict[str, Any]]
+
+
+def _unquote(text: str) -> str:
+    text = text.strip()
+    # One sentence-ending mark at most; "Save As..." and "Export…" keep their ellipsis
+    if text[-1:] in (".", "!") and not text.endswith(("...", "…")):
+        text = text[:-1].rstrip()
+    if len(text) >= 2 and text[0] == text[-1] and text[0] in "\"'“”‘’":
+        return text[1:-1].strip()
+    return text.strip("\"'“”‘’ ")
+
+
+def _role(node: Dict[str, Any]) -> str:
+    role = normalize_role(visual_role=node.get("role"))
+    return role[2:] if role.startswith("AX") else role
+
+
+def _split_role(target: str) -> Tuple[str, Optional[str]]:
+    lowered = target.lower()
+    for word, role in sorted(ROLE_WORDS.items(), key=lambda kv: -len(kv[0])):
+        if lowered.endswith(" " + word):
+            return target[: -len(word) - 1].strip(), role
+    return target, None
+
+
+def match_node(target: str, nodes: Sequence[Dict[str, Any]], roles: Optional[set] = None) -> Tuple[Optional[Dict[str, Any]], float]:
+    # 1.0 exact title, 0.8 a single title containing it, 0.6 several; 0.0 when nothing on screen fits
+    wanted = _unquote(target).lower()
+    if not wanted:
+        return None, 0.0
+    exact: List[Dict[str, Any]] = []
+    partial: List[Dict[str, Any]] = []
+    for node in nodes:
+        if roles is not None and _role(node) not in roles:
+            continue
+        title = str(node.get("title") or "").strip().lower()
+        if not title:
+            continue
+        if title == wanted:
+            exact.append(node)
+        elif wanted in title:
+            partial.append(node)
+    if exact:
+        return exact[0], 1.0 if len(exact) == 1 else 0.9
+    if partial:
+        return partial[0], 0.8 if len(partial) == 1 else 0.6
+    return None, 0.0
+
+
+def known_apps(nodes: Sequence[Dict[str, Any]], context: Optional[Dict[str, Any]] = None) -> Dict[str, str]:
+    # Lower-cased name -> name for apps that are running, on screen, or current
+    names = list((context or {}).get("apps") or [])
+    if (context or {}).get("app"):
+        names.append(context["app"])  # type: ignore[index]
+    for node in nodes:
+        if node.get("app"):
+            names.append(node["app"])
+        if _role(node) == "Application" and node.get("title"):
+            names.append(node["title"])
+    return {str(n).strip().lower(): str(n).strip() for n in names if str(n).strip()}
+
+
+class FastPathPlanner:
+    # Rule-based planner for one-line goals; emits the model's step schema or None when unsure
+    def __init__(self, min_confidence: float = 0.8) -> None:
+        self.min_confidence = min_confidence
+        self.stats: Dict[str, int] = {"planned": 0, "fallbacks": 0}
+
+    def _menu(self, clause: str, app: Optional[str]) -> Optional[Tuple[Steps, float]]:
+        if not _MENU_SEP.search(clause):
+            return None
+        m = _MENU.match(clause)
+        if not m:
+            return None
+        path = [_unquote(part) for part in _MENU_SEP.split(m.group("path"))]
+        suffix = _APP_SUFFIX.match(path[-1])
+        if suffix:
+            path[-1], app = _unquote(suffix.group("head")), _unquote(suffix.group("app"))
+        if len(path) < 2 or not all(path):
+            return None
+        steps: Steps = []
+        params: Dict[str, Any] = {"path": path}
+        if app:
+            steps.append({"action": "focus_app", "params": {"app": app}})
+            params["app"] = app
+        steps.append({"action": "menu_select", "params": params})
+        return steps, MENU_CONFIDENCE
+
+    def _press(self, clause: str, nodes: Sequence[Dict[str, Any]], app: Optional[str]) -> Optional[Tuple[Steps, float]]:
+        m = _PRESS.match(clause)
+        if not m:
+            return None
+        candidates = [(m.group("target"), None)]
+        suffix = _APP_SUFFIX.match(m.group("target"))
+        if suffix:
+            candidates.append((suffix.group("head"), _unquote(suffix.group("app"))))
+        best: Optional[Tuple[Steps, float]] = None
+        for target, target_app in candidates:
+            target, role = _split_role(_unquote(target))
+            node, score = match_node(target, nodes, {role} if role else PRESSABLE_ROLES)
+            if node is None:
+                continue
+            steps: Steps = []
+            if target_app and target_app != app:
+                steps.append({"action": "focus_app", "params": {"app": target_app}})
+            steps.append({"action": "press", "params": {"role": _role(node), "title": str(node.get("title")), "contains": score < 1.0}})
+            confidence = 0.5 + 0.45 * score
+            if best is None or confidence > best[1]:
+                best = (steps, confidence)
+        return best or ([], 0.0)
+
+    def _set_value(self, clause: str, nodes: Sequence[Dict[str, Any]]) -> Optional[Tuple[Steps, float]]:
+        m = _TYPE.match(clause) or _SET.match(clause)
+        if not m:
+            return None
+        field = _FIELD_SUFFIX.sub("", _unquote(m.group("field")))
+        node, score = match_node(field, nodes, TEXT_ROLES)
+        if node is None:
+            return [], 0.0
+        params = {"role": _role(node), "title": str(node.get("title")), "value": _unquote(m.group("value")), "contains": score < 1.0}
+        return [{"action": "set_value", "params": params}], 0.5 + 0.45 * score
+
+    def _focus(self, clause: str, nodes: Sequence[Dict[str, Any]], apps: Dict[str, str]) -> Optional[Tuple[Steps, float]]:
+        m = _FOCUS.match(clause)
+        if not m:
+            return None
+        app = _unquote(m.group("app"))
+        # "open Settings" may mean a button on screen rather than an application
+        if match_node(app, nodes, PRESSABLE_ROLES)[1] >= 0.9:
+            return None
+        known = apps.get(app.lower())
+        if known is not None:
+            return [{"action": "focus_app", "params": {"app": known}}], FOCUS_CONFIDENCE
+        words = app.split()
+        # "open a new document", "start the timer": not an app name
+        if len(words) != 1 or words[0].lower() in ARTICLES:
+            return None
+        return [{"action": "focus_app", "params": {"app": app}}], GUESS_CONFIDENCE
+
+    def _wait(self, clause: str, nodes: Sequence[Dict[str, Any]]) -> Optional[Tuple[Steps, float]]:
+        m = _WAIT.match(clause)
+        if not m:
+            return None
+        target, role = _split_role(_unquote(m.group("target")))
+        params: Dict[str, Any] = {"title": target, "timeout": WAIT_TIMEOUT}
+        if role:
+            params["role"] = role
+        # "wait for 5 seconds" / "wait until the page loads" are not element titles
+        words = target.lower().split()
+        if role is None and match_node(target, nodes)[1] == 0.0 and (_NOT_TITLE.search(target) or not words or words[0] in ARTICLES or len(words) > 3):
+            return [{"action": "wait_for", "params": params}], GUESS_CONFIDENCE
+        return [{"action": "wait_for", "params": params}], WAIT_CONFIDENCE
+
+    def _clause(self, clause: str, nodes: Sequence[Dict[str, Any]], app: Optional[str], apps: Dict[str, str]) -> Tuple[Steps, float]:
+        parsed = self._menu(clause, app) or self._set_value(clause, nodes) or self._wait(clause, nodes) or self._focus(clause, nodes, apps) or self._press(clause, nodes, app)
+        return parsed if parsed is not None else ([], 0.0)
+
+    def plan(self, goal: str, nodes: Sequence[Dict[str, Any]], context: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        # context: "app" (current app) and "apps" (running app names) make focus goals trustworthy
+        app = (context or {}).get("app")
+        apps = known_apps(nodes, context)
+        clauses = [c for c in _SPLIT.split(goal.strip()) if c and c.strip()]
+        steps: Steps = []
+        confidence = 1.0 if clauses else 0.0
+        for clause in clauses:
+            clause_steps, clause_confidence = self._clause(_unquote(clause), nodes, app, apps)
+            confidence = min(confidence, clause_confidence)
+            if confidence < self.min_confidence:
+                break
+            steps.extend(clause_steps)
+        if not steps or confidence < self.min_confidence:
+            self.stats["fallbacks"] += 1
+            return None
+        self.stats["planned"] += 1
+        return {"steps": steps, "planner": "fast_path", "confidence": round(confidence, 3)}
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional
+
+from ..interaction.roles import normalize_role
+
+# Roles that identify "which screen are we on"; free text (status lines, clocks) is left out on purpose
+SALIENT_ROLES = ("Window", "Sheet", "Dialog", "MenuBar", "Menu", "MenuItem", "Button", "TextField", "CheckBox", "PopUpButton", "Tab", "TabGroup")
+MAX_SALIENT_NODES = 64
+# Screen perception (OCR words, CV regions) has none of those roles; its words are what tells screens apart.
+# Letters only, so clocks and counters do not change the key.
+MAX_TEXT_TOKENS = 96
+_WORD = re.compile(r"[^\W\d_]{3,}")
+
+
+def _role(node: Dict[str, Any]) -> str:
+    role = normalize_role(visual_role=node.get("role"))
+    return role[2:] if role.startswith("AX") else role
+
+
+def has_salient(nodes: Iterable[Dict[str, Any]]) -> bool:
+    return any(_role(node) in SALIENT_ROLES for node in nodes)
+
+
+def ui_fingerprint(nodes: Iterable[Dict[str, Any]], app: Optional[str] = None) -> str:
+    salient = set()
+    windows = set()
+    words = set()
+    for node in nodes:
+        role = _role(node)
+        if node.get("source") == "ocr":
+            words.update(w.lower() for w in _WORD.findall(str(node.get("title") or "")))
+        if role not in SALIENT_ROLES:
+            continue
+        title = str(node.get("title") or "").strip()
+        if role == "Window":
+            windows.add(title)
+        salient.add(f"{role}:{title}")
+    parts = [f"app={app or ''}", "windows=" + "|".join(sorted(windows))] + sorted(salient)[:MAX_SALIENT_NODES]
+    if words:
+        parts.append("text=" + " ".join(sorted(words)[:MAX_TEXT_TOKENS]))
+    return hashlib.sha1("\n".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+def plan_key(goal: str, context: Optional[Dict[str, Any]], fingerprint: str) -> str:
+    raw = json.dumps({"goal": goal.strip(), "context": context or {}, "ui": fingerprint}, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class PlanCache:
+    def __init__(self, path: Optional[str] = None, max_entries: int = 256) -> None:
+        self.path = os.path.expanduser(path) if path else None
+        self.max_entries = max(1, max_entries)
+        self._lock = threading.RLock()
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.stats: Dict[str, int] = {"lookups": 0, "hits": 0, "misses": 0, "stores": 0, "invalidations": 0, "llm_calls": 0, "llm_calls_saved": 0}
+        self._load()
+
+    def _load(self) -> None:
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        entries: List[Dict[str, Any]] = data.get("entries", []) if isinstance(data, dict) else []
+        for entry in entries[-self.max_entries:]:
+            if isinstance(entry, dict) and entry.get("key") and isinstance(entry.get("plan"), dict):
+                self._entries[entry["key"]] = entry
+
+    def _save(self) -> None:
+        if not self.path:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "entries": list(self._entries.values())}, f)
+        os.replace(tmp, self.path)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self.stats["lookups"] += 1
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            entry["hits"] = int(entry.get("hits", 0)) + 1
+            self.stats["hits"] += 1
+            self.stats["llm_calls_saved"] += 1
+            return json.loads(json.dumps(entry["plan"]))
+
+    def put(self, key: str, plan: Dict[str, Any], goal: str = "") -> None:
+        with self._lock:
+            self._entries[key] = {"key": key, "goal": goal, "plan": plan, "hits": 0, "ts": time.time()}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self.stats["stores"] += 1
+            self._save()
+
+    def invalidate(self, key: str) -> None:
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self.stats["invalidations"] += 1
+                self._save()
+
+    def record_llm_call(self) -> None:
+        with self._lock:
+            self.stats["llm_calls"] += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            out: Dict[str, Any] = dict(self.stats)
+            out["hit_rate"] = round(self.stats["hits"] / self.stats["lookups"], 4) if self.stats["lookups"] else 0.0
+            out["entries"] = len(self._entries)
+            return out
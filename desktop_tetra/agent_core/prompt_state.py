@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from ..interaction.roles import normalize_role
+
+# Rough weight per role: things the plan can act on first, then context the model grounds on
+ROLE_SALIENCE = {
+    "Window": 5.0, "Sheet": 5.0, "Dialog": 5.0,
+    "Button": 4.0, "MenuItem": 4.0, "TextField": 4.0, "TextArea": 4.0, "CheckBox": 4.0, "PopUpButton": 4.0, "Tab": 3.5,
+    "MenuBar": 3.0, "Menu": 3.0, "StaticText": 2.0,
+}
+DEFAULT_SALIENCE = 1.0
+MAX_TEXT = 60
+
+StateKey = Tuple[str, str, str]
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English/JSON-ish text; avoids a tokenizer dependency
+    return (len(text) + 3) // 4
+
+
+def _clip(value: Any) -> str:
+    text = " ".join(str(value).split())
+    return text if len(text) <= MAX_TEXT else text[:MAX_TEXT - 1] + "…"
+
+
+def _role(node: Dict[str, Any]) -> str:
+    role = normalize_role(visual_role=node.get("role"))
+    return role[2:] if role.startswith("AX") else role
+
+
+def _entry(node: Dict[str, Any]) -> Tuple[StateKey, str]:
+    role = _role(node)
+    title = _clip(node.get("title") or "")
+    identifier = str(node.get("identifier") or node.get("id") or "")
+    key = (role, title, identifier)
+    flags = []
+    if node.get("value") not in (None, ""):
+        flags.append(f"value={_clip(node['value'])!r}")
+    if node.get("enabled") is False:
+        flags.append("disabled")
+    if node.get("selected"):
+        flags.append("selected")
+    return key, " ".join(flags)
+
+
+def _line(key: StateKey, detail: str, count: int = 1) -> str:
+    role, title, identifier = key
+    parts = [role]
+    if title:
+        parts.append(f'"{title}"')
+    if identifier:
+        parts.append(f"#{identifier}")
+    if detail:
+        parts.append(detail)
+    if count > 1:
+        parts.append(f"x{count}")
+    return " ".join(parts)
+
+
+class PromptStateBuilder:
+    def __init__(self, max_tokens: int = 600) -> None:
+        self.max_tokens = max_tokens
+        self._last: Optional[Dict[StateKey, str]] = None
+
+    def _collect(self, nodes: Iterable[Dict[str, Any]]) -> Tuple[Dict[StateKey, str], Dict[StateKey, int], Dict[StateKey, float]]:
+        state: Dict[StateKey, str] = {}
+        counts: Dict[StateKey, int] = {}
+        scores: Dict[StateKey, float] = {}
+        for order, node in enumerate(nodes):
+            key, detail = _entry(node)
+            if not key[1] and not key[2] and not detail and key[0] not in ROLE_SALIENCE:
+                # Unlabelled layout containers carry no information for the planner
+                continue
+            counts[key] = counts.get(key, 0) + 1
+            if key in state:
+                continue
+            state[key] = detail
+            score = ROLE_SALIENCE.get(key[0], DEFAULT_SALIENCE)
+            score += 0.5 if key[1] else -1.0
+            score -= 0.1 * float(node.get("depth") or 0)
+            # Stable tie-break on document order
+            scores[key] = score - order * 1e-6
+        return state, counts, scores
+
+    def _fit(self, header: str, lines: List[str]) -> str:
+        out = [header]
+        used = estimate_tokens(header)
+        for i, line in enumerate(lines):
+            cost = estimate_tokens(line) + 1
+            if used + cost > self.max_tokens:
+                out.append(f"... {len(lines) - i} more omitted")
+                break
+            out.append(line)
+            used += cost
+        return "\n".join(out)
+
+    def render(self, nodes: Iterable[Dict[str, Any]]) -> str:
+        state, counts, scores = self._collect(nodes)
+        self._last = state
+        ranked = sorted(state, key=lambda k: scores[k], reverse=True)
+        return self._fit(f"UI state ({len(state)} elements, most salient first):", [_line(k, state[k], counts[k]) for k in ranked])
+
+    def diff(self, nodes: Iterable[Dict[str, Any]]) -> Optional[str]:
+        # None when there is no baseline yet; the caller then sends render() instead
+        if self._last is None:
+            return None
+        state, _counts, scores = self._collect(nodes)
+        previous = self._last
+        self._last = state
+        added = sorted((k for k in state if k not in previous), key=lambda k: scores[k], reverse=True)
+        changed = [k for k in state if k in previous and previous[k] != state[k]]
+        removed = [k for k in previous if k not in state]
+        lines = [f"+ {_line(k, state[k])}" for k in added]
+        lines += [f"~ {_line(k, state[k])}" for k in changed]
+        lines += [f"- {_line(k, previous[k])}" for k in removed]
+        if not lines:
+            return "UI changes since last cycle: none"
+        return self._fit(f"UI changes since last cycle ({len(added)} added, {len(changed)} changed, {len(removed)} removed):", lines)
+
+    def reset(self) -> None:
+        self._last = None
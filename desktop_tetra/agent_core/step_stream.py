@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+
+class StepParser:
+    # Incremental scanner for {"steps": [ {...}, {...} ]}: each step object is decoded as soon as it closes
+    def __init__(self) -> None:
+        self.buffer = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_string: Optional[str] = None
+        self._key: Optional[str] = None
+        self._steps_depth: Optional[int] = None
+        self._steps_closed = False
+        self._item_start: Optional[int] = None
+        self.steps: List[Dict[str, Any]] = []
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        self.buffer += chunk
+        out: List[Dict[str, Any]] = []
+        buf = self.buffer
+        for pos in range(self._pos, len(buf)):
+            ch = buf[pos]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    self._last_string = buf[self._string_start + 1:pos]
+                continue
+            if ch == '"':
+                self._in_string = True
+                self._string_start = pos
+            elif ch == ":" and self._depth == 1:
+                self._key = self._last_string
+            elif ch == "," and self._depth == 1:
+                self._key = None
+            elif ch in "{[":
+                self._depth += 1
+                if ch == "[" and self._depth == 2 and self._key == "steps" and self._steps_depth is None:
+                    self._steps_depth = 2
+                elif ch == "{" and not self._steps_closed and self._steps_depth is not None and self._depth == self._steps_depth + 1:
+                    self._item_start = pos
+            elif ch in "}]":
+                if ch == "}" and self._item_start is not None and self._steps_depth is not None and self._depth == self._steps_depth + 1:
+                    try:
+                        step = json.loads(buf[self._item_start:pos + 1])
+                    except ValueError:
+                        step = None
+                    if isinstance(step, dict):
+                        self.steps.append(step)
+                        out.append(step)
+                    self._item_start = None
+                elif ch == "]" and self._steps_depth is not None and self._depth == self._steps_depth:
+                    self._steps_closed = True
+                self._depth -= 1
+        self._pos = len(buf)
+        return out
+
+    def result(self) -> Dict[str, Any]:
+        text = self.buffer.strip()
+        start, end = text.find("{"), text.rfind("}")
+        if start >= 0 and end > start:
+            try:
+                doc = json.loads(text[start:end + 1])
+                if isinstance(doc, dict):
+                    return doc
+            except ValueError:
+                pass
+        # Truncated or malformed tail: keep whatever steps closed cleanly
+        return {"steps": list(self.steps)}
+
+
+class StepStream:
+    # Iterates plan steps as they complete; .plan holds the full document once iteration finishes
+    def __init__(self, chunks: Iterable[str]) -> None:
+        self._chunks = chunks
+        self.parser = StepParser()
+        self.plan: Optional[Dict[str, Any]] = None
+        # Set when close() cut generation short; only the steps in parser.steps were ever seen
+        self.truncated = False
+
+    @classmethod
+    def from_plan(cls, plan: Dict[str, Any]) -> "StepStream":
+        return cls([json.dumps(plan)])
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for chunk in self._chunks:
+            if chunk:
+                yield from self.parser.feed(chunk)
+        self.plan = self.parser.result()
+        # Steps the scanner could not see (e.g. a non-standard wrapper) still get executed
+        for step in (self.plan.get("steps") or [])[len(self.parser.steps):]:
+            if isinstance(step, dict):
+                yield step
+
+    def close(self) -> None:
+        # Stops reading early (e.g. a step failed); closing the chunk generator closes the provider's HTTP stream
+        if self.plan is None:
+            self.truncated = True
+        close = getattr(self._chunks, "close", None)
+        if close is not None:
+            close()
@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import ApplicationServices
+from AppKit import (
+    NSWorkspace,
+    NSWorkspaceDidLaunchApplicationNotification,
+    NSWorkspaceDidTerminateApplicationNotification,
+)
+
+AXElement = Any
+
+
+class AppRegistry:
+    def __init__(self, workspace: Any = None, backend: Any = None, refresh_interval: float = 0.5) -> None:
+        # workspace stands in for NSWorkspace.sharedWorkspace(); tests can pass a fake
+        self.workspace = workspace if workspace is not None else NSWorkspace.sharedWorkspace()
+        self._ax = backend if backend is not None else ApplicationServices
+        self.refresh_interval = refresh_interval
+        self._lock = threading.RLock()
+        self._apps: Dict[int, Any] = {}
+        self._by_bundle: Dict[str, int] = {}
+        self._by_name: Dict[str, int] = {}
+        self._elements: Dict[int, AXElement] = {}
+        self._last_refresh = 0.0
+        self._loaded = False
+        self._observers: List[Any] = []
+        self._terminate_listeners: List[Callable[[int], None]] = []
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0, "refreshes": 0}
+        self._subscribe()
+
+    def _subscribe(self) -> None:
+        try:
+            center = self.workspace.notificationCenter()
+            self._observers.append(center.addObserverForName_object_queue_usingBlock_(
+                NSWorkspaceDidLaunchApplicationNotification, None, None, self._on_launch
+            ))
+            self._observers.append(center.addObserverForName_object_queue_usingBlock_(
+                NSWorkspaceDidTerminateApplicationNotification, None, None, self._on_terminate
+            ))
+        except Exception:
+            self._observers = []
+
+    def _app_from_notification(self, notification: Any) -> Any:
+        try:
+            return notification.userInfo()["NSWorkspaceApplicationKey"]
+        except Exception:
+            return None
+
+    def _on_launch(self, notification: Any) -> None:
+        app = self._app_from_notification(notification)
+        if app is not None:
+            with self._lock:
+                self._add(app)
+
+    def _on_terminate(self, notification: Any) -> None:
+        app = self._app_from_notification(notification)
+        if app is not None:
+            self._remove(int(app.processIdentifier()))
+
+    def add_terminate_listener(self, callback: Callable[[int], None]) -> None:
+        self._terminate_listeners.append(callback)
+
+    def _add(self, app: Any) -> None:
+        pid = int(app.processIdentifier())
+        self._apps[pid] = app
+        bundle = app.bundleIdentifier()
+        name = app.localizedName()
+        if bundle:
+            self._by_bundle[str(bundle)] = pid
+        if name:
+            self._by_name[str(name)] = pid
+
+    def _remove(self, pid: int) -> None:
+        with self._lock:
+            app = self._apps.pop(pid, None)
+            self._elements.pop(pid, None)
+            for index in (self._by_bundle, self._by_name):
+                for key in [k for k, v in index.items() if v == pid]:
+                    del index[key]
+        if app is not None:
+            for callback in list(self._terminate_listeners):
+                try:
+                    callback(pid)
+                except Exception:
+                    continue
+
+    def refresh(self) -> None:
+        apps = list(self.workspace.runningApplications())
+        with self._lock:
+            self._apps.clear()
+            self._by_bundle.clear()
+            self._by_name.clear()
+            for app in apps:
+                self._add(app)
+            alive = set(self._apps)
+            for pid in [p for p in self._elements if p not in alive]:
+                del self._elements[pid]
+            self._last_refresh = time.time()
+            self._loaded = True
+            self.stats["refreshes"] += 1
+
+    def _is_alive(self, pid: int) -> bool:
+        # Workspace notifications need a running main run loop; a signal-0 probe catches missed exits
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except Exception:
+            return True
+        return True
+
+    def _lookup(self, bundle_or_name: str) -> Optional[int]:
+        with self._lock:
+            pid = self._by_bundle.get(bundle_or_name)
+            if pid is None:
+                pid = self._by_name.get(bundle_or_name)
+            return pid
+
+    def find(self, bundle_or_name: str) -> Optional[Any]:
+        if not self._loaded:
+            self.refresh()
+        pid = self._lookup(bundle_or_name)
+        if pid is not None and not self._is_alive(pid):
+            self._remove(pid)
+            pid = None
+        if pid is None and (not self._observers or time.time() - self._last_refresh >= self.refresh_interval):
+            # Launches are normally pushed by notifications; without them, re-list at a bounded rate
+            self.refresh()
+            pid = self._lookup(bundle_or_name)
+        with self._lock:
+            app = self._apps.get(pid) if pid is not None else None
+            self.stats["hits" if app is not None else "misses"] += 1
+            return app
+
+    def names(self) -> List[str]:
+        if not self._loaded:
+            self.refresh()
+        with self._lock:
+            return list(self._by_name)
+
+    def frontmost(self) -> Optional[Any]:
+        return self.workspace.frontmostApplication()
+
+    def ax_element(self, pid: int) -> AXElement:
+        with self._lock:
+            element = self._elements.get(pid)
+            if element is None:
+                element = self._ax.AXUIElementCreateApplication(pid)
+                self._elements[pid] = element
+            return element
+
+    def ax_element_for(self, bundle_or_name: str) -> Optional[AXElement]:
+        app = self.find(bundle_or_name)
+        if app is None:
+            return None
+        return self.ax_element(int(app.processIdentifier()))
+
+    def launch(self, path: str) -> bool:
+        return bool(self.workspace.launchApplication_(path))
@@ -1,83 +1,169 @@
 from __future__ import annotations
 
+import threading
 import time
-from typing import Any, Dict, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, FrozenSet, Iterator, List, Optional, Sequence, Tuple
 
-from AppKit import NSWorkspace
+import ApplicationServices
 from ApplicationServices import (
-    AXIsProcessTrusted,
-    AXUIElementCopyAttributeValue,
-    AXUIElementCopyParameterizedAttributeValue,
-    AXUIElementCopyActionNames,
-    AXUIElementPerformAction,
-    AXUIElementSetAttributeValue,
-    AXUIElementCreateApplication,
-    AXUIElementCreateSystemWide,
     kAXChildrenAttribute,
     kAXFocusedWindowAttribute,
+    kAXMenuBarAttribute,
     kAXParentAttribute,
     kAXRoleAttribute,
     kAXTitleAttribute,
+    kAXValueAXErrorType,
+    kAXValueCGRectType,
 )
 
+from .app_registry import AppRegistry
+from .ax_cache import AXTreeCache
+
 AXElement = Any
 
+# Attributes fetched in a single AXUIElementCopyMultipleAttributeValues round trip.
+MATCH_ATTRIBUTES: Tuple[str, ...] = (kAXRoleAttribute, kAXTitleAttribute, kAXChildrenAttribute)
+NODE_ATTRIBUTES: Tuple[str, ...] = (
+    kAXRoleAttribute,
+    kAXTitleAttribute,
+    "AXIdentifier",
+    "AXValue",
+    "AXEnabled",
+    "AXSelected",
+    "AXFrame",
+    kAXChildrenAttribute,
+)
+
+_MENU_ROLES = frozenset({"AXMenuBarItem", "AXMenu", "AXMenuItem"})
+# Roles whose subtrees can only hold the listed roles; searches for a role outside the set skip them.
+# Text fields/areas are left out: editors and web views put links, buttons and attachments inside them.
+CONTAINABLE_ROLES: Dict[str, FrozenSet[str]] = {
+    "AXStaticText": frozenset(),
+    "AXImage": frozenset(),
+    "AXValueIndicator": frozenset(),
+    "AXProgressIndicator": frozenset(),
+    "AXButton": frozenset({"AXImage", "AXStaticText"}),
+    "AXCheckBox": frozenset({"AXImage", "AXStaticText"}),
+    "AXRadioButton": frozenset({"AXImage", "AXStaticText"}),
+    "AXSlider": frozenset({"AXValueIndicator"}),
+    "AXIncrementor": frozenset({"AXButton"}),
+    "AXScrollBar": frozenset({"AXValueIndicator", "AXButton"}),
+    "AXPopUpButton": _MENU_ROLES,
+    "AXMenuButton": _MENU_ROLES,
+    "AXMenuBar": _MENU_ROLES,
+    "AXMenuBarItem": _MENU_ROLES,
+    "AXMenu": _MENU_ROLES,
+    "AXMenuItem": _MENU_ROLES,
+}
+
+# One step of a recorded path: (child index, role, title)
+PathStep = Tuple[int, Optional[str], Optional[str]]
+MAX_PATH_HINTS = 512
+# A submenu still missing this long after its item was pressed is treated as closed
+MENU_REOPEN_AFTER = 0.5
+# Hit-testing lands on the deepest element; labels inside controls are walked up to the control
+HIT_TEST_ATTRIBUTES: Tuple[str, ...] = (kAXRoleAttribute, kAXTitleAttribute, "AXValue", "AXDescription", kAXParentAttribute)
+_PASSIVE_ROLES = frozenset({"AXStaticText", "AXImage"})
+_PRESSABLE_ROLES = frozenset({
+    "AXButton", "AXMenuItem", "AXMenuBarItem", "AXCheckBox", "AXRadioButton", "AXPopUpButton",
+    "AXCell", "AXRow", "AXLink", "AXTab", "AXDisclosureTriangle", "AXTextField",
+})
+
 
 class AXFinder:
-    def __init__(self) -> None:
-        self.system_wide = AXUIElementCreateSystemWide()
+    def __init__(self, backend: Any = None, max_workers: int = 8, per_app_concurrency: int = 4, cache: Optional[AXTreeCache] = None, registry: Optional[AppRegistry] = None) -> None:
+        # backend exposes the ApplicationServices AX functions; tests can pass a fake
+        self._ax = backend if backend is not None else ApplicationServices
+        self.system_wide = self._ax.AXUIElementCreateSystemWide()
+        self.max_workers = max(1, max_workers)
+        self.per_app_concurrency = max(1, per_app_concurrency)
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+        self._app_slots: Dict[Any, threading.BoundedSemaphore] = {}
+        # Optional notification-driven cache; reads for watched apps are served from memory
+        self.cache = cache
+        self.apps = registry if registry is not None else AppRegistry(backend=self._ax)
+        if cache is not None:
+            self.apps.add_terminate_listener(cache.forget)
+        self._path_hints: Dict[Tuple[Any, ...], List[PathStep]] = {}
+        # Resolved menu items per app, keyed by path prefix
+        self._menu_items: Dict[Any, Dict[Tuple[str, ...], AXElement]] = {}
+
+    def close(self) -> None:
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False)
+                self._pool = None
 
     def is_accessibility_enabled(self) -> bool:
-        return bool(AXIsProcessTrusted())
+        return bool(self._ax.AXIsProcessTrusted())
 
     def get_frontmost_app_bundle_id(self) -> Optional[str]:
-        app = NSWorkspace.sharedWorkspace().frontmostApplication()
+        app = self.apps.frontmost()
         if app is None:
             return None
         return app.bundleIdentifier()
 
     def _get_frontmost_app_ax(self) -> Optional[AXElement]:
-        app = NSWorkspace.sharedWorkspace().frontmostApplication()
+        app = self.apps.frontmost()
         if app is None:
             return None
-        pid = app.processIdentifier()
-        return AXUIElementCreateApplication(pid)
+        return self.apps.ax_element(int(app.processIdentifier()))
 
     def _get_app_by_bundle_or_name(self, bundle_or_name: str) -> Optional[AXElement]:
-        ws = NSWorkspace.sharedWorkspace()
-        for app in ws.runningApplications():
-            if app.bundleIdentifier() == bundle_or_name or app.localizedName() == bundle_or_name:
-                return AXUIElementCreateApplication(app.processIdentifier())
-        return None
+        return self.apps.ax_element_for(bundle_or_name)
 
     def activate_app(self, bundle_or_name: str) -> bool:
-        ws = NSWorkspace.sharedWorkspace()
-        for app in ws.runningApplications():
-            if app.bundleIdentifier() == bundle_or_name or app.localizedName() == bundle_or_name:
-                return app.activateWithOptions(1)
+        app = self.apps.find(bundle_or_name)
+        if app is not None:
+            return bool(app.activateWithOptions_(1))
         if ".app" in bundle_or_name or "/" in bundle_or_name:
-            return bool(ws.launchApplication(bundle_or_name))
+            return self.apps.launch(bundle_or_name)
         return False
 
     def copy_attribute(self, element: AXElement, attribute: str) -> Any:
         try:
-            err, value = AXUIElementCopyAttributeValue(element, attribute, None)
+            err, value = self._ax.AXUIElementCopyAttributeValue(element, attribute, None)
             if err:
                 return None
             return value
         except Exception:
             return None
 
+    def _is_error_value(self, value: Any) -> bool:
+        value_type = getattr(self._ax, "AXValueRef", None)
+        if value_type is None or not isinstance(value, value_type):
+            return False
+        try:
+            return self._ax.AXValueGetType(value) == kAXValueAXErrorType
+        except Exception:
+            return False
+
+    def copy_attributes(self, element: AXElement, attributes: Sequence[str]) -> Dict[str, Any]:
+        # One IPC round trip for all attributes; unsupported ones come back as AXError values
+        names = list(attributes)
+        try:
+            err, values = self._ax.AXUIElementCopyMultipleAttributeValues(element, names, 0, None)
+        except Exception:
+            return {name: self.copy_attribute(element, name) for name in names}
+        if err or values is None:
+            return {name: None for name in names}
+        out: Dict[str, Any] = {}
+        for name, value in zip(names, values):
+            out[name] = None if self._is_error_value(value) else value
+        return out
+
     def set_attribute(self, element: AXElement, attribute: str, value: Any) -> bool:
         try:
-            err = AXUIElementSetAttributeValue(element, attribute, value)
+            err = self._ax.AXUIElementSetAttributeValue(element, attribute, value)
             return not bool(err)
         except Exception:
             return False
 
     def copy_param_attribute(self, element: AXElement, attribute: str, param: Any) -> Any:
         try:
-            err, value = AXUIElementCopyParameterizedAttributeValue(element, attribute, param, None)
+            err, value = self._ax.AXUIElementCopyParameterizedAttributeValue(element, attribute, param, None)
             if err:
                 return None
             return value
@@ -86,7 +172,7 @@ class AXFinder:
 
     def get_actions(self, element: AXElement) -> List[str]:
         try:
-            err, actions = AXUIElementCopyActionNames(element, None)
+            err, actions = self._ax.AXUIElementCopyActionNames(element, None)
             if err or actions is None:
                 return []
             return list(actions)
@@ -95,7 +181,7 @@ class AXFinder:
 
     def perform_action(self, element: AXElement, action: str) -> bool:
         try:
-            err = AXUIElementPerformAction(element, action)
+            err = self._ax.AXUIElementPerformAction(element, action)
             return not bool(err)
         except Exception:
             return False
@@ -127,6 +213,13 @@ class AXFinder:
             )
         if isinstance(frame, (tuple, list)) and len(frame) >= 4:
             return (float(frame[0]), float(frame[1]), float(frame[2]), float(frame[3]))
+        value_type = getattr(self._ax, "AXValueRef", None)
+        if value_type is not None and isinstance(frame, value_type):
+            try:
+                ok, rect = self._ax.AXValueGetValue(frame, kAXValueCGRectType, None)
+                frame = rect if ok else None
+            except Exception:
+                frame = None
         try:
             origin = getattr(frame, "origin", None)
             size = getattr(frame, "size", None)
@@ -136,8 +229,7 @@ class AXFinder:
             pass
         return (0.0, 0.0, 0.0, 0.0)
 
-    def get_element_bounds(self, element: AXElement) -> Tuple[float, float, float, float]:
-        frame = self.copy_attribute(element, "AXFrame")
+    def _resolve_bounds(self, element: AXElement, frame: Any) -> Tuple[float, float, float, float]:
         if frame is None:
             try:
                 frame = self.copy_param_attribute(element, "AXFrameForRange", (0, 1))
@@ -151,9 +243,13 @@ class AXFinder:
             raise RuntimeError("Could not resolve element bounds")
         return x, y, w, h
 
-    def _matches(self, element: AXElement, title: Optional[str], role: Optional[str], contains: bool) -> bool:
+    def get_element_bounds(self, element: AXElement) -> Tuple[float, float, float, float]:
+        return self._resolve_bounds(element, self.copy_attribute(element, "AXFrame"))
+
+    def _matches_attrs(self, attrs: Dict[str, Any], title: Optional[str], role: Optional[str], contains: bool) -> bool:
         if title is not None:
-            actual = (self._get_title(element) or "").strip()
+            raw_title = attrs.get(kAXTitleAttribute)
+            actual = (str(raw_title) if raw_title else "").strip()
             expected = title.strip()
             if contains:
                 if expected not in actual:
@@ -162,79 +258,361 @@ class AXFinder:
                 if actual != expected:
                     return False
         if role is not None:
-            if (self._get_role(element) or "") != role:
+            raw_role = attrs.get(kAXRoleAttribute)
+            if (str(raw_role) if raw_role else "") != role:
                 return False
         return True
 
+    def _matches(self, element: AXElement, title: Optional[str], role: Optional[str], contains: bool) -> bool:
+        attrs = self.copy_attributes(element, (kAXTitleAttribute, kAXRoleAttribute))
+        return self._matches_attrs(attrs, title, role, contains)
+
+    def _app_key(self, root: AXElement) -> Any:
+        try:
+            err, pid = self._ax.AXUIElementGetPid(root, None)
+            if not err:
+                return pid
+        except Exception:
+            pass
+        return id(root)
+
+    def _scan_root(self, app: Optional[str]) -> Tuple[Optional[AXElement], Any]:
+        root = self._get_app_by_bundle_or_name(app) if app else self._get_frontmost_app_ax()
+        if root is None:
+            return None, None
+        key = self._app_key(root)
+        if self.cache is not None:
+            self.cache.watch(key, root)
+        return root, key
+
+    def _read_attributes(self, app_key: Any, element: AXElement, attributes: Sequence[str]) -> Dict[str, Any]:
+        if self.cache is None:
+            return self.copy_attributes(element, attributes)
+        return self.cache.get(app_key, element, attributes, self.copy_attributes)
+
+    def _read_actions(self, app_key: Any, element: AXElement) -> List[str]:
+        if self.cache is None:
+            return self.get_actions(element)
+        return self.cache.get_actions(app_key, element, self.get_actions)
+
+    def _map_level(self, app_key: Any, elements: List[AXElement], fn: Callable[[AXElement], Any]) -> List[Any]:
+        # Fan sibling subtrees out to the shared pool; the per-app semaphore bounds how many
+        # concurrent AX requests a single target process has to serve.
+        def guarded(el: AXElement) -> Any:
+            try:
+                return fn(el)
+            except Exception:
+                return None
+
+        if self.max_workers <= 1 or len(elements) <= 1:
+            return [guarded(el) for el in elements]
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="ax-scan")
+            pool = self._pool
+            slot = self._app_slots.get(app_key)
+            if slot is None:
+                slot = threading.BoundedSemaphore(self.per_app_concurrency)
+                self._app_slots[app_key] = slot
+
+        def run(el: AXElement) -> Any:
+            with slot:
+                return guarded(el)
+
+        return list(pool.map(run, elements))
+
+    def _can_contain(self, attrs: Dict[str, Any], role: Optional[str]) -> bool:
+        raw_role = attrs.get(kAXRoleAttribute)
+        allowed = CONTAINABLE_ROLES.get(str(raw_role) if raw_role else "")
+        # Without a role to look for (title-only search) any subtree might hold the match
+        if allowed is None or role is None:
+            return True
+        return role in allowed
+
+    def _step_attrs(self, attrs: Dict[str, Any]) -> Tuple[Optional[str], Optional[str]]:
+        raw_role = attrs.get(kAXRoleAttribute)
+        raw_title = attrs.get(kAXTitleAttribute)
+        return (str(raw_role) if raw_role else None, str(raw_title) if raw_title else None)
+
+    def _follow_path(self, app_key: Any, root: AXElement, path: List[PathStep]) -> Optional[Tuple[AXElement, Dict[str, Any]]]:
+        # O(depth) re-walk of a recorded path; tolerates siblings shifting or a changed title
+        current = root
+        attrs = self._read_attributes(app_key, root, MATCH_ATTRIBUTES)
+        for index, step_role, step_title in path:
+            children = list(attrs.get(kAXChildrenAttribute) or [])
+            chosen: Optional[Tuple[AXElement, Dict[str, Any]]] = None
+            fallback: Optional[Tuple[AXElement, Dict[str, Any]]] = None
+            if index < len(children):
+                child_attrs = self._read_attributes(app_key, children[index], MATCH_ATTRIBUTES)
+                child_role, child_title = self._step_attrs(child_attrs)
+                if child_role == step_role:
+                    fallback = (children[index], child_attrs)
+                    if child_title == step_title:
+                        chosen = fallback
+            if chosen is None:
+                for i, child in enumerate(children):
+                    if i == index:
+                        continue
+                    child_attrs = self._read_attributes(app_key, child, MATCH_ATTRIBUTES)
+                    if self._step_attrs(child_attrs) == (step_role, step_title):
+                        chosen = (child, child_attrs)
+                        break
+            chosen = chosen or fallback
+            if chosen is None:
+                return None
+            current, attrs = chosen
+        return current, attrs
+
+    def _search(self, app_key: Any, root: AXElement, title: Optional[str], role: Optional[str], contains: bool) -> Optional[Tuple[AXElement, List[PathStep]]]:
+        level: List[Tuple[AXElement, List[PathStep]]] = [(root, [])]
+        visited: set[int] = set()
+        # Breadth-first, level by level so each level's lookups run concurrently; most controls are shallow
+        while level:
+            level = [(el, path) for el, path in level if id(el) not in visited]
+            visited.update(id(el) for el, _ in level)
+            attrs_list = self._map_level(app_key, [el for el, _ in level], lambda el: self._read_attributes(app_key, el, MATCH_ATTRIBUTES))
+            next_level: List[Tuple[AXElement, List[PathStep]]] = []
+            for (el, path), attrs in zip(level, attrs_list):
+                if attrs is None:
+                    continue
+                if path:
+                    path[-1] = (path[-1][0],) + self._step_attrs(attrs)
+                if self._matches_attrs(attrs, title, role, contains=contains):
+                    return el, path
+                if not self._can_contain(attrs, role):
+                    continue
+                children = list(attrs.get(kAXChildrenAttribute) or [])
+                if not children:
+                    continue
+                # Each child's role/title is filled in once the child itself is read
+                next_level.extend((c, path + [(i, None, None)]) for i, c in enumerate(children))
+            level = next_level
+        return None
+
     def find_element(self, title: Optional[str] = None, role: Optional[str] = None, app: Optional[str] = None, timeout_seconds: float = 0.0, contains: bool = False) -> Optional[AXElement]:
         end = time.time() + max(0.0, timeout_seconds)
         while True:
-            root = self._get_app_by_bundle_or_name(app) if app else self._get_frontmost_app_ax()
+            root, key = self._scan_root(app)
             if root is not None:
-                stack = [root]
-                visited: set[int] = set()
-                while stack:
-                    current = stack.pop()
-                    if id(current) in visited:
-                        continue
-                    visited.add(id(current))
-                    try:
-                        if self._matches(current, title, role, contains=contains):
-                            return current
-                        children = self._get_children(current)
-                        stack.extend(children)
-                    except Exception:
-                        continue
+                hint_key = (key, title, role, contains)
+                hint = self._path_hints.get(hint_key)
+                if hint is not None:
+                    hit = self._follow_path(key, root, hint)
+                    if hit is not None and self._matches_attrs(hit[1], title, role, contains=contains):
+                        return hit[0]
+                    self._path_hints.pop(hint_key, None)
+                hits = self.cache.stats["hits"] if self.cache is not None else 0
+                found = self._search(key, root, title, role, contains)
+                if found is None and self.cache is not None and self.cache.stats["hits"] != hits:
+                    # Part of that search was answered from memory, which may have missed a change: rescan from AX
+                    self.cache.invalidate(key, root)
+                    found = self._search(key, root, title, role, contains)
+                if found is not None:
+                    el, path = found
+                    if len(self._path_hints) >= MAX_PATH_HINTS:
+                        self._path_hints.pop(next(iter(self._path_hints)))
+                    self._path_hints[hint_key] = path
+                    return el
             if time.time() >= end:
                 break
             time.sleep(0.05)
         return None
 
+    def _node_from_attrs(self, el: AXElement, attrs: Dict[str, Any], actions: List[str]) -> Dict[str, Any]:
+        title = attrs.get(kAXTitleAttribute)
+        role = attrs.get(kAXRoleAttribute)
+        value = attrs.get("AXValue")
+        enabled = attrs.get("AXEnabled")
+        selected = attrs.get("AXSelected")
+        try:
+            x, y, w, h = self._resolve_bounds(el, attrs.get("AXFrame"))
+        except Exception:
+            x = y = w = h = 0.0
+        return {
+            "role": str(role) if role else None,
+            "title": str(title) if title else None,
+            "identifier": attrs.get("AXIdentifier"),
+            "value": value if isinstance(value, (str, int, float)) else None,
+            "enabled": bool(enabled) if enabled is not None else None,
+            "selected": bool(selected) if selected is not None else None,
+            "actions": actions,
+            "frame": {"x": x, "y": y, "w": w, "h": h},
+        }
+
+    def element_info(self, element: AXElement) -> Dict[str, Any]:
+        # Just what is needed to check a hit-tested element against a selector, in one round trip
+        attrs = self.copy_attributes(element, HIT_TEST_ATTRIBUTES[:-1] + (kAXChildrenAttribute,))
+        title = str(attrs[kAXTitleAttribute]) if attrs.get(kAXTitleAttribute) else None
+        value = attrs.get("AXValue") if isinstance(attrs.get("AXValue"), str) else None
+        description = str(attrs["AXDescription"]) if attrs.get("AXDescription") else None
+        if not (title or value or description):
+            # Untitled controls are named by the label inside them (a button around its text)
+            for child in list(attrs.get(kAXChildrenAttribute) or [])[:4]:
+                child_attrs = self.copy_attributes(child, (kAXRoleAttribute, kAXTitleAttribute, "AXValue"))
+                if str(child_attrs.get(kAXRoleAttribute) or "") in _PASSIVE_ROLES:
+                    title = str(child_attrs.get(kAXTitleAttribute) or child_attrs.get("AXValue") or "") or None
+                    if title:
+                        break
+        return {"role": str(attrs[kAXRoleAttribute]) if attrs.get(kAXRoleAttribute) else None, "title": title, "value": value, "description": description}
+
+    def describe(self, element: AXElement) -> Dict[str, Any]:
+        return self._node_from_attrs(element, self.copy_attributes(element, NODE_ATTRIBUTES), self.get_actions(element))
+
     def build_semantic_map(self, app: Optional[str] = None, max_depth: int = 4) -> Dict[str, Any]:
-        root = self._get_app_by_bundle_or_name(app) if app else self._get_frontmost_app_ax()
+        root, key = self._scan_root(app)
         if root is None:
             return {}
 
-        def to_node(el: AXElement, depth: int) -> Dict[str, Any]:
-            title = self._get_title(el)
-            role = self._get_role(el)
-            identifier = self.copy_attribute(el, "AXIdentifier")
-            value = self.copy_attribute(el, "AXValue")
-            enabled = self.copy_attribute(el, "AXEnabled")
-            selected = self.copy_attribute(el, "AXSelected")
-            actions = self.get_actions(el)
-            try:
-                x, y, w, h = self.get_element_bounds(el)
-            except Exception:
-                x = y = w = h = 0.0
-            node: Dict[str, Any] = {
-                "role": role,
-                "title": title,
-                "identifier": identifier,
-                "value": value if isinstance(value, (str, int, float)) else None,
-                "enabled": bool(enabled) if enabled is not None else None,
-                "selected": bool(selected) if selected is not None else None,
-                "actions": actions,
-                "frame": {"x": x, "y": y, "w": w, "h": h},
-            }
-            if depth <= 0:
-                return node
-            children: List[AXElement] = []
+        def fetch(el: AXElement) -> Tuple[Dict[str, Any], List[AXElement]]:
+            attrs = self._read_attributes(key, el, NODE_ATTRIBUTES)
+            return self._node_from_attrs(el, attrs, self._read_actions(key, el)), list(attrs.get(kAXChildrenAttribute) or [])
+
+        tree: Dict[str, Any] = {}
+        # (element, parent node) pairs; siblings stay in order so the tree matches a sequential DFS
+        level: List[Tuple[AXElement, Optional[Dict[str, Any]]]] = [(root, None)]
+        depth = max_depth
+        while level:
+            fetched = self._map_level(key, [el for el, _ in level], fetch)
+            next_level: List[Tuple[AXElement, Optional[Dict[str, Any]]]] = []
+            for (_, parent), result in zip(level, fetched):
+                if result is None:
+                    continue
+                node, children = result
+                if parent is None:
+                    tree = node
+                else:
+                    parent.setdefault("children", []).append(node)
+                if depth > 0:
+                    next_level.extend((c, node) for c in children)
+            level = next_level
+            depth -= 1
+        return tree
+
+    def iter_semantic_map(self, app: Optional[str] = None, max_depth: int = 4) -> Iterator[Dict[str, Any]]:
+        # Preorder DFS yielding flat nodes; only pending siblings are held, so memory follows depth, not size
+        root, key = self._scan_root(app)
+        if root is None:
+            return
+        stack: List[Tuple[AXElement, Optional[int], int]] = [(root, None, 0)]
+        next_idx = 0
+        while stack:
+            el, parent, depth = stack.pop()
             try:
-                children = self._get_children(el)
+                attrs = self._read_attributes(key, el, NODE_ATTRIBUTES)
+                node = self._node_from_attrs(el, attrs, self._read_actions(key, el))
             except Exception:
-                children = []
-            child_nodes: List[Dict[str, Any]] = []
-            for c in children:
-                try:
-                    child_nodes.append(to_node(c, depth - 1))
-                except Exception:
-                    continue
-            if child_nodes:
-                node["children"] = child_nodes
-            return node
+                continue
+            idx = next_idx
+            next_idx += 1
+            yield {"idx": idx, "parent": parent, "depth": depth, **node}
+            if depth < max_depth:
+                children = list(attrs.get(kAXChildrenAttribute) or [])
+                stack.extend((c, idx, depth + 1) for c in reversed(children))
+
+    def _menu_child(self, container: AXElement, title: str, role: str) -> Optional[AXElement]:
+        # Menus are often populated when opened, so read them directly rather than through the tree cache
+        children = list(self.copy_attributes(container, (kAXChildrenAttribute,)).get(kAXChildrenAttribute) or [])
+        for child in children:
+            child_role, child_title = self._step_attrs(self.copy_attributes(child, (kAXRoleAttribute, kAXTitleAttribute)))
+            if child_role == role and (child_title or "").strip() == title.strip():
+                return child
+        return None
+
+    def _submenu(self, item: AXElement) -> Optional[AXElement]:
+        children = list(self.copy_attributes(item, (kAXChildrenAttribute,)).get(kAXChildrenAttribute) or [])
+        for child in children:
+            if self._step_attrs(self.copy_attributes(child, (kAXRoleAttribute,)))[0] == "AXMenu":
+                return child
+        return None
 
-        return to_node(root, max_depth)
+    def _await_menu_child(self, item: AXElement, title: str, end: float) -> Optional[AXElement]:
+        # Polls the item's open submenu; the item is pressed again only if its menu is gone (never opened or closed)
+        pressed_at = time.time()
+        while True:
+            submenu = self._submenu(item)
+            if submenu is not None:
+                child = self._menu_child(submenu, title, "AXMenuItem")
+                if child is not None:
+                    return child
+            elif time.time() - pressed_at >= MENU_REOPEN_AFTER:
+                if not self.press(item):
+                    return None
+                pressed_at = time.time()
+            if time.time() >= end:
+                return None
+            time.sleep(0.05)
+
+    def _select_menu_once(self, app_key: Any, root: AXElement, path: List[str], end: float) -> Optional[bool]:
+        # None means a cached item went stale and the walk should be retried from scratch
+        items = self._menu_items.setdefault(app_key, {})
+        item: Optional[AXElement] = None
+        for index, title in enumerate(path):
+            prefix = tuple(path[: index + 1])
+            cached = prefix in items
+            if cached:
+                next_item = items[prefix]
+            elif index == 0:
+                next_item = None
+                while next_item is None:
+                    menu_bar = self.copy_attribute(root, kAXMenuBarAttribute)
+                    next_item = self._menu_child(menu_bar, title, "AXMenuBarItem") if menu_bar is not None else None
+                    if next_item is None:
+                        if time.time() >= end:
+                            return False
+                        time.sleep(0.05)
+            else:
+                next_item = self._await_menu_child(item, title, end)
+                if next_item is None:
+                    return False
+            items[prefix] = next_item
+            item = next_item
+            if not self.press(item):
+                if cached:
+                    self._menu_items.pop(app_key, None)
+                    return None
+                return False
+        return True
+
+    def menu_select(self, path: List[str], app: Optional[str] = None, timeout_seconds: float = 3.0) -> bool:
+        # Each level is pressed once and its submenu polled within the timeout; re-walking would toggle menus shut
+        if not path:
+            return False
+        end = time.time() + max(0.0, timeout_seconds)
+        while True:
+            root, key = self._scan_root(app)
+            if root is not None:
+                result = self._select_menu_once(key, root, path, end)
+                if result is None:
+                    result = self._select_menu_once(key, root, path, end)
+                return bool(result)
+            if time.time() >= end:
+                return False
+            time.sleep(0.05)
+
+    def element_at(self, x: float, y: float, text: Optional[str] = None, max_ascent: int = 4) -> Optional[AXElement]:
+        try:
+            err, el = self._ax.AXUIElementCopyElementAtPosition(self.system_wide, float(x), float(y), None)
+        except Exception:
+            return None
+        if err or el is None:
+            return None
+        wanted = (text or "").strip().lower()
+        label_el: Optional[AXElement] = None
+        for _ in range(max_ascent + 1):
+            attrs = self.copy_attributes(el, HIT_TEST_ATTRIBUTES)
+            role = str(attrs.get(kAXRoleAttribute) or "")
+            label = " ".join(str(attrs.get(k) or "") for k in (kAXTitleAttribute, "AXValue", "AXDescription")).lower()
+            matched = not wanted or wanted in label
+            if role in _PASSIVE_ROLES:
+                if matched and label_el is None:
+                    label_el = el
+            elif (matched and (wanted or role in _PRESSABLE_ROLES)) or (label_el is not None and role in _PRESSABLE_ROLES):
+                return el
+            parent = attrs.get(kAXParentAttribute)
+            if parent is None:
+                break
+            el = parent
+        return label_el
 
     def press(self, element: AXElement) -> bool:
         return self.perform_action(element, "AXPress")
@@ -0,0 +1,264 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import ApplicationServices
+from CoreFoundation import (
+    CFRunLoopAddSource,
+    CFRunLoopGetCurrent,
+    CFRunLoopRunInMode,
+    CFRunLoopWakeUp,
+    kCFRunLoopDefaultMode,
+)
+
+AXElement = Any
+
+ACTIONS_KEY = "__actions__"
+
+# Notifications that only touch the element's own attributes
+REFRESH_NOTIFICATIONS = ("AXValueChanged", "AXTitleChanged")
+# Notifications that change the shape of the tree or move frames around
+STRUCTURE_NOTIFICATIONS = ("AXCreated", "AXUIElementDestroyed", "AXFocusedWindowChanged")
+GEOMETRY_NOTIFICATIONS = ("AXWindowMoved", "AXWindowResized")
+WATCHED_NOTIFICATIONS = REFRESH_NOTIFICATIONS + STRUCTURE_NOTIFICATIONS + GEOMETRY_NOTIFICATIONS
+# Apps do not notify for every change (and notifications can be dropped), so cached reads expire
+DEFAULT_MAX_AGE = 2.0
+
+
+class _AppEntry:
+    def __init__(self, root: AXElement, observer: Any) -> None:
+        self.root = root
+        self.observer = observer
+        self.attrs: Dict[AXElement, Dict[str, Any]] = {}
+        self.parents: Dict[AXElement, AXElement] = {}
+        self.fetched: Dict[AXElement, float] = {}
+        # Bumped on every invalidation so fetches racing a notification are not stored
+        self.epoch = 0
+
+
+class AXTreeCache:
+    def __init__(self, backend: Any = None, run_loop: bool = True, max_age: float = DEFAULT_MAX_AGE) -> None:
+        self._ax = backend if backend is not None else ApplicationServices
+        self.max_age = max_age
+        self._use_run_loop = run_loop
+        self._lock = threading.RLock()
+        self._apps: Dict[Any, _AppEntry] = {}
+        self._failed: set = set()
+        self._pid_by_observer: Dict[Any, Any] = {}
+        self._run_loop: Any = None
+        self._run_loop_ready = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0, "expired": 0, "invalidations": 0, "notifications": 0}
+        self._version = 0
+        self._changed = threading.Condition(self._lock)
+
+    def _ensure_run_loop(self) -> Any:
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._run_loop_ready.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        self._run_loop_ready.wait(timeout=2)
+        return self._run_loop
+
+    def _run(self) -> None:
+        self._run_loop = CFRunLoopGetCurrent()
+        self._run_loop_ready.set()
+        while not self._stop.is_set():
+            CFRunLoopRunInMode(kCFRunLoopDefaultMode, 0.25, False)
+            # Returns immediately while no observer source is attached yet
+            if not self._apps:
+                self._stop.wait(0.25)
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._run_loop is not None:
+            CFRunLoopWakeUp(self._run_loop)
+        if self._thread:
+            self._thread.join(timeout=2)
+        self._thread = None
+
+    def _callback(self, observer: Any, element: AXElement, notification: str, refcon: Any) -> None:
+        pid = self._pid_by_observer.get(observer)
+        if pid is None:
+            return
+        self.handle_notification(pid, element, str(notification))
+
+    def watch(self, pid: Any, root: AXElement) -> bool:
+        with self._lock:
+            if pid in self._apps:
+                return True
+            if pid in self._failed:
+                return False
+        try:
+            err, observer = self._ax.AXObserverCreate(pid, self._callback, None)
+        except Exception:
+            err, observer = 1, None
+        if err or observer is None:
+            with self._lock:
+                self._failed.add(pid)
+            return False
+        subscribed = 0
+        for name in WATCHED_NOTIFICATIONS:
+            try:
+                if not self._ax.AXObserverAddNotification(observer, root, name, None):
+                    subscribed += 1
+            except Exception:
+                continue
+        if subscribed == 0:
+            with self._lock:
+                self._failed.add(pid)
+            return False
+        if self._use_run_loop:
+            run_loop = self._ensure_run_loop()
+            if run_loop is None:
+                return False
+            CFRunLoopAddSource(run_loop, self._ax.AXObserverGetRunLoopSource(observer), kCFRunLoopDefaultMode)
+            CFRunLoopWakeUp(run_loop)
+        with self._lock:
+            self._apps[pid] = _AppEntry(root, observer)
+            self._pid_by_observer[observer] = pid
+        return True
+
+    @property
+    def version(self) -> int:
+        with self._lock:
+            return self._version
+
+    def wait_for_change(self, since: int, timeout: float) -> int:
+        with self._changed:
+            if self._version == since:
+                self._changed.wait(max(0.0, timeout))
+            return self._version
+
+    def is_watching(self, pid: Any) -> bool:
+        with self._lock:
+            return pid in self._apps
+
+    def forget(self, pid: Any) -> None:
+        with self._lock:
+            entry = self._apps.pop(pid, None)
+            self._failed.discard(pid)
+            if entry is not None:
+                self._pid_by_observer.pop(entry.observer, None)
+
+    def get(self, pid: Any, element: AXElement, attributes: Sequence[str], fetch: Callable[[AXElement, Sequence[str]], Dict[str, Any]]) -> Dict[str, Any]:
+        with self._lock:
+            entry = self._apps.get(pid)
+            if entry is None:
+                return fetch(element, attributes)
+            now = time.monotonic()
+            cached = entry.attrs.get(element, {})
+            if cached and now - entry.fetched.get(element, now) > self.max_age:
+                entry.attrs.pop(element, None)
+                entry.fetched.pop(element, None)
+                self.stats["expired"] += 1
+                cached = {}
+            missing = [name for name in attributes if name not in cached]
+            if not missing:
+                self.stats["hits"] += 1
+                return {name: cached[name] for name in attributes}
+            self.stats["misses"] += 1
+            epoch = entry.epoch
+        fetched = fetch(element, missing)
+        with self._lock:
+            if entry.epoch == epoch and self._apps.get(pid) is entry:
+                if element not in entry.attrs:
+                    # Age counts from the first attribute read; later partial reads do not extend it
+                    entry.fetched[element] = now
+                stored = entry.attrs.setdefault(element, {})
+                stored.update(fetched)
+                for child in fetched.get("AXChildren") or []:
+                    entry.parents[child] = element
+                cached = stored
+            else:
+                cached = dict(cached)
+                cached.update(fetched)
+        return {name: cached.get(name) for name in attributes}
+
+    def get_actions(self, pid: Any, element: AXElement, fetch: Callable[[AXElement], List[str]]) -> List[str]:
+        def fetch_actions(el: AXElement, _names: Sequence[str]) -> Dict[str, Any]:
+            return {ACTIONS_KEY: fetch(el)}
+
+        return list(self.get(pid, element, (ACTIONS_KEY,), fetch_actions)[ACTIONS_KEY] or [])
+
+    def _drop_subtree(self, entry: _AppEntry, element: AXElement) -> None:
+        stack = [element]
+        while stack:
+            el = stack.pop()
+            attrs = entry.attrs.pop(el, None)
+            entry.parents.pop(el, None)
+            entry.fetched.pop(el, None)
+            if attrs:
+                stack.extend(attrs.get("AXChildren") or [])
+
+    def _drop_children_of(self, entry: _AppEntry, parent: Optional[AXElement]) -> None:
+        if parent is None:
+            # Unknown attachment point: start over for this app
+            entry.attrs.clear()
+            entry.parents.clear()
+            entry.fetched.clear()
+            return
+        attrs = entry.attrs.get(parent)
+        if attrs is not None:
+            attrs.pop("AXChildren", None)
+
+    def handle_notification(self, pid: Any, element: AXElement, notification: str) -> None:
+        parent: Optional[AXElement] = None
+        if notification == "AXCreated":
+            # New elements are not cached yet; ask for their parent outside the lock
+            try:
+                err, parent = self._ax.AXUIElementCopyAttributeValue(element, "AXParent", None)
+                if err:
+                    parent = None
+            except Exception:
+                parent = None
+        with self._lock:
+            entry = self._apps.get(pid)
+            if entry is None:
+                return
+            self.stats["notifications"] += 1
+            entry.epoch += 1
+            self._version += 1
+            self._changed.notify_all()
+            if notification in REFRESH_NOTIFICATIONS:
+                attrs = entry.attrs.get(element)
+                if attrs is not None:
+                    children = attrs.get("AXChildren")
+                    attrs.clear()
+                    if children is not None:
+                        attrs["AXChildren"] = children
+            elif notification == "AXCreated":
+                self._drop_children_of(entry, parent)
+            elif notification == "AXUIElementDestroyed":
+                parent = entry.parents.get(element)
+                self._drop_subtree(entry, element)
+                self._drop_children_of(entry, parent)
+            elif notification == "AXFocusedWindowChanged":
+                entry.attrs.pop(entry.root, None)
+            elif notification in GEOMETRY_NOTIFICATIONS:
+                for attrs in entry.attrs.values():
+                    attrs.pop("AXFrame", None)
+            else:
+                entry.attrs.clear()
+                entry.parents.clear()
+                entry.fetched.clear()
+            self.stats["invalidations"] += 1
+
+    def invalidate(self, pid: Any, element: Optional[AXElement] = None) -> None:
+        # Drops what is cached under element (the whole app when None) so the next read goes to AX
+        with self._lock:
+            entry = self._apps.get(pid)
+            if entry is None:
+                return
+            entry.epoch += 1
+            if element is None or element is entry.root:
+                entry.attrs.clear()
+                entry.parents.clear()
+                entry.fetched.clear()
+            else:
+                self._drop_subtree(entry, element)
+            self.stats["invalidations"] += 1
@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, List
+
+from .tracing import percentile
+
+GoalSpec = Dict[str, Any]
+
+
+def load_goals(path: str) -> List[GoalSpec]:
+    # Accepts a JSON list, JSON lines, or one plain-text goal per line
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+    stripped = text.strip()
+    if stripped.startswith("["):
+        items: List[Any] = json.loads(stripped)
+    else:
+        items = []
+        for line in stripped.splitlines():
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            items.append(json.loads(line) if line.startswith("{") else line)
+    return [{"goal": item} if isinstance(item, str) else dict(item) for item in items]
+
+
+def run_goal(spec: GoalSpec, options: Dict[str, Any]) -> Dict[str, Any]:
+    # Runs inside a worker process: each worker owns its sim world, connector and provider client
+    from .agent import Agent
+    from .agent_core.fast_path import FastPathPlanner
+    from .agent_core.plan_cache import PlanCache
+    from .clock import VirtualClock
+    from .interaction.sim.engine import SimEngine
+
+    started = time.time()
+    out: Dict[str, Any] = {"goal": spec.get("goal"), "index": spec.get("index"), "pid": os.getpid()}
+    eng = None
+    agent = None
+    try:
+        clock = VirtualClock() if options.get("virtual_time") else None
+        eng = SimEngine.reset(tick_hz=int(options.get("sim_hz", 4)), seed=int(spec.get("seed", options.get("seed", 0))), world=spec.get("world", options.get("world")), clock=clock, behavior=spec.get("behavior", options.get("behavior")))
+        eng.start()
+        eng.store.wait_for_change(0, timeout=1.0)
+        agent = Agent(
+            model=options.get("model", "gpt-4o-mini"),
+            provider=options.get("provider", "stub"),
+            api_key=options.get("api_key"),
+            base_url=options.get("base_url"),
+            os_override="sim",
+            plan_cache=PlanCache(),
+            state_mode=options.get("state_mode", "full"),
+            fast_path=FastPathPlanner() if options.get("fast_path", False) else None,
+        )
+        result = agent.run_continuous(
+            str(spec["goal"]),
+            context=spec.get("context"),
+            success=spec.get("success"),
+            max_cycles=int(spec.get("max_cycles", options.get("max_cycles", 5))),
+            max_time_seconds=float(spec.get("timeout", options.get("timeout", 60.0))),
+        )
+        out.update({"done": bool(result.get("done")), "cycles": result.get("cycles", 0), "llm_calls": result["plan_cache"]["llm_calls"], "error": None})
+        if clock is not None:
+            out["sim_s"] = round(clock.time(), 4)
+        out["sim_state"] = eng.behavior.state
+    except Exception as e:  # noqa: BLE001
+        out.update({"done": False, "cycles": 0, "llm_calls": 0, "error": f"{type(e).__name__}: {e}"})
+    finally:
+        # Workers are reused across goals; a failed goal must not leave its sim ticking
+        if agent is not None:
+            agent.close()
+        if eng is not None:
+            eng.stop()
+    out["elapsed_s"] = round(time.time() - started, 4)
+    return out
+
+
+def summarize(results: List[Dict[str, Any]], wall_seconds: float) -> Dict[str, Any]:
+    latencies = [r["elapsed_s"] for r in results]
+    cycles = [r.get("cycles", 0) for r in results]
+    done = sum(1 for r in results if r.get("done"))
+    return {
+        "goals": len(results),
+        "succeeded": done,
+        "success_rate": round(done / len(results), 4) if results else 0.0,
+        "errors": sum(1 for r in results if r.get("error")),
+        "cycles_total": sum(cycles),
+        "cycles_mean": round(sum(cycles) / len(cycles), 3) if cycles else 0.0,
+        "llm_calls": sum(r.get("llm_calls", 0) for r in results),
+        "latency_s": {"p50": percentile(latencies, 50), "p90": percentile(latencies, 90), "p95": percentile(latencies, 95), "p99": percentile(latencies, 99), "max": max(latencies) if latencies else None},
+        "wall_s": round(wall_seconds, 4),
+        "throughput_goals_per_s": round(len(results) / wall_seconds, 4) if wall_seconds > 0 else None,
+    }
+
+
+def run_batch(goals: List[GoalSpec], workers: int = 4, **options: Any) -> Dict[str, Any]:
+    specs = [dict(spec, index=i) for i, spec in enumerate(goals)]
+    results: List[Dict[str, Any]] = []
+    started = time.time()
+    # spawn: workers must not inherit the parent's sim threads or SDK clients
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=max(1, workers), mp_context=ctx) as pool:
+        futures = [pool.submit(run_goal, spec, options) for spec in specs]
+        for future in as_completed(futures):
+            results.append(future.result())
+    results.sort(key=lambda r: r["index"])
+    return {"summary": summarize(results, time.time() - started), "results": results}
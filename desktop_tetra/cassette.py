@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+from .agent_core.step_stream import StepStream
+from .llm import LLMProvider
+
+CASSETTE_MODES = ("record", "replay", "passthrough")
+# Set by the agent around each provider call (see prompt_scope): goal, context, UI fingerprint and any extra evidence.
+# Keying on it rather than the rendered UI state keeps field values and churn out of the key.
+PROMPT_SCOPE: "ContextVar[Optional[Dict[str, Any]]]" = ContextVar("desktop_tetra_prompt_scope", default=None)
+
+
+@contextmanager
+def prompt_scope(scope: Dict[str, Any]) -> Iterator[None]:
+    # Only for the provider call it wraps; a scope left behind would key the next unrelated call
+    token = PROMPT_SCOPE.set(scope)
+    try:
+        yield
+    finally:
+        PROMPT_SCOPE.reset(token)
+
+
+# Without a scope: drop per-element values from state lines ('TextField "Name" value=\'abc\'')
+_VOLATILE = re.compile(r"\svalue=(?:'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\")")
+
+
+def prompt_key(model: str, system: str, messages: List[Dict[str, str]], scope: Optional[Dict[str, Any]] = None) -> str:
+    # Whitespace-insensitive, so reflowed prompt text still hits the same recording
+    def norm(text: Any) -> str:
+        return " ".join(str(text).split())
+
+    if scope is not None:
+        raw = json.dumps({"model": model, "system": norm(system), "scope": scope}, sort_keys=True, default=str)
+    else:
+        raw = json.dumps({"model": model, "system": norm(system), "messages": [[m.get("role"), norm(_VOLATILE.sub("", str(m.get("content", ""))))] for m in messages]}, sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+
+class CassetteProvider(LLMProvider):
+    # record: call through on misses and append to the cassette; replay: never touch the network
+    def __init__(self, path: str, mode: str = "replay", inner: Optional[LLMProvider] = None, model: str = "") -> None:
+        if mode not in CASSETTE_MODES:
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        if mode != "replay" and inner is None:
+            raise ValueError(f"Cassette mode {mode} needs a provider to call")
+        self.path = os.path.expanduser(path)
+        self.mode = mode
+        self.inner = inner
+        self.model = model
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0, "recorded": 0}
+        self._load()
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            if self.mode == "replay":
+                raise RuntimeError(f"Cassette not found: {self.path}")
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                # Later lines win, so re-recording a prompt just appends
+                self._entries[entry["key"]] = entry["response"]
+
+    def _append(self, key: str, response: Dict[str, Any]) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"key": key, "response": response}, separators=(",", ":"), ensure_ascii=False) + "\n")
+
+    def _lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            response = self._entries.get(key)
+            if response is None:
+                self.stats["misses"] += 1
+                if self.mode == "replay":
+                    raise RuntimeError(f"No cassette entry for prompt {key} in {self.path}")
+                return None
+            self.stats["hits"] += 1
+            return json.loads(json.dumps(response))
+
+    def _store(self, key: str, response: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entries[key] = response
+            self._append(key, response)
+            self.stats["recorded"] += 1
+
+    def generate_json(self, system: str, messages: List[Dict[str, str]]) -> Dict[str, Any]:
+        if self.mode == "passthrough":
+            return self.inner.generate_json(system=system, messages=messages)  # type: ignore[union-attr]
+        key = prompt_key(self.model, system, messages, PROMPT_SCOPE.get())
+        cached = self._lookup(key)
+        if cached is not None:
+            return cached
+        response = self.inner.generate_json(system=system, messages=messages)  # type: ignore[union-attr]
+        self._store(key, response)
+        return response
+
+    async def agenerate_json(self, system: str, messages: List[Dict[str, str]]) -> Dict[str, Any]:
+        if self.mode == "passthrough":
+            return await self.inner.agenerate_json(system=system, messages=messages)  # type: ignore[union-attr]
+        key = prompt_key(self.model, system, messages, PROMPT_SCOPE.get())
+        cached = self._lookup(key)
+        if cached is not None:
+            return cached
+        response = await self.inner.agenerate_json(system=system, messages=messages)  # type: ignore[union-attr]
+        self._store(key, response)
+        return response
+
+    def generate_json_stream(self, system: str, messages: List[Dict[str, str]]) -> StepStream:
+        if self.mode == "passthrough":
+            return self.inner.generate_json_stream(system=system, messages=messages)  # type: ignore[union-attr]
+        # Recorded responses are whole documents; replaying them as one chunk keeps runs at full speed
+        return StepStream.from_plan(self.generate_json(system=system, messages=messages))
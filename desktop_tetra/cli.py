@@ -1,3 +1,4 @@
+import asyncio
 import json
 import time
 from typing import Optional
@@ -8,11 +9,17 @@ from .ax import AXFinder
 from .player import ActionPlayer
 from .recorder import ActionRecorder
 from .agent import Agent
+from .agent_core.fast_path import FastPathPlanner
+from .agent_core.plan_cache import PlanCache
+from .batch import load_goals, run_batch
 from .interaction.livefeed import LiveFeed
 from .interaction.engine import LiveEngine
 from .interaction.sim.engine import SimEngine
 from .connectors import get_connector
+from .connectors.base import ScanBudget, nodes_to_tree
+from .clock import VirtualClock
 from .input_control import InputController
+from .tracing import Tracer
 
 
 @click.group()
@@ -53,8 +60,10 @@ def sim() -> None:
 @sim.command("start")
 @click.option("--hz", type=int, default=4)
 @click.option("--seed", type=int, default=0)
-def sim_start(hz: int, seed: int) -> None:
-    eng = SimEngine.instance(tick_hz=hz, seed=seed)
+@click.option("--world", type=str, default=None, help="demo|small|medium|large|huge or a JSON world spec file")
+@click.option("--behavior", type=str, default=None, help="App behavior scenario (demo|notes-save) or a JSON model file")
+def sim_start(hz: int, seed: int, world: Optional[str], behavior: Optional[str]) -> None:
+    eng = SimEngine.instance(tick_hz=hz, seed=seed, world=world, behavior=behavior)
     eng.start()
     time.sleep(0.2)
     click.echo(json.dumps({"sim": "started", "nodes": len(eng.snapshot().get("order", []))}, indent=2))
@@ -75,7 +84,7 @@ def sim_status() -> None:
 
 @cli.command("goal")
 @click.argument("goal", type=str)
-@click.option("--provider", type=str, default="openai", help="openai|lmstudio|xai|anthropic|local")
+@click.option("--provider", type=str, default="openai", help="openai|lmstudio|xai|anthropic|local|stub")
 @click.option("--model", type=str, default="gpt-4o-mini")
 @click.option("--api-key", type=str, default=None)
 @click.option("--base-url", type=str, default=None)
@@ -86,7 +95,22 @@ def sim_status() -> None:
 @click.option("--max-cycles", type=int, default=10)
 @click.option("--timeout", type=float, default=120.0)
 @click.option("--success", type=str, default=None, help='JSON selector, e.g. {"role":"StaticText","title":"Done"}')
-def goal_cmd(goal: str, provider: str, model: str, api_key: Optional[str], base_url: Optional[str], os_override: Optional[str], context: Optional[str], continuous: bool, infinite: bool, max_cycles: int, timeout: float, success: Optional[str]) -> None:
+@click.option("--plan-cache", "plan_cache_path", type=str, default=None, help="JSON file persisting successful plans across runs")
+@click.option("--state-mode", type=click.Choice(["full", "diff", "off"]), default="full", help="UI state sent with each planning call")
+@click.option("--state-tokens", type=int, default=600, help="Token budget for the UI state")
+@click.option("--async/--no-async", "use_async", default=False, help="Overlap verification, success checks and the next plan request")
+@click.option("--request-timeout", type=float, default=60.0, help="Per-attempt LLM request timeout (seconds)")
+@click.option("--retries", type=int, default=2, help="LLM retries with jittered backoff")
+@click.option("--hedge", type=str, default=None, help="Second provider[:model] raced after --hedge-after seconds")
+@click.option("--hedge-after", type=float, default=2.0)
+@click.option("--cassette", type=str, default=None, help="JSONL file of recorded prompt/response pairs")
+@click.option("--cassette-mode", type=click.Choice(["record", "replay", "passthrough"]), default="passthrough", help="record: call and save misses; replay: offline, cassette only")
+@click.option("--trace", "trace_path", type=str, default=None, help="Append timing spans to this JSONL file and report per-stage p50/p95")
+@click.option("--fast-path/--no-fast-path", default=False, help="Plan simple goals (click X, File > New, type X into Y) locally without the LLM")
+@click.option("--fast-path-confidence", type=float, default=0.8, help="Below this the goal goes to the provider")
+@click.option("--virtual-time/--real-time", default=False, help="With --os sim: simulated time jumps to the next event instead of sleeping")
+@click.option("--sim-behavior", type=str, default=None, help="With --os sim: app behavior scenario (demo|notes-save) or a JSON model file")
+def goal_cmd(goal: str, provider: str, model: str, api_key: Optional[str], base_url: Optional[str], os_override: Optional[str], context: Optional[str], continuous: bool, infinite: bool, max_cycles: int, timeout: float, success: Optional[str], plan_cache_path: Optional[str], state_mode: str, state_tokens: int, use_async: bool, request_timeout: float, retries: int, hedge: Optional[str], hedge_after: float, cassette: Optional[str], cassette_mode: str, trace_path: Optional[str], fast_path: bool, fast_path_confidence: float, virtual_time: bool, sim_behavior: Optional[str]) -> None:
     ctx = None
     if context:
         try:
@@ -100,20 +124,96 @@ def goal_cmd(goal: str, provider: str, model: str, api_key: Optional[str], base_
         except json.JSONDecodeError:
             raise click.ClickException("--success must be valid JSON selector")
     LiveEngine.instance().start()
-    agent = Agent(model=model, provider=provider, api_key=api_key, base_url=base_url, os_override=os_override)
-    if infinite or continuous:
-        if infinite:
-            # Run with unbounded cycles/time (practically high caps)
-            out = agent.run_continuous(goal, context=ctx, success=success_sel, max_cycles=10**9, max_time_seconds=10**9)
+    if virtual_time or sim_behavior:
+        if (os_override or "").lower() != "sim":
+            raise click.ClickException("--virtual-time and --sim-behavior need --os sim")
+        try:
+            SimEngine.reset(clock=VirtualClock() if virtual_time else None, behavior=sim_behavior).start()
+        except ValueError as e:
+            raise click.ClickException(str(e))
+    if cassette_mode != "passthrough" and not cassette:
+        raise click.ClickException("--cassette-mode record/replay needs --cassette PATH")
+    llm_options = {"timeout": request_timeout, "retries": retries, "hedge": hedge, "hedge_after": hedge_after, "cassette": cassette, "cassette_mode": cassette_mode}
+    tracer = Tracer(trace_path) if trace_path else None
+    try:
+        agent = Agent(
+            model=model, provider=provider, api_key=api_key, base_url=base_url, os_override=os_override,
+            plan_cache=PlanCache(path=plan_cache_path), state_mode=state_mode, state_tokens=state_tokens, llm_options=llm_options, tracer=tracer,
+            fast_path=FastPathPlanner(min_confidence=fast_path_confidence) if fast_path else None,
+        )
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    try:
+        if infinite or continuous:
+            if infinite:
+                # Run with unbounded cycles/time (practically high caps)
+                max_cycles, timeout = 10**9, 10**9
+            if use_async:
+                out = asyncio.run(agent.arun_continuous(goal, context=ctx, success=success_sel, max_cycles=max_cycles, max_time_seconds=timeout))
+            else:
+                out = agent.run_continuous(goal, context=ctx, success=success_sel, max_cycles=max_cycles, max_time_seconds=timeout)
         else:
-            out = agent.run_continuous(goal, context=ctx, success=success_sel, max_cycles=max_cycles, max_time_seconds=timeout)
-    else:
-        plan = agent.plan(goal, context=ctx)
-        results = agent.execute_steps(plan)
-        out = {"plan": plan, "results": results}
+            plan, results, timing = agent.plan_and_execute(goal, context=ctx)
+            agent.record_outcome(goal, plan, results)
+            out = {"plan": plan, "results": results, "timing": timing, "plan_cache": agent.plan_cache.report(), "prompt": dict(agent.prompt_stats)}
+            if agent.fast_path is not None:
+                out["fast_path"] = dict(agent.fast_path.stats)
+            if tracer is not None:
+                out["trace"] = tracer.summary()
+    finally:
+        agent.close()
+        if tracer is not None:
+            tracer.close()
     click.echo(json.dumps(out, indent=2))
 
 
+@cli.command("goal-batch")
+@click.argument("goals_path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--workers", type=int, default=4)
+@click.option("--provider", type=str, default="stub", help="openai|lmstudio|xai|anthropic|local|stub")
+@click.option("--model", type=str, default="gpt-4o-mini")
+@click.option("--api-key", type=str, default=None)
+@click.option("--base-url", type=str, default=None)
+@click.option("--max-cycles", type=int, default=5)
+@click.option("--timeout", type=float, default=60.0, help="Per-goal time limit")
+@click.option("--state-mode", type=click.Choice(["full", "diff", "off"]), default="full")
+@click.option("--out", "out_path", type=str, default=None, help="Write per-goal results as JSON")
+@click.option("--fast-path/--no-fast-path", default=False, help="Plan simple goals locally without the LLM")
+@click.option("--world", type=str, default=None, help="Sim world per goal: demo|small|medium|large|huge or a JSON spec file")
+@click.option("--virtual-time/--real-time", default=False, help="Run each sim world on simulated time instead of sleeping")
+@click.option("--behavior", type=str, default=None, help="App behavior scenario (demo|notes-save) or a JSON model file")
+def goal_batch_cmd(goals_path: str, workers: int, provider: str, model: str, api_key: Optional[str], base_url: Optional[str], max_cycles: int, timeout: float, state_mode: str, out_path: Optional[str], fast_path: bool, world: Optional[str], virtual_time: bool, behavior: Optional[str]) -> None:
+    """Run a file of goals concurrently, each in its own simulated desktop."""
+    goals = load_goals(goals_path)
+    out = run_batch(goals, workers=workers, provider=provider, model=model, api_key=api_key, base_url=base_url, max_cycles=max_cycles, timeout=timeout, state_mode=state_mode, fast_path=fast_path, world=world, virtual_time=virtual_time, behavior=behavior)
+    if out_path:
+        with open(out_path, "w", encoding="utf-8") as f:
+            json.dump(out, f, indent=2)
+    click.echo(json.dumps(out["summary"], indent=2))
+
+
+@cli.command("scan")
+@click.option("--app", type=str, default=None, help="Target app name or bundle id")
+@click.option("--depth", type=int, default=4)
+@click.option("--os", "os_override", type=str, default=None, help="Force platform: sim|darwin|windows")
+@click.option("--max-nodes", type=int, default=None)
+@click.option("--max-bytes", type=int, default=None)
+@click.option("--max-seconds", type=float, default=None)
+@click.option("--ndjson/--tree", default=True, help="Stream one node per line vs a nested tree")
+def scan_cmd(app: Optional[str], depth: int, os_override: Optional[str], max_nodes: Optional[int], max_bytes: Optional[int], max_seconds: Optional[float], ndjson: bool) -> None:
+    """Stream the semantic map of an app, stopping at the first exhausted budget."""
+    conn = get_connector(os_override=os_override)
+    budget = ScanBudget(max_nodes=max_nodes, max_bytes=max_bytes, max_seconds=max_seconds)
+    nodes = conn.iter_semantic_map(app=app, max_depth=depth, budget=budget)
+    if ndjson:
+        for node in nodes:
+            click.echo(json.dumps(node, default=str))
+    else:
+        click.echo(json.dumps(nodes_to_tree(nodes), indent=2, default=str))
+    if budget.truncated:
+        click.echo(json.dumps({"truncated": budget.truncated, "nodes": budget.nodes, "bytes": budget.bytes}), err=True)
+
+
 @cli.command("focus-app")
 @click.option("--app", type=str, required=True)
 def focus_app_cmd(app: str) -> None:
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import heapq
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Union
+
+
+class SystemClock:
+    virtual = False
+
+    def time(self) -> float:
+        return time.time()
+
+    def sleep(self, seconds: float) -> None:
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def wait_for_change(self, source: Any, since: int, timeout: float) -> int:
+        return source.wait_for_change(since, timeout)
+
+
+SYSTEM_CLOCK = SystemClock()
+
+
+class VirtualClock:
+    # Discrete-event time: sleeping or waiting runs the scheduled events due before the deadline,
+    # in (time, order) sequence, on the caller's thread, then jumps straight to the deadline
+    virtual = True
+
+    def __init__(self, start: float = 0.0) -> None:
+        self._now = float(start)
+        self._queue: List[Tuple[float, int, Callable[[], Any], Optional[float]]] = []
+        self._seq = 0
+        self._cancelled: Set[int] = set()
+        # Handles still due to fire; cancelling one that already fired (or never existed) is a no-op
+        self._live: Set[int] = set()
+        self._lock = threading.RLock()
+        self.stats: Dict[str, Union[int, float]] = {"events": 0, "advanced_s": 0.0}
+
+    def time(self) -> float:
+        return self._now
+
+    def call_at(self, when: float, fn: Callable[[], Any], period: Optional[float] = None) -> int:
+        if period is not None and period <= 0:
+            raise ValueError("period must be positive")
+        with self._lock:
+            self._seq += 1
+            heapq.heappush(self._queue, (max(when, self._now), self._seq, fn, period))
+            self._live.add(self._seq)
+            return self._seq
+
+    def call_later(self, delay: float, fn: Callable[[], Any], period: Optional[float] = None) -> int:
+        return self.call_at(self._now + max(0.0, delay), fn, period)
+
+    def cancel(self, handle: int) -> None:
+        with self._lock:
+            if handle in self._live:
+                self._live.discard(handle)
+                self._cancelled.add(handle)
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._live)
+
+    def advance_to(self, target: float, until: Optional[Callable[[], bool]] = None) -> bool:
+        # Stops at the first event after which until() holds; returns whether it did
+        with self._lock:
+            started = self._now
+            while True:
+                if until is not None and until():
+                    self.stats["advanced_s"] += self._now - started
+                    return True
+                if not self._queue or self._queue[0][0] > target:
+                    break
+                when, seq, fn, period = heapq.heappop(self._queue)
+                if seq in self._cancelled:
+                    self._cancelled.discard(seq)
+                    continue
+                self._now = max(self._now, when)
+                if period is not None:
+                    # Same sequence number, so the handle from call_at keeps cancelling it
+                    heapq.heappush(self._queue, (when + period, seq, fn, period))
+                else:
+                    self._live.discard(seq)
+                fn()
+                self.stats["events"] += 1
+            self._now = max(self._now, target)
+            self.stats["advanced_s"] += self._now - started
+            return False
+
+    def advance(self, seconds: float) -> None:
+        self.advance_to(self._now + max(0.0, seconds))
+
+    def sleep(self, seconds: float) -> None:
+        self.advance(seconds)
+
+    def wait_for_change(self, source: Any, since: int, timeout: float) -> int:
+        self.advance_to(self._now + max(0.0, timeout), until=lambda: source.version != since)
+        return source.version
+
+
+Clock = Union[SystemClock, VirtualClock]
@@ -1,6 +1,10 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional, Tuple, Protocol
+import json
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Protocol
+
+from ..clock import SYSTEM_CLOCK, Clock
 
 
 Selector = Dict[str, Any]
@@ -9,7 +13,11 @@ SemanticNode = Dict[str, Any]
 
 class DesktopConnector(Protocol):  # pragma: no cover - interface
     def build_semantic_map(self, app: Optional[str] = None, max_depth: int = 4) -> SemanticNode: ...
+    def iter_semantic_map(self, app: Optional[str] = None, max_depth: int = 4, budget: Optional["ScanBudget"] = None) -> Iterator[SemanticNode]: ...
+    def build_semantic_table(self, app: Optional[str] = None, max_depth: int = 4, budget: Optional["ScanBudget"] = None) -> Any: ...
     def find_element(self, selector: Selector, timeout_seconds: float = 3.0) -> Optional[Any]: ...
+    def element_at(self, x: float, y: float, text: Optional[str] = None) -> Optional[Any]: ...
+    def element_info(self, element: Any) -> Dict[str, Any]: ...
     def press(self, element: Any) -> bool: ...
     def set_value(self, element: Any, value: Any) -> bool: ...
     def focus_app(self, app: str) -> bool: ...
@@ -17,3 +25,96 @@ class DesktopConnector(Protocol):  # pragma: no cover - interface
     def scroll_to(self, selector: Selector, timeout_seconds: float = 3.0) -> bool: ...
     def wait_for(self, expect: Selector, state: Optional[Dict[str, Any]] = None, timeout_seconds: float = 3.0) -> bool: ...
     def get_element_bounds(self, element: Any) -> Tuple[float, float, float, float]: ...
+
+
+class ScanBudget:
+    def __init__(self, max_nodes: Optional[int] = None, max_bytes: Optional[int] = None, max_seconds: Optional[float] = None) -> None:
+        self.max_nodes = max_nodes
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.nodes = 0
+        self.bytes = 0
+        self.truncated: Optional[str] = None
+        self._started: Optional[float] = None
+
+    def admit(self, node: SemanticNode) -> bool:
+        if self._started is None:
+            self._started = time.time()
+        if self.max_nodes is not None and self.nodes >= self.max_nodes:
+            self.truncated = "max_nodes"
+            return False
+        if self.max_seconds is not None and time.time() - self._started >= self.max_seconds:
+            self.truncated = "max_seconds"
+            return False
+        size = 0
+        if self.max_bytes is not None:
+            size = len(json.dumps(node, default=str))
+            if self.bytes + size > self.max_bytes:
+                self.truncated = "max_bytes"
+                return False
+        self.nodes += 1
+        self.bytes += size
+        return True
+
+    def stream(self, nodes: Iterable[SemanticNode]) -> Iterator[SemanticNode]:
+        for node in nodes:
+            if not self.admit(node):
+                return
+            yield node
+
+
+def nodes_to_tree(nodes: Iterable[SemanticNode]) -> SemanticNode:
+    # Reassembles a streamed (idx, parent, depth) preorder sequence into the nested-dict shape
+    by_idx: Dict[int, SemanticNode] = {}
+    roots: List[SemanticNode] = []
+    for streamed in nodes:
+        node = {k: v for k, v in streamed.items() if k not in ("idx", "parent", "depth")}
+        by_idx[streamed["idx"]] = node
+        parent = by_idx.get(streamed.get("parent")) if streamed.get("parent") is not None else None
+        if parent is None:
+            roots.append(node)
+        else:
+            parent.setdefault("children", []).append(node)
+    if len(roots) == 1:
+        return roots[0]
+    return {"children": roots} if roots else {}
+
+
+class ChangeSource(Protocol):  # pragma: no cover - interface
+    @property
+    def version(self) -> int: ...
+    def wait_for_change(self, since: int, timeout: float) -> int: ...
+
+
+def expectation_selector(expect: Selector) -> Selector:
+    # Plans phrase expectations as {"appears": selector}; bare selectors are accepted too
+    appears = expect.get("appears")
+    return appears if isinstance(appears, dict) else expect
+
+
+def wait_until(
+    check: Callable[[], bool],
+    source: Optional[ChangeSource] = None,
+    timeout_seconds: float = 3.0,
+    initial_backoff: float = 0.05,
+    max_backoff: float = 1.0,
+    clock: Optional[Clock] = None,
+) -> bool:
+    # Re-check as soon as the source reports a change; otherwise rescan with exponential backoff
+    clock = clock if clock is not None else SYSTEM_CLOCK
+    end = clock.time() + max(0.0, timeout_seconds)
+    backoff = initial_backoff
+    while True:
+        since = source.version if source is not None else 0
+        if check():
+            return True
+        remaining = end - clock.time()
+        if remaining <= 0:
+            return False
+        delay = min(backoff, remaining)
+        if source is not None and clock.wait_for_change(source, since, delay) != since:
+            backoff = initial_backoff
+            continue
+        if source is None:
+            clock.sleep(delay)
+        backoff = min(backoff * 2.0, max_backoff)
@@ -1,19 +1,35 @@
 from __future__ import annotations
 
-import time
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 from ..ax import AXFinder
-from .base import DesktopConnector, Selector, SemanticNode
+from ..ax_cache import AXTreeCache
+from .base import DesktopConnector, ScanBudget, Selector, SemanticNode, expectation_selector, wait_until
+from .table import SemanticTable
 
 
 class MacOSConnector(DesktopConnector):
     def __init__(self) -> None:
-        self.ax = AXFinder()
+        self.ax = AXFinder(cache=AXTreeCache())
+        self.changes = self.ax.cache
+        # Perception frames are in captured pixels; AX hit-testing works in points
+        try:
+            from AppKit import NSScreen
+
+            self.screen_scale = float(NSScreen.mainScreen().backingScaleFactor())
+        except Exception:
+            self.screen_scale = 1.0
 
     def build_semantic_map(self, app: Optional[str] = None, max_depth: int = 4) -> SemanticNode:
         return self.ax.build_semantic_map(app=app, max_depth=max_depth)
 
+    def iter_semantic_map(self, app: Optional[str] = None, max_depth: int = 4, budget: Optional[ScanBudget] = None) -> Iterator[SemanticNode]:
+        nodes = self.ax.iter_semantic_map(app=app, max_depth=max_depth)
+        return budget.stream(nodes) if budget is not None else nodes
+
+    def build_semantic_table(self, app: Optional[str] = None, max_depth: int = 4, budget: Optional[ScanBudget] = None) -> SemanticTable:
+        return SemanticTable.from_stream(self.iter_semantic_map(app=app, max_depth=max_depth, budget=budget))
+
     def find_element(self, selector: Selector, timeout_seconds: float = 3.0) -> Optional[Any]:
         return self.ax.find_element(
             title=selector.get("title"),
@@ -23,31 +39,27 @@ class MacOSConnector(DesktopConnector):
             contains=bool(selector.get("contains", True)),
         )
 
+    def element_at(self, x: float, y: float, text: Optional[str] = None) -> Optional[Any]:
+        return self.ax.element_at(x, y, text=text)
+
+    def element_info(self, element: Any) -> Dict[str, Any]:
+        return self.ax.element_info(element)
+
     def press(self, element: Any) -> bool:
         return self.ax.press(element)
 
     def set_value(self, element: Any, value: Any) -> bool:
         return self.ax.set_value(element, value)
 
+    def running_apps(self) -> List[str]:
+        return self.ax.apps.names()
+
     def focus_app(self, app: str) -> bool:
         return self.ax.activate_app(app)
 
     def menu_select(self, path: List[str], app: Optional[str] = None, timeout_seconds: float = 3.0) -> bool:
-        # Basic implementation via find by title/role for each level
-        # Menu bar items are AXMenuBar -> AXMenu -> AXMenuItem
-        end = time.time() + timeout_seconds
-        current_el: Optional[Any] = None
-        roles = ["AXMenuBarItem"] + ["AXMenuItem"] * (len(path) - 1)
-        for idx, name in enumerate(path):
-            remaining = max(0.2, end - time.time())
-            el = self.ax.find_element(title=name, role=roles[idx], app=app, timeout_seconds=remaining, contains=False)
-            if el is None:
-                return False
-            if not self.ax.press(el):
-                return False
-            current_el = el
-            time.sleep(0.05)
-        return current_el is not None
+        # Walks AXMenuBar -> AXMenuBarItem -> AXMenu -> AXMenuItem only; resolved items are cached per app
+        return self.ax.menu_select(path, app=app, timeout_seconds=timeout_seconds)
 
     def scroll_to(self, selector: Selector, timeout_seconds: float = 3.0) -> bool:
         # Try find and rely on AXScrollToVisible by pressing/focusing parent scroll area
@@ -61,13 +73,17 @@ class MacOSConnector(DesktopConnector):
             return True
 
     def wait_for(self, expect: Selector, state: Optional[Dict[str, Any]] = None, timeout_seconds: float = 3.0) -> bool:
-        end = time.time() + timeout_seconds
-        while time.time() < end:
-            el = self.find_element(expect, timeout_seconds=0.2)
-            if el is not None:
-                return True
-            time.sleep(0.1)
-        return False
+        selector = expectation_selector(expect)
+        # Lookups are served from the AX cache; its notifications wake the wait early
+        return wait_until(
+            lambda: self.find_element(selector, timeout_seconds=0.0) is not None,
+            source=self.ax.cache,
+            timeout_seconds=timeout_seconds,
+        )
 
     def get_element_bounds(self, element: Any) -> Tuple[float, float, float, float]:
         return self.ax.get_element_bounds(element)
+
+    def close(self) -> None:
+        self.ax.close()
+        self.ax.cache.stop()
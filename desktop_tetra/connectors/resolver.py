@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from ..interaction.roles import normalize_role
+from .base import DesktopConnector, Selector
+
+NodeSignature = Tuple[Any, ...]
+
+
+def _signature(node: Dict[str, Any]) -> NodeSignature:
+    # Perception re-upserts nodes every frame with a new ts; only frame or text changes invalidate
+    f = node.get("frame") or {}
+    return (f.get("x"), f.get("y"), f.get("w"), f.get("h"), node.get("title"))
+
+
+def _role_name(role: Optional[str]) -> str:
+    # "AXButton" (AX), "ButtonControl" (UIA) and "Button" (perception) all compare as "Button"
+    name = normalize_role(os_role=role) if role else ""
+    if name.startswith("AX"):
+        name = name[2:]
+    if name.endswith("Control") and len(name) > len("Control"):
+        name = name[: -len("Control")]
+    return name.lower()
+
+
+def element_matches(info: Dict[str, Any], selector: Selector) -> bool:
+    role = selector.get("role")
+    if role and _role_name(info.get("role")) != _role_name(role):
+        return False
+    title = (selector.get("title") or "").strip()
+    if not title:
+        return True
+    labels = [str(info.get(k) or "").strip() for k in ("title", "value", "description")]
+    if bool(selector.get("contains", True)):
+        return any(title in label for label in labels)
+    return title in labels
+
+
+class ElementResolver:
+    # Maps perception nodes (frame + text) to native AX/UIA elements by hit-testing the frame centre
+    def __init__(self, conn: DesktopConnector, scale: Optional[float] = None, origin: Tuple[float, float] = (0.0, 0.0), max_entries: int = 1024) -> None:
+        self.conn = conn
+        self.scale = scale if scale is not None else float(getattr(conn, "screen_scale", 1.0) or 1.0)
+        self.origin = origin
+        self.max_entries = max(1, max_entries)
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[NodeSignature, Any]]" = OrderedDict()
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0, "hit_tests": 0, "rejected": 0, "fallbacks": 0, "unresolved": 0, "invalidations": 0}
+
+    def node_key(self, node: Dict[str, Any]) -> str:
+        return str(node.get("id") or _signature(node))
+
+    def _centre(self, node: Dict[str, Any]) -> Optional[Tuple[float, float]]:
+        f = node.get("frame") or {}
+        w, h = float(f.get("w", 0) or 0), float(f.get("h", 0) or 0)
+        if w <= 0 or h <= 0:
+            return None
+        x = (float(f.get("x", 0) or 0) + w / 2.0) / self.scale + self.origin[0]
+        y = (float(f.get("y", 0) or 0) + h / 2.0) / self.scale + self.origin[1]
+        return x, y
+
+    def resolve(self, node: Dict[str, Any], selector: Optional[Selector] = None, timeout_seconds: float = 0.5, fallback: bool = True) -> Optional[Any]:
+        # With a selector the hit-tested element must itself match it; the node's own text is not evidence enough
+        key = self.node_key(node)
+        signature = _signature(node)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == signature:
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return entry[1]
+            self.stats["misses"] += 1
+        element = None
+        centre = self._centre(node)
+        if centre is not None:
+            self.stats["hit_tests"] += 1
+            try:
+                element = self.conn.element_at(centre[0], centre[1], text=(selector or {}).get("title") or node.get("title"))
+                if element is not None and selector and not element_matches(self.conn.element_info(element), selector):
+                    self.stats["rejected"] += 1
+                    element = None
+            except Exception:
+                element = None
+        if element is None and selector and fallback:
+            # Hit-test missed (occluded, off-screen, no frame): fall back to a tree search
+            self.stats["fallbacks"] += 1
+            element = self.conn.find_element(selector, timeout_seconds=timeout_seconds)
+        if element is None:
+            self.stats["unresolved"] += 1
+            return None
+        with self._lock:
+            self._entries[key] = (signature, element)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return element
+
+    def invalidate(self, node_id: Optional[str] = None) -> None:
+        with self._lock:
+            if node_id is None:
+                self._entries.clear()
+            elif self._entries.pop(node_id, None) is None:
+                return
+            self.stats["invalidations"] += 1
@@ -1,65 +1,96 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 from ..interaction.sim.engine import SimEngine
-from .base import DesktopConnector, Selector, SemanticNode
+from .base import DesktopConnector, ScanBudget, Selector, SemanticNode, expectation_selector, wait_until
+from .table import SemanticTable
 
 
 class SimConnector(DesktopConnector):
     def __init__(self) -> None:
         self.sim = SimEngine.instance()
+        # The agent picks this up, so waits and deadlines follow the sim's (possibly virtual) time
+        self.clock = self.sim.clock
+        # Change counter the agent uses to reuse its last scan (version / wait_for_change)
+        self.changes = self.sim.store
 
     def build_semantic_map(self, app: Optional[str] = None, max_depth: int = 4) -> SemanticNode:
         return self.sim.snapshot()
 
+    def iter_semantic_map(self, app: Optional[str] = None, max_depth: int = 4, budget: Optional[ScanBudget] = None) -> Iterator[SemanticNode]:
+        def nodes() -> Iterator[SemanticNode]:
+            for idx, node in enumerate(self.sim.iter_nodes()):
+                yield {"idx": idx, "parent": None, "depth": 0, **node}
+
+        return budget.stream(nodes()) if budget is not None else nodes()
+
+    def build_semantic_table(self, app: Optional[str] = None, max_depth: int = 4, budget: Optional[ScanBudget] = None) -> SemanticTable:
+        return SemanticTable.from_stream(self.iter_semantic_map(app=app, max_depth=max_depth, budget=budget))
+
     def find_element(self, selector: Selector, timeout_seconds: float = 3.0) -> Optional[Any]:
-        snap = self.sim.snapshot()
         role = selector.get("role")
         title = selector.get("title")
         contains = bool(selector.get("contains", True))
-        for node_id in snap.get("order", []):
-            node = snap["nodes"][node_id]
-            if role and node.get("role") != role:
-                continue
+        # Only the match is copied; iter_nodes hands out the store's own dicts
+        for node in self.sim.iter_nodes(role):
             t = (node.get("title") or "")
             if title:
                 if contains and title not in t:
                     continue
                 if not contains and title != t:
                     continue
-            return node
+            return dict(node)
         return None
 
+    def element_at(self, x: float, y: float, text: Optional[str] = None) -> Optional[Any]:
+        # Smallest node whose frame contains the point, preferring ones whose title carries the text
+        best = None
+        best_key: Tuple[int, float] = (2, 0.0)
+        for node in self.sim.iter_nodes():
+            f = node.get("frame") or {}
+            fx, fy, fw, fh = (float(f.get(k, 0)) for k in ("x", "y", "w", "h"))
+            if not (fx <= x <= fx + fw and fy <= y <= fy + fh):
+                continue
+            key = (0 if text and text in (node.get("title") or "") else 1, fw * fh)
+            if best is None or key < best_key:
+                best, best_key = node, key
+        return dict(best) if best is not None else None
+
+    def element_info(self, element: Any) -> Dict[str, Any]:
+        node = element if isinstance(element, dict) else {}
+        return {"role": node.get("role"), "title": node.get("title"), "value": node.get("value"), "description": None}
+
     def press(self, element: Any) -> bool:
-        # Simple rule: pressing New sets status to Ready
-        if isinstance(element, dict) and element.get("id") == "btn:new":
-            self.sim.store.upsert_node({
-                "id": "txt:status", "role": "StaticText", "title": "Ready", "frame": {"x": 140, "y": 240, "w": 200, "h": 20}
-            })
-            return True
-        return True
+        # What an action does is up to the engine's behavior model (sim.behavior)
+        return self.sim.dispatch("press", element=element)
 
     def set_value(self, element: Any, value: Any) -> bool:
-        return True
+        current = self.sim.store.get(element["id"]) if isinstance(element, dict) and element.get("id") else None
+        if current is not None:
+            self.sim.store.upsert_node(dict(current, value=value))
+        return self.sim.dispatch("set_value", element=element, value=value)
 
     def focus_app(self, app: str) -> bool:
-        return True
+        return self.sim.dispatch("focus_app", app=app)
 
     def menu_select(self, path: List[str], app: Optional[str] = None, timeout_seconds: float = 3.0) -> bool:
-        return True
+        return self.sim.dispatch("menu_select", path=list(path), app=app)
 
     def scroll_to(self, selector: Selector, timeout_seconds: float = 3.0) -> bool:
-        return True
+        element = self.find_element(selector, timeout_seconds=0.0)
+        if element is None and self.sim.behavior.strict:
+            return False
+        return self.sim.dispatch("scroll_to", element=element, selector=selector)
 
     def wait_for(self, expect: Selector, state: Optional[Dict[str, Any]] = None, timeout_seconds: float = 3.0) -> bool:
-        import time
-        end = time.time() + timeout_seconds
-        while time.time() < end:
-            if self.find_element(expect, timeout_seconds=0.0) is not None:
-                return True
-            time.sleep(0.1)
-        return False
+        selector = expectation_selector(expect)
+        return wait_until(
+            lambda: self.find_element(selector, timeout_seconds=0.0) is not None,
+            source=self.sim.store,
+            timeout_seconds=timeout_seconds,
+            clock=self.clock,
+        )
 
     def get_element_bounds(self, element: Any) -> Tuple[float, float, float, float]:
         f = element.get("frame") if isinstance(element, dict) else None
@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import math
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .base import SemanticNode
+
+# Keys stored in dedicated columns; anything else a connector emits lands in sparse extras
+_CORE_KEYS = ("role", "title", "identifier", "value", "enabled", "selected", "actions", "frame")
+_STREAM_KEYS = ("idx", "parent", "depth", "children")
+
+
+def _tristate(value: Optional[bool]) -> int:
+    if value is None:
+        return -1
+    return 1 if value else 0
+
+
+def _from_tristate(value: int) -> Optional[bool]:
+    return None if value < 0 else bool(value)
+
+
+class SemanticTable:
+    # Columnar semantic map: parent indices, interned roles/action sets and array-backed frames
+    def __init__(self) -> None:
+        self.parent = array("i")
+        self.depth = array("H")
+        self.role = array("I")
+        self.actions = array("I")
+        self.enabled = array("b")
+        self.selected = array("b")
+        self.frames = array("d")
+        self.title: List[Optional[str]] = []
+        self.identifier: List[Optional[str]] = []
+        self.value: List[Any] = []
+        self.extras: Dict[int, Dict[str, Any]] = {}
+        self.roles: List[Optional[str]] = []
+        self.action_sets: List[Tuple[str, ...]] = []
+        # Which optional keys the source emitted, so to_tree() reproduces its exact shape
+        self.fields: set = set()
+        self._role_index: Dict[Optional[str], int] = {}
+        self._action_index: Dict[Tuple[str, ...], int] = {}
+        self._row_by_idx: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.parent)
+
+    def _intern_role(self, role: Optional[str]) -> int:
+        index = self._role_index.get(role)
+        if index is None:
+            index = len(self.roles)
+            self.roles.append(role)
+            self._role_index[role] = index
+        return index
+
+    def _intern_actions(self, actions: Iterable[str]) -> int:
+        key = tuple(str(a) for a in actions)
+        index = self._action_index.get(key)
+        if index is None:
+            index = len(self.action_sets)
+            self.action_sets.append(key)
+            self._action_index[key] = index
+        return index
+
+    def append(self, node: SemanticNode, parent_row: int = -1, depth: int = 0) -> int:
+        row = len(self.parent)
+        self.parent.append(parent_row)
+        self.depth.append(depth)
+        self.fields.update(k for k in _CORE_KEYS if k in node)
+        self.role.append(self._intern_role(node.get("role")))
+        self.actions.append(self._intern_actions(node.get("actions") or ()))
+        self.enabled.append(_tristate(node.get("enabled")))
+        self.selected.append(_tristate(node.get("selected")))
+        frame = node.get("frame")
+        if frame:
+            self.frames.extend((float(frame.get("x", 0)), float(frame.get("y", 0)), float(frame.get("w", 0)), float(frame.get("h", 0))))
+        else:
+            self.frames.extend((math.nan, math.nan, math.nan, math.nan))
+        title = node.get("title")
+        identifier = node.get("identifier")
+        self.title.append(str(title) if title is not None else None)
+        self.identifier.append(str(identifier) if identifier is not None else None)
+        self.value.append(node.get("value"))
+        extra = {k: v for k, v in node.items() if k not in _CORE_KEYS and k not in _STREAM_KEYS}
+        if extra:
+            self.extras[row] = extra
+        return row
+
+    def append_streamed(self, node: SemanticNode) -> int:
+        parent = node.get("parent")
+        parent_row = self._row_by_idx.get(parent, -1) if parent is not None else -1
+        row = self.append(node, parent_row=parent_row, depth=int(node.get("depth", 0)))
+        if "idx" in node:
+            self._row_by_idx[node["idx"]] = row
+        return row
+
+    @classmethod
+    def from_stream(cls, nodes: Iterable[SemanticNode]) -> "SemanticTable":
+        table = cls()
+        for node in nodes:
+            table.append_streamed(node)
+        table._row_by_idx.clear()
+        return table
+
+    @classmethod
+    def from_tree(cls, tree: SemanticNode) -> "SemanticTable":
+        table = cls()
+        if not tree:
+            return table
+        stack: List[Tuple[SemanticNode, int, int]] = [(tree, -1, 0)]
+        while stack:
+            node, parent_row, depth = stack.pop()
+            row = table.append(node, parent_row=parent_row, depth=depth)
+            stack.extend((c, row, depth + 1) for c in reversed(node.get("children") or []))
+        return table
+
+    def node(self, row: int) -> SemanticNode:
+        out: SemanticNode = {}
+        fields = self.fields
+        if "role" in fields:
+            out["role"] = self.roles[self.role[row]]
+        if "title" in fields:
+            out["title"] = self.title[row]
+        if "identifier" in fields:
+            out["identifier"] = self.identifier[row]
+        if "value" in fields:
+            out["value"] = self.value[row]
+        if "enabled" in fields:
+            out["enabled"] = _from_tristate(self.enabled[row])
+        if "selected" in fields:
+            out["selected"] = _from_tristate(self.selected[row])
+        if "actions" in fields:
+            out["actions"] = list(self.action_sets[self.actions[row]])
+        x, y, w, h = self.frames[row * 4: row * 4 + 4]
+        if "frame" in fields and not math.isnan(x):
+            out["frame"] = {"x": x, "y": y, "w": w, "h": h}
+        extra = self.extras.get(row)
+        if extra:
+            out.update(extra)
+        return out
+
+    def to_tree(self) -> SemanticNode:
+        nodes = [self.node(row) for row in range(len(self))]
+        roots: List[SemanticNode] = []
+        for row, parent in enumerate(self.parent):
+            if parent < 0:
+                roots.append(nodes[row])
+            else:
+                nodes[parent].setdefault("children", []).append(nodes[row])
+        if len(roots) == 1:
+            return roots[0]
+        return {"children": roots} if roots else {}
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "fields": sorted(self.fields),
+            "roles": self.roles,
+            "action_sets": [list(a) for a in self.action_sets],
+            "parent": self.parent.tolist(),
+            "depth": self.depth.tolist(),
+            "role": self.role.tolist(),
+            "actions": self.actions.tolist(),
+            "enabled": self.enabled.tolist(),
+            "selected": self.selected.tolist(),
+            "frames": [None if math.isnan(v) else v for v in self.frames],
+            "title": self.title,
+            "identifier": self.identifier,
+            "value": self.value,
+            "extras": {str(k): v for k, v in self.extras.items()},
+        }
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any]) -> "SemanticTable":
+        table = cls()
+        table.fields = set(data.get("fields", []))
+        table.roles = list(data.get("roles", []))
+        table._role_index = {r: i for i, r in enumerate(table.roles)}
+        table.action_sets = [tuple(a) for a in data.get("action_sets", [])]
+        table._action_index = {a: i for i, a in enumerate(table.action_sets)}
+        table.parent = array("i", data.get("parent", []))
+        table.depth = array("H", data.get("depth", []))
+        table.role = array("I", data.get("role", []))
+        table.actions = array("I", data.get("actions", []))
+        table.enabled = array("b", data.get("enabled", []))
+        table.selected = array("b", data.get("selected", []))
+        table.frames = array("d", (math.nan if v is None else float(v) for v in data.get("frames", [])))
+        table.title = list(data.get("title", []))
+        table.identifier = list(data.get("identifier", []))
+        table.value = list(data.get("value", []))
+        table.extras = {int(k): v for k, v in data.get("extras", {}).items()}
+        return table
@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# UIA_Window_WindowOpenedEventId: menus and dialogs arrive as new top-level windows
+_WINDOW_OPENED_EVENT = 20016
+# UIA_Window_WindowClosedEventId: a closed window takes every control cached in it along
+_WINDOW_CLOSED_EVENT = 20017
+# Longest a caller waits for the event thread to (un)register handlers
+CALL_TIMEOUT = 5.0
+
+
+class UIAEventSource:
+    # Handlers are registered and removed on a dedicated thread that joins the MTA with its own IUIAutomation.
+    # UIA then delivers events on its own MTA worker threads, so nothing has to pump messages; registering on the
+    # caller's STA thread (as uiautomation sets it up) would queue every event behind that thread's message loop
+    def __init__(self, uia: Any) -> None:
+        self.uia = uia
+        self._lock = threading.RLock()
+        self._changed = threading.Condition(self._lock)
+        self._version = 0
+        self._watched: Dict[Any, List[Any]] = {}
+        self._desktop_handler: Any = None
+        self._requests: "queue.Queue[Optional[Tuple[Callable[[Any], Any], Future]]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def version(self) -> int:
+        with self._lock:
+            return self._version
+
+    def wait_for_change(self, since: int, timeout: float) -> int:
+        with self._changed:
+            if self._version == since:
+                self._changed.wait(max(0.0, timeout))
+            return self._version
+
+    def notify(self) -> None:
+        with self._changed:
+            self._version += 1
+            self._changed.notify_all()
+
+    def _run(self) -> None:
+        automation: Any = None
+        error: Optional[Exception] = None
+        try:
+            import comtypes  # type: ignore
+            import comtypes.client  # type: ignore
+
+            comtypes.CoInitializeEx(comtypes.COINIT_MULTITHREADED)
+            core = self.uia._AutomationClient.instance().UIAutomationCore
+            automation = comtypes.client.CreateObject(core.CUIAutomation, interface=core.IUIAutomation)
+        except Exception as e:
+            error = e
+        while True:
+            item = self._requests.get()
+            if item is None:
+                break
+            fn, future = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                if automation is None:
+                    raise RuntimeError(f"UIA event thread unavailable: {error}")
+                future.set_result(fn(automation))
+            except Exception as e:
+                future.set_exception(e)
+        if automation is not None:
+            automation = None
+            comtypes.CoUninitialize()
+
+    def _call(self, fn: Callable[[Any], Any]) -> Any:
+        # Runs fn(automation) on the MTA event thread, started on first use
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="uia-events", daemon=True)
+                self._thread.start()
+        future: Future = Future()
+        self._requests.put((fn, future))
+        return future.result(timeout=CALL_TIMEOUT)
+
+    def _handler(self) -> Any:
+        import comtypes  # type: ignore
+
+        core = self.uia._AutomationClient.instance().UIAutomationCore
+        source = self
+
+        class _Handler(comtypes.COMObject):  # type: ignore[misc]
+            _com_interfaces_ = [
+                core.IUIAutomationStructureChangedEventHandler,
+                core.IUIAutomationPropertyChangedEventHandler,
+                core.IUIAutomationEventHandler,
+            ]
+
+            def IUIAutomationStructureChangedEventHandler_HandleStructureChangedEvent(self, sender: Any, change_type: Any, runtime_id: Any) -> int:
+                source.notify()
+                return 0
+
+            def IUIAutomationPropertyChangedEventHandler_HandlePropertyChangedEvent(self, sender: Any, property_id: Any, new_value: Any) -> int:
+                source.notify()
+                return 0
+
+            def IUIAutomationEventHandler_HandleAutomationEvent(self, sender: Any, event_id: Any) -> int:
+                source.notify()
+                return 0
+
+        return _Handler()
+
+    def watch(self, element: Any, key: Any) -> bool:
+        with self._lock:
+            if key in self._watched:
+                return bool(self._watched[key])
+        uia = self.uia
+
+        def register(automation: Any) -> Any:
+            # COM pointers do not cross apartments unmarshalled; look the window up again by handle on this thread
+            target = automation.ElementFromHandle(hwnd)
+            handler = self._handler()
+            automation.AddStructureChangedEventHandler(target, uia.TreeScope.Subtree, None, handler)
+            automation.AddPropertyChangedEventHandler(
+                target, uia.TreeScope.Subtree, None, handler, [uia.PropertyId.NameProperty, uia.PropertyId.IsOffscreenProperty]
+            )
+            if self._desktop_handler is None:
+                automation.AddAutomationEventHandler(_WINDOW_OPENED_EVENT, automation.GetRootElement(), uia.TreeScope.Children, None, handler)
+                # Closed windows are gone by the time the event is raised, so scope matching needs the whole subtree
+                automation.AddAutomationEventHandler(_WINDOW_CLOSED_EVENT, automation.GetRootElement(), uia.TreeScope.Subtree, None, handler)
+                self._desktop_handler = handler
+            return handler
+
+        try:
+            hwnd = element.CurrentNativeWindowHandle
+            if not hwnd:
+                raise ValueError("element has no window handle")
+            handler = self._call(register)
+        except Exception:
+            # Remember the failure so lookups fall back to backoff rescans without retrying each time
+            with self._lock:
+                self._watched[key] = []
+            return False
+        with self._lock:
+            self._watched[key] = [element, handler]
+        return True
+
+    def close(self) -> None:
+        thread = self._thread
+        if thread is not None:
+            try:
+                self._call(lambda automation: automation.RemoveAllEventHandlers())
+            except Exception:
+                pass
+            # Queued after the removal, so the thread only exits once handlers are gone
+            self._requests.put(None)
+            thread.join(timeout=CALL_TIMEOUT)
+        with self._lock:
+            self._thread = None
+            self._watched.clear()
+            self._desktop_handler = None
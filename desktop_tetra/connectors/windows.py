@@ -1,50 +1,217 @@
 from __future__ import annotations
 
+import json
 import os
+import re
 import time
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
-from .base import DesktopConnector, Selector, SemanticNode
+from .base import DesktopConnector, ScanBudget, Selector, SemanticNode, expectation_selector, nodes_to_tree, wait_until
+from .table import SemanticTable
+from .uia_events import UIAEventSource
+
+# ControlFromPoint returns the deepest control; text/images inside a control are walked up to it
+_PASSIVE_CONTROLS = frozenset({"TextControl", "ImageControl"})
+_PRESSABLE_CONTROLS = frozenset({
+    "ButtonControl", "MenuItemControl", "ListItemControl", "HyperlinkControl", "CheckBoxControl", "RadioButtonControl",
+    "TabItemControl", "TreeItemControl", "ComboBoxControl", "DataItemControl", "SplitButtonControl", "EditControl",
+})
+# "Untitled - Notepad", "Inbox — Mail": the app name is one of the separated parts of a window title
+_TITLE_PARTS = re.compile(r"\s+[-–—|]\s+")
 
 
 class WindowsConnector(DesktopConnector):
-    def __init__(self) -> None:
+    def __init__(self, events: Any = None) -> None:
         try:
             import uiautomation as uia  # type: ignore
         except Exception as e:  # noqa: BLE001
             raise RuntimeError("uiautomation package required on Windows. Install with `pip install uiautomation`.") from e
         self.uia = uia
+        # Structure/property change events; a stand-in only needs version, wait_for_change and watch
+        self.events = events if events is not None else UIAEventSource(uia)
+        self.changes = self.events
+        # Resolved controls per (app window, selector), valid while the event version is unchanged
+        self._elements: Dict[str, Tuple[Any, int]] = {}
+        self.metrics: Dict[str, float] = {"lookups": 0, "searches": 0, "cache_hits": 0, "lookup_ms_total": 0.0, "lookup_ms_max": 0.0}
 
-    def build_semantic_map(self, app: Optional[str] = None, max_depth: int = 4) -> SemanticNode:
+    def _automation(self) -> Any:
+        # Raw IUIAutomation COM interface behind the uiautomation wrapper
+        return self.uia._AutomationClient.instance().IUIAutomation
+
+    def _cache_request(self, scope: int) -> Any:
         uia = self.uia
-        root = uia.GetRootControl()
-        # Optionally filter by process if app provided
-        def to_node(ctrl, depth: int) -> Dict[str, Any]:
-            name = ctrl.Name
-            automation_id = ctrl.AutomationId
-            control_type = ctrl.ControlTypeName
-            bounding = ctrl.BoundingRectangle
-            node: Dict[str, Any] = {
-                "role": control_type,
-                "title": name,
-                "identifier": automation_id,
-                "frame": {"x": bounding.left, "y": bounding.top, "w": bounding.width(), "h": bounding.height()},
-            }
-            if depth <= 0:
-                return node
-            children = []
+        automation = self._automation()
+        request = automation.CreateCacheRequest()
+        for prop in (
+            uia.PropertyId.NameProperty,
+            uia.PropertyId.AutomationIdProperty,
+            uia.PropertyId.ControlTypeProperty,
+            uia.PropertyId.BoundingRectangleProperty,
+            uia.PropertyId.ProcessIdProperty,
+            uia.PropertyId.ClassNameProperty,
+        ):
+            request.AddProperty(prop)
+        request.TreeScope = scope
+        request.TreeFilter = automation.ControlViewCondition
+        return request
+
+    def _cached_children(self, element: Any) -> List[Any]:
+        array = element.GetCachedChildren()
+        if array is None:
+            return []
+        return [array.GetElement(i) for i in range(array.Length)]
+
+    def _process_name(self, pid: int) -> Optional[str]:
+        try:
+            import psutil  # type: ignore
+            return str(psutil.Process(pid).name())
+        except Exception:
+            return None
+
+    def _app_rank(self, pid: int, name: Optional[str], class_name: Optional[str], app: str) -> int:
+        # 3: the window's process (pid or executable), 2: its title or a whole part of it, 1: its class name, 0: none
+        wanted = app.strip().lower()
+        if app.isdigit():
+            return 3 if pid == int(app) else 0
+        exe = (self._process_name(pid) or "").lower()
+        if exe and exe in (wanted, wanted + ".exe"):
+            return 3
+        title = (name or "").strip().lower()
+        # Whole parts only: "Notes" must not pick up "Sticky Notes"
+        if title == wanted or wanted in _TITLE_PARTS.split(title):
+            return 2
+        return 1 if class_name == app else 0
+
+    def _app_match(self, element: Any, app: str) -> int:
+        return self._app_rank(int(element.CachedProcessId), element.CachedName, element.CachedClassName, app)
+
+    def _best_matches(self, ranked: List[Tuple[int, Any]]) -> List[Any]:
+        # Only the strongest kind of match, so a process match is not diluted by windows that merely share a title word
+        best = max((rank for rank, _ in ranked), default=0)
+        return [w for rank, w in ranked if best and rank == best]
+
+    def _app_roots(self, app: Optional[str]) -> List[Any]:
+        # Scope scans to the target app's top-level windows (or the foreground window) instead of the desktop
+        uia = self.uia
+        if app is None:
+            return [uia.GetForegroundControl().GetTopLevelControl().Element]
+        desktop = self._automation().GetRootElement()
+        listed = desktop.BuildUpdatedCache(self._cache_request(uia.TreeScope.Element | uia.TreeScope.Children))
+        return self._best_matches([(self._app_match(w, app), w) for w in self._cached_children(listed)])
+
+    def _cached_node(self, element: Any) -> SemanticNode:
+        rect = element.CachedBoundingRectangle
+        return {
+            "role": self.uia.ControlTypeNames.get(element.CachedControlType),
+            "title": element.CachedName,
+            "identifier": element.CachedAutomationId,
+            "frame": {"x": rect.left, "y": rect.top, "w": rect.right - rect.left, "h": rect.bottom - rect.top},
+        }
+
+    def _control_node(self, ctrl: Any) -> SemanticNode:
+        bounding = ctrl.BoundingRectangle
+        return {
+            "role": ctrl.ControlTypeName,
+            "title": ctrl.Name,
+            "identifier": ctrl.AutomationId,
+            "frame": {"x": bounding.left, "y": bounding.top, "w": bounding.width(), "h": bounding.height()},
+        }
+
+    def _build_caches(self, roots: List[Any]) -> List[Any]:
+        # One BuildUpdatedCache per window pulls every property of the subtree in a single cross-process call
+        request = self._cache_request(self.uia.TreeScope.Subtree)
+        return [root.BuildUpdatedCache(request) for root in roots]
+
+    def _iter_cached(self, roots: List[Any], max_depth: int) -> Iterator[SemanticNode]:
+        stack: List[Tuple[Any, Optional[int], int]] = [(root, None, 0) for root in reversed(roots)]
+        next_idx = 0
+        while stack:
+            element, parent, depth = stack.pop()
             try:
-                for c in ctrl.GetChildren():
-                    children.append(to_node(c, depth - 1))
+                node = self._cached_node(element)
             except Exception:
-                pass
-            if children:
-                node["children"] = children
-            return node
-        return to_node(root, max_depth)
+                continue
+            idx = next_idx
+            next_idx += 1
+            yield {"idx": idx, "parent": parent, "depth": depth, **node}
+            if depth < max_depth:
+                try:
+                    children = self._cached_children(element)
+                except Exception:
+                    children = []
+                stack.extend((c, idx, depth + 1) for c in reversed(children))
+
+    def _iter_controls(self, roots: List[Any], max_depth: int) -> Iterator[SemanticNode]:
+        # Per-property fallback when cache requests are unavailable
+        stack: List[Tuple[Any, Optional[int], int]] = [(root, None, 0) for root in reversed(roots)]
+        next_idx = 0
+        while stack:
+            ctrl, parent, depth = stack.pop()
+            try:
+                node = self._control_node(ctrl)
+            except Exception:
+                continue
+            idx = next_idx
+            next_idx += 1
+            yield {"idx": idx, "parent": parent, "depth": depth, **node}
+            if depth < max_depth:
+                try:
+                    children = list(ctrl.GetChildren())
+                except Exception:
+                    children = []
+                stack.extend((c, idx, depth + 1) for c in reversed(children))
+
+    def build_semantic_map(self, app: Optional[str] = None, max_depth: int = 4) -> SemanticNode:
+        return nodes_to_tree(self.iter_semantic_map(app=app, max_depth=max_depth))
+
+    def iter_semantic_map(self, app: Optional[str] = None, max_depth: int = 4, budget: Optional[ScanBudget] = None) -> Iterator[SemanticNode]:
+        def nodes() -> Iterator[SemanticNode]:
+            try:
+                cached_roots: Optional[List[Any]] = self._build_caches(self._app_roots(app))
+            except Exception:
+                cached_roots = None
+            if cached_roots is not None:
+                yield from self._iter_cached(cached_roots, max_depth)
+                return
+            if app is None:
+                controls = [self.uia.GetRootControl()]
+            else:
+                windows = self.uia.GetRootControl().GetChildren()
+                controls = self._best_matches([(self._app_rank(int(c.ProcessId), c.Name, c.ClassName, app), c) for c in windows])
+            yield from self._iter_controls(controls, max_depth)
+
+        return budget.stream(nodes()) if budget is not None else nodes()
+
+    def build_semantic_table(self, app: Optional[str] = None, max_depth: int = 4, budget: Optional[ScanBudget] = None) -> SemanticTable:
+        return SemanticTable.from_stream(self.iter_semantic_map(app=app, max_depth=max_depth, budget=budget))
+
+    def _runtime_key(self, element: Any) -> Any:
+        try:
+            return tuple(element.GetRuntimeId())
+        except Exception:
+            return id(element)
+
+    def _window_key(self, ctrl: Any) -> Any:
+        try:
+            return self._runtime_key(ctrl.GetTopLevelControl().Element)
+        except Exception:
+            return None
+
+    def _record_lookup(self, started: float) -> None:
+        elapsed_ms = (time.time() - started) * 1000.0
+        self.metrics["lookup_ms_total"] += elapsed_ms
+        self.metrics["lookup_ms_max"] = max(self.metrics["lookup_ms_max"], elapsed_ms)
 
     def _find(self, selector: Selector, timeout_seconds: float) -> Optional[Any]:
         uia = self.uia
+        started = time.time()
+        self.metrics["lookups"] += 1
+        key = json.dumps(selector, sort_keys=True, default=str)
+        cached = self._elements.get(key)
+        if cached is not None and cached[1] == self.events.version:
+            self.metrics["cache_hits"] += 1
+            self._record_lookup(started)
+            return cached[0]
         conds = []
         title = selector.get("title")
         role = selector.get("role")
@@ -59,20 +226,74 @@ class WindowsConnector(DesktopConnector):
         cond = None
         for c in conds:
             cond = c if cond is None else cond & c
-        start = time.time()
-        while time.time() - start < timeout_seconds:
+        search_from = None
+        watched: Any = None
+        try:
+            roots = self._app_roots(str(selector["app"]) if selector.get("app") else None)
+        except Exception:
+            roots = []
+        if roots:
+            if self.events.watch(roots[0], self._runtime_key(roots[0])):
+                watched = self._runtime_key(roots[0])
+            if selector.get("app"):
+                search_from = uia.Control.CreateControlFromElement(roots[0])
+        found: List[Any] = []
+
+        def search() -> bool:
+            version = self.events.version
+            self.metrics["searches"] += 1
             try:
-                ctrl = uia.Control(searchDepth=10, foundIndex=1, condition=cond)
+                ctrl = uia.Control(searchFromControl=search_from, searchDepth=10, foundIndex=1, condition=cond)
                 if ctrl and ctrl.Exists(0):
-                    return ctrl
+                    # Only the watched window's events invalidate the entry; an unscoped search can land in any window
+                    if watched is not None and (search_from is not None or self._window_key(ctrl) == watched):
+                        self._elements[key] = (ctrl, version)
+                    found.append(ctrl)
+                    return True
             except Exception:
                 pass
-            time.sleep(0.1)
-        return None
+            return False
+
+        # Searches again as soon as a structure/property event lands; otherwise backs off
+        wait_until(search, source=self.events, timeout_seconds=timeout_seconds)
+        self._record_lookup(started)
+        return found[0] if found else None
 
     def find_element(self, selector: Selector, timeout_seconds: float = 3.0) -> Optional[Any]:
         return self._find(selector, timeout_seconds)
 
+    def element_at(self, x: float, y: float, text: Optional[str] = None) -> Optional[Any]:
+        try:
+            ctrl = self.uia.ControlFromPoint(int(x), int(y))
+        except Exception:
+            return None
+        wanted = (text or "").strip().lower()
+        label = None
+        for _ in range(5):
+            if not ctrl:
+                break
+            try:
+                kind = ctrl.ControlTypeName
+                matched = not wanted or wanted in (ctrl.Name or "").lower()
+            except Exception:
+                break
+            if kind in _PASSIVE_CONTROLS:
+                if matched and label is None:
+                    label = ctrl
+            elif (matched and (wanted or kind in _PRESSABLE_CONTROLS)) or (label is not None and kind in _PRESSABLE_CONTROLS):
+                return ctrl
+            try:
+                ctrl = ctrl.GetParentControl()
+            except Exception:
+                break
+        return label
+
+    def element_info(self, element: Any) -> Dict[str, Any]:
+        try:
+            return {"role": element.ControlTypeName, "title": element.Name, "value": None, "description": element.HelpText or None}
+        except Exception:
+            return {"role": None, "title": None, "value": None, "description": None}
+
     def press(self, element: Any) -> bool:
         try:
             if element.InvokePattern().IsAvailable:
@@ -128,7 +349,6 @@ class WindowsConnector(DesktopConnector):
                     current.InvokePattern().Invoke()
                 except Exception:
                     pass
-            time.sleep(0.05)
         return current is not None
 
     def scroll_to(self, selector: Selector, timeout_seconds: float = 3.0) -> bool:
@@ -144,13 +364,15 @@ class WindowsConnector(DesktopConnector):
         return True
 
     def wait_for(self, expect: Selector, state: Optional[Dict[str, Any]] = None, timeout_seconds: float = 3.0) -> bool:
-        start = time.time()
-        while time.time() - start < timeout_seconds:
-            if self._find(expect, 0.2) is not None:
-                return True
-            time.sleep(0.1)
-        return False
+        return self._find(expectation_selector(expect), timeout_seconds) is not None
 
     def get_element_bounds(self, element: Any) -> Tuple[float, float, float, float]:
         r = element.BoundingRectangle
         return (float(r.left), float(r.top), float(r.width()), float(r.height()))
+
+    def close(self) -> None:
+        # Removes the UIA event handlers and stops the event thread
+        close = getattr(self.events, "close", None)
+        if close is not None:
+            close()
+        self._elements.clear()
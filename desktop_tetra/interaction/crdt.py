@@ -3,61 +3,128 @@ from __future__ import annotations
 import threading
 import time
 import uuid
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Optional
 
 
 class CRDTStore:
     def __init__(self) -> None:
         self._lock = threading.RLock()
-        self._doc: Dict[str, Any] = {"nodes": {}, "order": []}
+        # order is an insertion-ordered dict used as a set: O(1) membership and removal at any size
+        self._doc: Dict[str, Any] = {"nodes": {}, "order": {}}
+        # role -> ids with that role, so role-filtered lookups skip the rest of the tree
+        self._by_role: Dict[Any, Dict[str, None]] = {}
         self._clock = 0
+        # Bumped on every mutation; waiters block on _changed instead of polling snapshots
+        self._version = 0
+        self._changed = threading.Condition(self._lock)
 
     def _tick(self) -> int:
         with self._lock:
             self._clock += 1
             return self._clock
 
+    def _bump(self) -> None:
+        self._version += 1
+        self._changed.notify_all()
+
+    @property
+    def version(self) -> int:
+        with self._lock:
+            return self._version
+
+    def wait_for_change(self, since: int, timeout: float) -> int:
+        with self._changed:
+            if self._version == since:
+                self._changed.wait(max(0.0, timeout))
+            return self._version
+
+    def _index(self, node_id: str, node: Dict[str, Any]) -> None:
+        cur = self._doc["nodes"].get(node_id)
+        if cur is not None and cur.get("role") != node.get("role"):
+            self._unindex(node_id)
+        self._by_role.setdefault(node.get("role"), {})[node_id] = None
+
+    def _unindex(self, node_id: str) -> None:
+        cur = self._doc["nodes"].get(node_id)
+        if cur is not None:
+            ids = self._by_role.get(cur.get("role"))
+            if ids is not None:
+                ids.pop(node_id, None)
+                if not ids:
+                    del self._by_role[cur.get("role")]
+
+    def _put(self, node: Dict[str, Any]) -> str:
+        node_id = node.get("id") or str(uuid.uuid4())
+        node["ts"] = max(node.get("ts", 0), self._tick())
+        self._index(node_id, node)
+        self._doc["nodes"][node_id] = node
+        self._doc["order"].setdefault(node_id, None)
+        return node_id
+
+    def _pop(self, node_id: str) -> None:
+        self._unindex(node_id)
+        self._doc["nodes"].pop(node_id, None)
+        self._doc["order"].pop(node_id, None)
+
     def upsert_node(self, node: Dict[str, Any]) -> str:
         with self._lock:
-            node_id = node.get("id") or str(uuid.uuid4())
-            node["ts"] = max(node.get("ts", 0), self._tick())
-            self._doc["nodes"][node_id] = node
-            if node_id not in self._doc["order"]:
-                self._doc["order"].append(node_id)
+            node_id = self._put(node)
+            self._bump()
             return node_id
 
+    def apply(self, upserts: Iterable[Dict[str, Any]] = (), removals: Iterable[str] = ()) -> int:
+        # Batched mutation: one lock acquisition and one wake-up for waiters, however many nodes change
+        with self._lock:
+            count = 0
+            for node in upserts:
+                self._put(node)
+                count += 1
+            for node_id in removals:
+                self._pop(node_id)
+                count += 1
+            if count:
+                self._bump()
+            return count
+
     def remove_node(self, node_id: str) -> None:
         with self._lock:
-            if node_id in self._doc["nodes"]:
-                del self._doc["nodes"][node_id]
-            if node_id in self._doc["order"]:
-                self._doc["order"].remove(node_id)
+            self._pop(node_id)
+            self._bump()
 
     def merge(self, other: Dict[str, Any]) -> None:
         with self._lock:
             for node_id, node in other.get("nodes", {}).items():
                 cur = self._doc["nodes"].get(node_id)
                 if cur is None or node.get("ts", 0) > cur.get("ts", 0):
+                    self._index(node_id, node)
                     self._doc["nodes"][node_id] = node
             for node_id in other.get("order", []):
-                if node_id not in self._doc["order"]:
-                    self._doc["order"].append(node_id)
+                self._doc["order"].setdefault(node_id, None)
+            self._bump()
+
+    def get(self, node_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            node = self._doc["nodes"].get(node_id)
+            return dict(node) if node is not None else None
 
     def snapshot(self) -> Dict[str, Any]:
         with self._lock:
             nodes = {k: dict(v) for k, v in self._doc["nodes"].items()}
             return {"nodes": nodes, "order": list(self._doc["order"]) }
 
+    def iter_nodes(self, role: Optional[str] = None) -> List[Dict[str, Any]]:
+        # The stored dicts themselves, in order, without copying: writers always upsert a new dict rather than
+        # mutating a stored one, so these stay consistent; callers must treat them as read-only
+        with self._lock:
+            nodes = self._doc["nodes"]
+            # Per-role ids keep insertion order too; only a node whose role changed moves to the end
+            ids = self._by_role.get(role, {}) if role else self._doc["order"]
+            return [nodes[i] for i in ids if i in nodes]
+
     def query(self, role: Optional[str] = None, text_contains: Optional[str] = None) -> List[Dict[str, Any]]:
-        snap = self.snapshot()
         out: List[Dict[str, Any]] = []
-        for node_id in snap["order"]:
-            n = snap["nodes"].get(node_id)
-            if n is None:
-                continue
-            if role and n.get("role") != role:
-                continue
+        for n in self.iter_nodes(role):
             if text_contains and text_contains not in (n.get("title") or ""):
                 continue
-            out.append(n)
+            out.append(dict(n))
         return out
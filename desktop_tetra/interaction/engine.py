@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 import threading
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
 from .livefeed import LiveFeed
 
@@ -35,3 +35,6 @@ class LiveEngine:
 
     def snapshot(self) -> Dict[str, Any]:
         return self.feed.snapshot()
+
+    def iter_nodes(self, role: Optional[str] = None) -> List[Dict[str, Any]]:
+        return self.feed.iter_nodes(role)
@@ -100,5 +100,8 @@ class LiveFeed:
     def snapshot(self) -> Dict[str, Any]:
         return self._crdt.snapshot()
 
+    def iter_nodes(self, role: Optional[str] = None) -> List[Dict[str, Any]]:
+        return self._crdt.iter_nodes(role)
+
     def query(self, role: Optional[str] = None, text_contains: Optional[str] = None) -> List[Dict[str, Any]]:
         return self._crdt.query(role=role, text_contains=text_contains)
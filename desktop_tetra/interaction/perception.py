@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import Any, Dict
+from typing import Any, Dict, List
 
 from .engine import LiveEngine
 
@@ -16,3 +16,12 @@ def get_snapshot() -> Dict[str, Any]:
         if eng is not None:
             return eng.snapshot()
     return LiveEngine.instance().snapshot()
+
+
+def get_nodes() -> List[Dict[str, Any]]:
+    # Read-only view of the current nodes in order; cheaper than get_snapshot, which copies every node
+    if SimEngine is not None:
+        eng = SimEngine.instance_if_running()
+        if eng is not None:
+            return eng.iter_nodes()
+    return LiveEngine.instance().iter_nodes()
@@ -1,17 +1,18 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Tuple, Optional
+from typing import Any, Dict, Iterable, List, Tuple, Optional, Union
 
 from .roles import normalize_role
 
 
-def score_candidates(snapshot: Dict[str, Any], selector: Dict[str, Any], top_k: int = 5) -> List[Tuple[Dict[str, Any], float, Dict[str, Any]]]:
+def score_candidates(snapshot: Union[Dict[str, Any], Iterable[Dict[str, Any]]], selector: Dict[str, Any], top_k: int = 5) -> List[Tuple[Dict[str, Any], float, Dict[str, Any]]]:
+    # snapshot: a store snapshot or the nodes themselves (e.g. iter_nodes())
     role = selector.get("role")
     title = selector.get("title")
     contains = bool(selector.get("contains", True))
+    nodes = (snapshot["nodes"][i] for i in snapshot.get("order", [])) if isinstance(snapshot, dict) else snapshot
     out: List[Tuple[Dict[str, Any], float, Dict[str, Any]]] = []
-    for node_id in snapshot.get("order", []):
-        node = snapshot["nodes"][node_id]
+    for node in nodes:
         nrole = normalize_role(visual_role=node.get("role"))
         score = 0.0
         reasons: Dict[str, Any] = {}
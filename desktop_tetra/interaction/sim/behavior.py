@@ -0,0 +1,262 @@
+from __future__ import annotations
+
+import copy
+import heapq
+import json
+import os
+import re
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+EVENTS = ("press", "set_value", "menu_select", "focus_app", "scroll_to")
+EFFECTS = ("upsert", "set", "remove")
+
+# The original hard-coded sim app, now as data: a window with New and a status line that cycles
+# Idle/Ready every 4 ticks; pressing New sets the status to Ready
+DEMO_BEHAVIOR: Dict[str, Any] = {
+    "name": "demo",
+    "nodes": [
+        {"id": "win:main", "role": "Window", "title": "SimApp", "frame": {"x": 100, "y": 100, "w": 800, "h": 600}},
+        {"id": "btn:new", "role": "Button", "title": "New", "frame": {"x": 140, "y": 180, "w": 120, "h": 36}},
+        {"id": "txt:status", "role": "StaticText", "title": "Idle", "frame": {"x": 140, "y": 240, "w": 200, "h": 20}},
+    ],
+    "cycle": {"id": "txt:status", "field": "title", "values": ["Idle", "Ready"], "ticks": 4},
+    "rules": [
+        {"on": "press", "target": {"id": "btn:new"}, "effects": [{"set": {"id": "txt:status", "title": "Ready"}}]},
+    ],
+}
+
+_STATUS_FRAME = {"x": 140, "y": 560, "w": 300, "h": 20}
+
+# Multi-step workflow: new note -> type body -> Save -> name it in a sheet -> confirm, with delayed UI
+NOTES_SAVE_BEHAVIOR: Dict[str, Any] = {
+    "name": "notes-save",
+    "state": "empty",
+    "strict": True,
+    "latency": {"press": 0.05, "set_value": 0.03, "menu_select": 0.1, "focus_app": 0.2},
+    "nodes": [
+        {"id": "notes:win", "role": "Window", "title": "Notes", "app": "Notes", "frame": {"x": 100, "y": 100, "w": 800, "h": 600}},
+        {"id": "notes:new", "role": "Button", "title": "New Note", "app": "Notes", "frame": {"x": 120, "y": 130, "w": 110, "h": 30}},
+        {"id": "notes:status", "role": "StaticText", "title": "No note", "app": "Notes", "frame": _STATUS_FRAME},
+    ],
+    "rules": [
+        {"on": "focus_app", "app": "Notes"},
+        {"on": "press", "target": {"id": "notes:new"}, "when": "empty", "goto": "editing", "delay": 0.3, "effects": [
+            {"upsert": {"id": "notes:body", "role": "TextArea", "title": "Body", "value": "", "app": "Notes", "frame": {"x": 120, "y": 180, "w": 760, "h": 360}}},
+            {"upsert": {"id": "notes:save", "role": "Button", "title": "Save", "app": "Notes", "frame": {"x": 240, "y": 130, "w": 80, "h": 30}}},
+            {"set": {"id": "notes:status", "title": "Editing"}},
+        ]},
+        {"on": "menu_select", "path": ["File", "New Note"], "when": "empty", "goto": "editing", "delay": 0.3, "effects": [
+            {"upsert": {"id": "notes:body", "role": "TextArea", "title": "Body", "value": "", "app": "Notes", "frame": {"x": 120, "y": 180, "w": 760, "h": 360}}},
+            {"upsert": {"id": "notes:save", "role": "Button", "title": "Save", "app": "Notes", "frame": {"x": 240, "y": 130, "w": 80, "h": 30}}},
+            {"set": {"id": "notes:status", "title": "Editing"}},
+        ]},
+        {"on": "set_value", "target": {"id": "notes:body"}, "when": ["editing", "dirty"], "goto": "dirty", "effects": [
+            {"set": {"id": "notes:status", "title": "Edited"}},
+        ]},
+        {"on": "press", "target": {"id": "notes:save"}, "when": "editing", "result": False, "effects": [
+            {"set": {"id": "notes:status", "title": "Nothing to save"}},
+        ]},
+        {"on": "press", "target": {"id": "notes:save"}, "when": "dirty", "goto": "naming", "delay": 0.2, "effects": [
+            {"upsert": {"id": "notes:sheet", "role": "Sheet", "title": "Save As", "app": "Notes", "frame": {"x": 250, "y": 200, "w": 400, "h": 160}}},
+            {"upsert": {"id": "notes:name", "role": "TextField", "title": "Name", "value": "", "app": "Notes", "frame": {"x": 270, "y": 250, "w": 360, "h": 26}}},
+            {"upsert": {"id": "notes:confirm", "role": "Button", "title": "Confirm", "app": "Notes", "frame": {"x": 540, "y": 310, "w": 90, "h": 30}}},
+        ]},
+        {"on": "set_value", "target": {"id": "notes:name"}, "when": "naming", "set_var": "name"},
+        {"on": "press", "target": {"id": "notes:confirm"}, "when": "naming", "goto": "saved", "delay": 0.5, "effects": [
+            {"remove": ["notes:sheet", "notes:name", "notes:confirm"]},
+            {"set": {"id": "notes:status", "title": "Saved {name}"}},
+        ]},
+    ],
+}
+
+SCENARIOS: Dict[str, Dict[str, Any]] = {"demo": DEMO_BEHAVIOR, "notes-save": NOTES_SAVE_BEHAVIOR}
+
+Behavior = Union[None, str, Dict[str, Any]]
+
+
+class _Vars(dict):
+    def __missing__(self, key: str) -> str:
+        return "{" + key + "}"
+
+
+def _render(value: Any, variables: Dict[str, Any]) -> Any:
+    if isinstance(value, str):
+        if "{" not in value:
+            return value
+        try:
+            return value.format_map(_Vars(variables))
+        except (ValueError, IndexError):
+            # Literal braces that are not placeholders
+            return value
+    if isinstance(value, dict):
+        return {k: _render(v, variables) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_render(v, variables) for v in value]
+    return value
+
+
+def _target_matches(target: Dict[str, Any], element: Any) -> bool:
+    if not isinstance(element, dict):
+        return False
+    for key, wanted in target.items():
+        if key == "title_contains":
+            if str(wanted) not in str(element.get("title") or ""):
+                return False
+        elif element.get(key) != wanted:
+            return False
+    return True
+
+
+def _validate(model: Dict[str, Any]) -> None:
+    for i, rule in enumerate(model.get("rules", [])):
+        if rule.get("on") not in EVENTS:
+            raise ValueError(f"Rule {i}: unknown event {rule.get('on')!r}; expected one of {', '.join(EVENTS)}")
+        for effect in rule.get("effects", []):
+            kinds = [k for k in EFFECTS if k in effect]
+            if len(kinds) != 1:
+                raise ValueError(f"Rule {i}: each effect needs exactly one of {', '.join(EFFECTS)}")
+            if "set" in effect and "id" not in effect["set"]:
+                raise ValueError(f"Rule {i}: set effect needs an id")
+        if "value_pattern" in rule:
+            re.compile(rule["value_pattern"])
+    cycle = model.get("cycle")
+    if cycle is not None and not (cycle.get("id") and cycle.get("values")):
+        raise ValueError("cycle needs an id and a non-empty values list")
+
+
+def load_behavior(behavior: Behavior = None) -> Dict[str, Any]:
+    # Accepts a scenario name, a JSON file path, or a model dict; None is the demo model
+    if behavior is None:
+        model = DEMO_BEHAVIOR
+    elif isinstance(behavior, str):
+        if behavior in SCENARIOS:
+            model = SCENARIOS[behavior]
+        elif os.path.exists(os.path.expanduser(behavior)):
+            with open(os.path.expanduser(behavior), "r", encoding="utf-8") as f:
+                model = json.load(f)
+        else:
+            raise ValueError(f"Unknown behavior scenario or file: {behavior}")
+    else:
+        model = behavior
+    model = copy.deepcopy(model)
+    _validate(model)
+    return model
+
+
+class BehaviorModel:
+    # State machine over sim actions; rules are indexed per event (and per target id) so dispatch stays cheap
+    def __init__(self, model: Dict[str, Any]) -> None:
+        self.name = model.get("name", "custom")
+        self.state: Optional[str] = model.get("state")
+        self.strict = bool(model.get("strict", False))
+        self.latency: Dict[str, float] = {k: float(v) for k, v in (model.get("latency") or {}).items()}
+        self.nodes: List[Dict[str, Any]] = list(model.get("nodes", []))
+        self.vars: Dict[str, Any] = dict(model.get("vars") or {})
+        # Optional per-tick field cycle on one node, independent of any action
+        self.cycle: Optional[Dict[str, Any]] = model.get("cycle")
+        self._by_id: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        self._by_event: Dict[str, List[Dict[str, Any]]] = {}
+        for order, rule in enumerate(model.get("rules", [])):
+            rule = dict(rule, _order=order)
+            target_id = (rule.get("target") or {}).get("id")
+            if target_id is not None:
+                self._by_id.setdefault((rule["on"], target_id), []).append(rule)
+            else:
+                self._by_event.setdefault(rule["on"], []).append(rule)
+        self._lock = threading.RLock()
+        # (due time, seq, effects, variables) for delayed effects
+        self._pending: List[Tuple[float, int, List[Dict[str, Any]], Dict[str, Any]]] = []
+        self._seq = 0
+        self.stats: Dict[str, int] = {"matched": 0, "unmatched": 0, "effects": 0, "transitions": 0, "missing": 0}
+
+    def _applies(self, rule: Dict[str, Any], params: Dict[str, Any]) -> bool:
+        when = rule.get("when")
+        if when is not None and self.state not in (when if isinstance(when, list) else [when]):
+            return False
+        event = rule["on"]
+        if "target" in rule and not _target_matches(rule["target"], params.get("element")):
+            return False
+        if event == "set_value":
+            value = str(params.get("value"))
+            if "value" in rule and str(rule["value"]) != value:
+                return False
+            if "value_pattern" in rule and not re.search(rule["value_pattern"], value):
+                return False
+        if event == "menu_select" and "path" in rule:
+            if [p.lower() for p in rule["path"]] != [str(p).lower() for p in params.get("path") or []]:
+                return False
+        if "app" in rule and params.get("app") is not None and str(rule["app"]).lower() != str(params["app"]).lower():
+            return False
+        return True
+
+    def match(self, event: str, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        element = params.get("element")
+        candidates = list(self._by_event.get(event, ()))
+        if isinstance(element, dict) and element.get("id") is not None:
+            candidates += self._by_id.get((event, element["id"]), [])
+        # File order decides between overlapping rules
+        for rule in sorted(candidates, key=lambda r: r["_order"]):
+            if self._applies(rule, params):
+                return rule
+        return None
+
+    def dispatch(self, event: str, params: Dict[str, Any], now: float, apply: Callable[[List[Dict[str, Any]], Dict[str, Any]], None]) -> Tuple[bool, float]:
+        # Returns (action result, injected latency); immediate effects go through apply(), delayed ones wait for due()
+        with self._lock:
+            rule = self.match(event, params)
+            latency = float(self.latency.get(event, 0.0))
+            if rule is None:
+                self.stats["unmatched"] += 1
+                return not self.strict, latency
+            self.stats["matched"] += 1
+            variables = dict(self.vars, value=params.get("value"), app=params.get("app"))
+            if rule.get("set_var"):
+                self.vars[rule["set_var"]] = params.get("value")
+                variables[rule["set_var"]] = params.get("value")
+            if rule.get("goto") is not None and rule["goto"] != self.state:
+                self.state = rule["goto"]
+                self.stats["transitions"] += 1
+            immediate: List[Dict[str, Any]] = []
+            for effect in rule.get("effects", []):
+                delay = float(effect.get("after", rule.get("delay", 0.0)))
+                if delay <= 0:
+                    immediate.append(effect)
+                else:
+                    self._seq += 1
+                    heapq.heappush(self._pending, (now + delay, self._seq, [effect], variables))
+            if immediate:
+                apply(immediate, variables)
+            return bool(rule.get("result", True)), float(rule.get("latency", latency))
+
+    def due(self, now: float) -> List[Tuple[List[Dict[str, Any]], Dict[str, Any]]]:
+        with self._lock:
+            out = []
+            while self._pending and self._pending[0][0] <= now:
+                _, _, effects, variables = heapq.heappop(self._pending)
+                out.append((effects, variables))
+            return out
+
+    def cycle_value(self, tick: int) -> Any:
+        values = self.cycle["values"]  # type: ignore[index]
+        return values[(tick // max(1, int(self.cycle.get("ticks", 1)))) % len(values)]  # type: ignore[union-attr]
+
+    def resolve(self, effects: List[Dict[str, Any]], variables: Dict[str, Any], current: Callable[[str], Optional[Dict[str, Any]]]) -> Tuple[List[Dict[str, Any]], List[str]]:
+        # Turns effects into store upserts/removals; "set" merges into the node as it is now and skips absent nodes
+        upserts: List[Dict[str, Any]] = []
+        removals: List[str] = []
+        for effect in effects:
+            self.stats["effects"] += 1
+            if "upsert" in effect:
+                upserts.append(_render(effect["upsert"], variables))
+            elif "set" in effect:
+                fields = _render(effect["set"], variables)
+                base = current(fields["id"])
+                if base is None:
+                    self.stats["missing"] += 1
+                    continue
+                upserts.append(dict(base, **fields))
+            else:
+                ids = effect["remove"]
+                removals.extend(ids if isinstance(ids, list) else [ids])
+        return upserts, removals
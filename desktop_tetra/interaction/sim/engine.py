@@ -2,28 +2,52 @@ from __future__ import annotations
 
 import threading
 import time
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Union
 
+from ...clock import SYSTEM_CLOCK, Clock
 from ..crdt import CRDTStore
+from .behavior import Behavior, BehaviorModel, load_behavior
+from .world import WorldChurn, build_world, world_spec
+
+World = Union[None, str, Dict[str, Any]]
 
 
 class SimEngine:
     _instance: Optional["SimEngine"] = None
     _lock = threading.RLock()
 
-    def __init__(self, tick_hz: int = 4, seed: int = 0) -> None:
+    def __init__(self, tick_hz: int = 4, seed: int = 0, world: World = None, clock: Optional[Clock] = None, behavior: Behavior = None) -> None:
         self.store = CRDTStore()
         self.tick_hz = max(1, tick_hz)
         self.seed = seed
+        # With a VirtualClock, ticks are clock events instead of a thread, and time only moves when someone waits
+        self.clock: Clock = clock if clock is not None else SYSTEM_CLOCK
+        self._tick_handle: Optional[int] = None
+        self._t = 0
+        self._churn: Optional[WorldChurn] = None
+        # App behavior (see sim.behavior); None is the demo app
+        self.behavior = BehaviorModel(load_behavior(behavior))
+        # Generated apps/windows/menus/lists around the demo window, plus per-tick churn (see sim.world)
+        self.world = world_spec(world)
+        self.churn_stats: Dict[str, int] = {}
         self._stop = threading.Event()
         self._thr: Optional[threading.Thread] = None
         self._running = False
 
     @classmethod
-    def instance(cls, tick_hz: int = 4, seed: int = 0) -> "SimEngine":
+    def instance(cls, tick_hz: int = 4, seed: int = 0, world: World = None, clock: Optional[Clock] = None, behavior: Behavior = None) -> "SimEngine":
         with cls._lock:
             if cls._instance is None:
-                cls._instance = SimEngine(tick_hz=tick_hz, seed=seed)
+                cls._instance = SimEngine(tick_hz=tick_hz, seed=seed, world=world, clock=clock, behavior=behavior)
+            return cls._instance
+
+    @classmethod
+    def reset(cls, tick_hz: int = 4, seed: int = 0, world: World = None, clock: Optional[Clock] = None, behavior: Behavior = None) -> "SimEngine":
+        # Fresh world for this process; used to isolate consecutive runs in one worker
+        with cls._lock:
+            if cls._instance is not None:
+                cls._instance.stop()
+            cls._instance = SimEngine(tick_hz=tick_hz, seed=seed, world=world, clock=clock, behavior=behavior)
             return cls._instance
 
     @classmethod
@@ -34,6 +58,11 @@ class SimEngine:
     def start(self) -> None:
         if self._running:
             return
+        if self.clock.virtual:
+            self._seed()
+            self._tick_handle = self.clock.call_later(0.0, self._tick, period=1.0 / float(self.tick_hz))  # type: ignore[union-attr]
+            self._running = True
+            return
         self._stop.clear()
         self._thr = threading.Thread(target=self._run, daemon=True)
         self._thr.start()
@@ -42,6 +71,9 @@ class SimEngine:
     def stop(self) -> None:
         if not self._running:
             return
+        if self._tick_handle is not None:
+            self.clock.cancel(self._tick_handle)  # type: ignore[union-attr]
+            self._tick_handle = None
         self._stop.set()
         if self._thr:
             self._thr.join(timeout=2)
@@ -49,26 +81,51 @@ class SimEngine:
 
     def _run(self) -> None:
         period = 1.0 / float(self.tick_hz)
-        # Seed a simple world: a window with a button and a status text
-        now = time.time()
-        self.store.upsert_node({
-            "id": "win:main", "role": "Window", "title": "SimApp", "frame": {"x": 100, "y": 100, "w": 800, "h": 600}, "ts": now
-        })
-        self.store.upsert_node({
-            "id": "btn:new", "role": "Button", "title": "New", "frame": {"x": 140, "y": 180, "w": 120, "h": 36}, "ts": now
-        })
-        self.store.upsert_node({
-            "id": "txt:status", "role": "StaticText", "title": "Idle", "frame": {"x": 140, "y": 240, "w": 200, "h": 20}, "ts": now
-        })
-        t = 0
+        self._seed()
         while not self._stop.is_set():
-            # For demo, toggle status text periodically
-            label = "Idle" if (t % 8) < 4 else "Ready"
-            self.store.upsert_node({
-                "id": "txt:status", "role": "StaticText", "title": label, "frame": {"x": 140, "y": 240, "w": 200, "h": 20}, "ts": time.time()
-            })
-            t += 1
+            self._tick()
             time.sleep(period)
 
+    def _seed(self) -> None:
+        now = self.clock.time()
+        self.store.apply(dict(node, ts=now) for node in self.behavior.nodes)
+        nodes, self._churn = build_world(self.world, seed=self.seed)
+        self.store.apply(nodes)
+        self._t = 0
+
+    def _tick(self) -> None:
+        upserts: List[Dict[str, Any]] = []
+        removals: List[str] = []
+        cycle = self.behavior.cycle
+        if cycle is not None:
+            current = self.store.get(cycle["id"])
+            if current is not None:
+                upserts.append(dict(current, **{cycle.get("field", "title"): self.behavior.cycle_value(self._t), "ts": self.clock.time()}))
+        if self._churn is not None:
+            changed, removals = self._churn.tick()
+            upserts.extend(changed)
+            self.churn_stats = dict(self._churn.stats)
+        # Delayed behavior effects land on the first tick at or after they fall due
+        for effects, variables in self.behavior.due(self.clock.time()):
+            due_upserts, due_removals = self.behavior.resolve(effects, variables, self.store.get)
+            upserts.extend(due_upserts)
+            removals.extend(due_removals)
+        self.store.apply(upserts, removals)
+        self._t += 1
+
+    def _apply_effects(self, effects: List[Dict[str, Any]], variables: Dict[str, Any]) -> None:
+        upserts, removals = self.behavior.resolve(effects, variables, self.store.get)
+        self.store.apply(upserts, removals)
+
+    def dispatch(self, event: str, **params: Any) -> bool:
+        # Runs an app action through the behavior model; injected latency is spent on the sim clock
+        ok, latency = self.behavior.dispatch(event, params, self.clock.time(), self._apply_effects)
+        if latency > 0:
+            self.clock.sleep(latency)
+        return ok
+
     def snapshot(self) -> Dict[str, Any]:
         return self.store.snapshot()
+
+    def iter_nodes(self, role: Optional[str] = None) -> List[Dict[str, Any]]:
+        return self.store.iter_nodes(role)
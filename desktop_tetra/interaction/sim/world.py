@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import json
+import os
+import random
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+# Per-app shape; node count is roughly apps * (1 + menus * (1 + menu_items) + windows * (1 + controls + lists * (1 + rows)))
+WORLD_PRESETS: Dict[str, Dict[str, Any]] = {
+    "demo": {"apps": 0},
+    "small": {"apps": 3, "windows": 2, "menus": 5, "menu_items": 8, "controls": 10, "lists": 1, "rows": 20},
+    "medium": {"apps": 10, "windows": 4, "menus": 8, "menu_items": 12, "controls": 30, "lists": 2, "rows": 100},
+    "large": {"apps": 20, "windows": 5, "menus": 8, "menu_items": 12, "controls": 40, "lists": 2, "rows": 450},
+    "huge": {"apps": 40, "windows": 10, "menus": 10, "menu_items": 15, "controls": 50, "lists": 4, "rows": 600},
+}
+DEFAULT_SHAPE: Dict[str, Any] = {"apps": 0, "windows": 1, "menus": 0, "menu_items": 0, "controls": 0, "lists": 0, "rows": 0}
+# Nodes changed per tick; fractional rates accumulate across ticks
+DEFAULT_CHURN: Dict[str, float] = {"appear": 0.0, "remove": 0.0, "move": 0.0, "text": 0.0}
+
+WORDS = [
+    "Open", "Save", "Export", "Import", "Print", "Share", "Delete", "Archive", "Rename", "Duplicate",
+    "Search", "Filter", "Sort", "Refresh", "Sync", "Settings", "Account", "Profile", "Help", "About",
+    "Insert", "Format", "Align", "Bold", "Italic", "Font", "Color", "Layout", "Preview", "Publish",
+    "Invoice", "Report", "Contact", "Project", "Task", "Note", "Event", "Message", "Folder", "Photo",
+]
+MENU_NAMES = ["File", "Edit", "View", "Insert", "Format", "Tools", "Window", "Help", "History", "Bookmarks", "Go", "Account"]
+CONTROL_ROLES = ["Button", "Button", "Button", "TextField", "CheckBox", "StaticText", "PopUpButton", "Tab"]
+
+WINDOW_W, WINDOW_H = 900, 640
+CONTROL_W, CONTROL_H = 120, 28
+ROW_H = 22
+
+
+def world_spec(world: Union[None, str, Dict[str, Any]] = None) -> Dict[str, Any]:
+    # Accepts a preset name, a JSON file path, or a dict (optionally {"preset": ..., overrides})
+    if world is None:
+        raw: Dict[str, Any] = {}
+    elif isinstance(world, str):
+        if world in WORLD_PRESETS:
+            raw = {"preset": world}
+        elif os.path.exists(os.path.expanduser(world)):
+            with open(os.path.expanduser(world), "r", encoding="utf-8") as f:
+                raw = json.load(f)
+        else:
+            raise ValueError(f"Unknown world preset or file: {world}")
+    else:
+        raw = dict(world)
+    preset = raw.pop("preset", None)
+    if preset is not None and preset not in WORLD_PRESETS:
+        raise ValueError(f"Unknown world preset: {preset}")
+    spec = dict(DEFAULT_SHAPE, **WORLD_PRESETS.get(preset or "demo", {}))
+    churn = dict(DEFAULT_CHURN, **(WORLD_PRESETS.get(preset or "demo", {}).get("churn") or {}))
+    churn.update(raw.pop("churn", None) or {})
+    spec.update(raw)
+    spec["churn"] = churn
+    return spec
+
+
+def estimate_nodes(spec: Dict[str, Any]) -> int:
+    per_window = 1 + spec["controls"] + spec["lists"] * (1 + spec["rows"])
+    per_app = 1 + (1 + spec["menus"] * (1 + spec["menu_items"]) if spec["menus"] else 0) + spec["windows"] * per_window
+    return spec["apps"] * per_app
+
+
+def _frame(x: float, y: float, w: float, h: float) -> Dict[str, float]:
+    return {"x": x, "y": y, "w": w, "h": h}
+
+
+def _title(rng: random.Random, n: int) -> str:
+    return f"{rng.choice(WORDS)} {n}"
+
+
+def generate_world(spec: Dict[str, Any], seed: int = 0) -> Iterator[Dict[str, Any]]:
+    # Deterministic for a given (spec, seed); parents are always yielded before their children
+    rng = random.Random(seed)
+    for a in range(spec["apps"]):
+        app = f"App{a}"
+        app_id = f"app{a}"
+        yield {"id": app_id, "role": "Application", "title": app, "app": app, "parent": None, "frame": _frame(0, 0, 1920, 1080)}
+        if spec["menus"]:
+            bar_id = f"{app_id}:menubar"
+            yield {"id": bar_id, "role": "MenuBar", "title": "", "app": app, "parent": app_id, "frame": _frame(0, 0, 1920, 24)}
+            for m in range(spec["menus"]):
+                menu_id = f"{bar_id}:m{m}"
+                name = MENU_NAMES[m] if m < len(MENU_NAMES) else f"Menu {m}"
+                yield {"id": menu_id, "role": "MenuBarItem", "title": name, "app": app, "parent": bar_id, "frame": _frame(60 + m * 70, 0, 64, 24)}
+                for i in range(spec["menu_items"]):
+                    yield {"id": f"{menu_id}:i{i}", "role": "MenuItem", "title": _title(rng, i), "app": app, "parent": menu_id, "frame": _frame(60 + m * 70, 24 + i * ROW_H, 220, ROW_H)}
+        for w in range(spec["windows"]):
+            win_id = f"{app_id}:win{w}"
+            wx, wy = 40 + (w % 4) * 60 + a % 10 * 20, 60 + (w % 4) * 40
+            yield {"id": win_id, "role": "Window", "title": f"{app} — {_title(rng, w)}", "app": app, "parent": app_id, "frame": _frame(wx, wy, WINDOW_W, WINDOW_H)}
+            per_row = WINDOW_W // (CONTROL_W + 10)
+            for c in range(spec["controls"]):
+                cx = wx + 10 + (c % per_row) * (CONTROL_W + 10)
+                cy = wy + 40 + (c // per_row) * (CONTROL_H + 8)
+                role = rng.choice(CONTROL_ROLES)
+                node = {"id": f"{win_id}:c{c}", "role": role, "title": _title(rng, c), "app": app, "parent": win_id, "frame": _frame(cx, cy, CONTROL_W, CONTROL_H)}
+                if role == "TextField":
+                    node["value"] = ""
+                yield node
+            for li in range(spec["lists"]):
+                list_id = f"{win_id}:list{li}"
+                lx = wx + 10 + li * (WINDOW_W // max(1, spec["lists"]))
+                yield {"id": list_id, "role": "List", "title": "", "app": app, "parent": win_id, "frame": _frame(lx, wy + 240, WINDOW_W // max(1, spec["lists"]) - 20, WINDOW_H - 260)}
+                for r in range(spec["rows"]):
+                    # Rows past the visible area are laid out off-screen, as in a real scrolled list
+                    yield {"id": f"{list_id}:r{r}", "role": "Row", "title": _title(rng, r), "app": app, "parent": list_id, "frame": _frame(lx, wy + 240 + r * ROW_H, WINDOW_W // max(1, spec["lists"]) - 20, ROW_H)}
+
+
+class WorldChurn:
+    # Mutates a generated world a few nodes per tick; holds the same node dicts the store does
+    def __init__(self, churn: Dict[str, float], seed: int = 0) -> None:
+        self.rates = dict(DEFAULT_CHURN, **churn)
+        self.rng = random.Random(f"{seed}:churn")
+        self._nodes: Dict[str, Dict[str, Any]] = {}
+        # Leaf ids in a list plus their positions, so random pick and removal are O(1)
+        self._leaves: List[str] = []
+        self._pos: Dict[str, int] = {}
+        self._containers: List[str] = []
+        self._credit: Dict[str, float] = {k: 0.0 for k in DEFAULT_CHURN}
+        self._spawned = 0
+        self.stats: Dict[str, int] = {k: 0 for k in DEFAULT_CHURN}
+
+    @property
+    def active(self) -> bool:
+        return any(v > 0 for v in self.rates.values())
+
+    def track(self, node: Dict[str, Any]) -> None:
+        node_id = node["id"]
+        self._nodes[node_id] = node
+        if node.get("role") in ("Window", "List"):
+            self._containers.append(node_id)
+        elif node.get("role") not in ("Application", "MenuBar", "MenuBarItem"):
+            self._pos[node_id] = len(self._leaves)
+            self._leaves.append(node_id)
+
+    def _drop(self, node_id: str) -> None:
+        i = self._pos.pop(node_id)
+        last = self._leaves.pop()
+        if last != node_id:
+            self._leaves[i] = last
+            self._pos[last] = i
+        self._nodes.pop(node_id, None)
+
+    def _count(self, kind: str) -> int:
+        self._credit[kind] += self.rates.get(kind, 0.0)
+        n = int(self._credit[kind])
+        self._credit[kind] -= n
+        return n
+
+    def tick(self) -> Tuple[List[Dict[str, Any]], List[str]]:
+        upserts: Dict[str, Dict[str, Any]] = {}
+        removals: List[str] = []
+        rng = self.rng
+        for _ in range(self._count("appear")):
+            if not self._containers:
+                break
+            parent = self._nodes.get(rng.choice(self._containers))
+            if parent is None:
+                continue
+            self._spawned += 1
+            f = parent["frame"]
+            node = {
+                "id": f"{parent['id']}:new{self._spawned}", "role": rng.choice(CONTROL_ROLES), "title": _title(rng, self._spawned),
+                "app": parent.get("app"), "parent": parent["id"],
+                "frame": _frame(f["x"] + rng.randrange(0, max(1, int(f["w"]) - CONTROL_W)), f["y"] + rng.randrange(0, max(1, int(f["h"]) - CONTROL_H)), CONTROL_W, CONTROL_H),
+            }
+            self.track(node)
+            upserts[node["id"]] = node
+            self.stats["appear"] += 1
+        for _ in range(self._count("remove")):
+            if not self._leaves:
+                break
+            node_id = self._leaves[rng.randrange(len(self._leaves))]
+            self._drop(node_id)
+            upserts.pop(node_id, None)
+            removals.append(node_id)
+            self.stats["remove"] += 1
+        for kind in ("move", "text"):
+            for _ in range(self._count(kind)):
+                if not self._leaves:
+                    break
+                node_id = self._leaves[rng.randrange(len(self._leaves))]
+                # Replace rather than mutate: snapshots already handed out keep their old copy
+                node = dict(upserts.get(node_id) or self._nodes[node_id])
+                if kind == "move":
+                    f = node["frame"]
+                    node["frame"] = _frame(f["x"] + rng.randint(-20, 20), f["y"] + rng.randint(-20, 20), f["w"], f["h"])
+                else:
+                    node["title"] = _title(rng, rng.randrange(1000))
+                self._nodes[node_id] = node
+                upserts[node_id] = node
+                self.stats[kind] += 1
+        return list(upserts.values()), removals
+
+
+def build_world(spec: Dict[str, Any], seed: int = 0) -> Tuple[Iterator[Dict[str, Any]], Optional[WorldChurn]]:
+    # Nodes to insert plus the churn driver that must see each of them; churn is None for a static world
+    churn = WorldChurn(spec.get("churn") or {}, seed=seed)
+    if not churn.active:
+        return generate_world(spec, seed), None
+
+    def tracked() -> Iterator[Dict[str, Any]]:
+        for node in generate_world(spec, seed):
+            churn.track(node)
+            yield node
+
+    return tracked(), churn
@@ -1,53 +1,149 @@
 from __future__ import annotations
 
+import asyncio
 import json
 import os
-from typing import Any, Dict, List, Optional
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as CallTimeout
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from .agent_core.step_stream import StepStream
+from .clock import SYSTEM_CLOCK, Clock
+
+DEFAULT_REQUEST_TIMEOUT = 60.0
+DEFAULT_RETRIES = 2
+# Client errors that will not change on retry (bad request, auth, missing model)
+NON_RETRYABLE_STATUS = (400, 401, 403, 404, 422)
+
+# SDK clients keep their own HTTP connection pools; sharing them lets every Agent reuse warm connections
+_CLIENTS: Dict[Tuple[Any, ...], Any] = {}
+_CLIENTS_LOCK = threading.Lock()
+# Separate pools: a hedged call waits on attempts that themselves run on the call pool
+_CALL_POOL = ThreadPoolExecutor(max_workers=16, thread_name_prefix="llm-call")
+_HEDGE_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="llm-hedge")
+# Set by ResilientProvider for the duration of one attempt, so the HTTP request itself gives up in time
+_ATTEMPT_TIMEOUT: "ContextVar[Optional[float]]" = ContextVar("desktop_tetra_attempt_timeout", default=None)
+
+
+def request_timeout(default: float) -> float:
+    limit = _ATTEMPT_TIMEOUT.get()
+    return default if limit is None else min(default, limit)
+
+
+def _shared_client(key: Tuple[Any, ...], factory: Callable[[], Any]) -> Any:
+    with _CLIENTS_LOCK:
+        client = _CLIENTS.get(key)
+        if client is None:
+            client = factory()
+            _CLIENTS[key] = client
+        return client
+
+
+def supports_streaming(provider: "LLMProvider") -> bool:
+    # Wrappers (retry, hedge) stream only when what they wrap does
+    inner = getattr(provider, "inner", None)
+    if isinstance(inner, LLMProvider):
+        return supports_streaming(inner)
+    hedged = getattr(provider, "hedged", None)
+    if hedged is not None:
+        return all(supports_streaming(p) for p in hedged)
+    return type(provider).stream_text is not LLMProvider.stream_text
+
+
+def _open_stream(provider: "LLMProvider", system: str, messages: List[Dict[str, str]]) -> Tuple[Iterator[str], str]:
+    # Blocks until the stream's first chunk, so callers can time or race that moment
+    it = iter(provider.stream_text(system=system, messages=messages))
+    return it, next(it, "")
 
 
 class LLMProvider:
     def generate_json(self, system: str, messages: List[Dict[str, str]]) -> Dict[str, Any]:  # pragma: no cover - interface
         raise NotImplementedError
 
+    def stream_text(self, system: str, messages: List[Dict[str, str]]) -> Iterator[str]:  # pragma: no cover - interface
+        raise NotImplementedError
+
+    def generate_json_stream(self, system: str, messages: List[Dict[str, str]]) -> StepStream:
+        # Providers without streaming still work: the whole plan arrives as one chunk
+        if not supports_streaming(self):
+            return StepStream.from_plan(self.generate_json(system=system, messages=messages))
+        return StepStream(self.stream_text(system=system, messages=messages))
+
+    async def agenerate_json(self, system: str, messages: List[Dict[str, str]]) -> Dict[str, Any]:
+        # Providers without an async client run the blocking call on a worker thread
+        return await asyncio.to_thread(self.generate_json, system, messages)
+
 
 class OpenAICompatProvider(LLMProvider):
-    def __init__(self, model: str, api_key: Optional[str] = None, base_url: Optional[str] = None) -> None:
+    def __init__(self, model: str, api_key: Optional[str] = None, base_url: Optional[str] = None, timeout: float = DEFAULT_REQUEST_TIMEOUT) -> None:
         self.model = model
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
         self.base_url = base_url or os.getenv("OPENAI_BASE_URL")
+        self.timeout = timeout
         try:
-            from openai import OpenAI  # type: ignore
+            from openai import AsyncOpenAI, OpenAI  # type: ignore
         except Exception as e:  # noqa: BLE001
             raise RuntimeError("openai package is required for OpenAI-compatible providers") from e
-        self._client = OpenAI(api_key=self.api_key, base_url=self.base_url)
+        # Retries are handled by ResilientProvider, so the SDK's own are disabled
+        key = (self.api_key, self.base_url, timeout)
+        self._client = _shared_client(("openai",) + key, lambda: OpenAI(api_key=self.api_key, base_url=self.base_url, timeout=timeout, max_retries=0))
+        self._async_client = _shared_client(("openai-async",) + key, lambda: AsyncOpenAI(api_key=self.api_key, base_url=self.base_url, timeout=timeout, max_retries=0))
 
-    def generate_json(self, system: str, messages: List[Dict[str, str]]) -> Dict[str, Any]:
+    def _request(self, system: str, messages: List[Dict[str, str]]) -> Dict[str, Any]:
         # Merge system into first position
         full_messages = [{"role": "system", "content": system}] + messages
-        resp = self._client.chat.completions.create(  # type: ignore[attr-defined]
-            model=self.model,
-            messages=full_messages,
-            temperature=0.2,
-            response_format={"type": "json_object"},
-        )
+        return {
+            "model": self.model,
+            "messages": full_messages,
+            "temperature": 0.2,
+            "response_format": {"type": "json_object"},
+            "timeout": request_timeout(self.timeout),
+        }
+
+    def generate_json(self, system: str, messages: List[Dict[str, str]]) -> Dict[str, Any]:
+        resp = self._client.chat.completions.create(**self._request(system, messages))  # type: ignore[attr-defined]
         content = resp.choices[0].message.content  # type: ignore[index]
         if not content:
             raise RuntimeError("Empty response from model")
         return json.loads(content)
 
+    async def agenerate_json(self, system: str, messages: List[Dict[str, str]]) -> Dict[str, Any]:
+        resp = await self._async_client.chat.completions.create(**self._request(system, messages))  # type: ignore[attr-defined]
+        content = resp.choices[0].message.content  # type: ignore[index]
+        if not content:
+            raise RuntimeError("Empty response from model")
+        return json.loads(content)
+
+    def stream_text(self, system: str, messages: List[Dict[str, str]]) -> Iterator[str]:
+        stream = self._client.chat.completions.create(stream=True, **self._request(system, messages))  # type: ignore[attr-defined]
+        for chunk in stream:
+            choices = getattr(chunk, "choices", None)
+            if not choices:
+                continue
+            text = getattr(choices[0].delta, "content", None)
+            if text:
+                yield text
+
 
 class AnthropicProvider(LLMProvider):
-    def __init__(self, model: str, api_key: Optional[str] = None) -> None:
+    def __init__(self, model: str, api_key: Optional[str] = None, timeout: float = DEFAULT_REQUEST_TIMEOUT) -> None:
         self.model = model
         self.api_key = api_key or os.getenv("ANTHROPIC_API_KEY")
+        self.timeout = timeout
         try:
             import anthropic  # type: ignore
         except Exception as e:  # noqa: BLE001
             raise RuntimeError("anthropic package is required for Claude provider") from e
         self._anthropic = anthropic
-        self._client = anthropic.Anthropic(api_key=self.api_key)
+        key = (self.api_key, timeout)
+        self._client = _shared_client(("anthropic",) + key, lambda: anthropic.Anthropic(api_key=self.api_key, timeout=timeout, max_retries=0))
+        self._async_client = _shared_client(("anthropic-async",) + key, lambda: anthropic.AsyncAnthropic(api_key=self.api_key, timeout=timeout, max_retries=0))
 
-    def generate_json(self, system: str, messages: List[Dict[str, str]]) -> Dict[str, Any]:
+    def _request(self, system: str, messages: List[Dict[str, str]]) -> Dict[str, Any]:
         # Anthropic expects system separately and content array
         conv: List[Dict[str, Any]] = []
         for m in messages:
@@ -59,6 +155,7 @@ class AnthropicProvider(LLMProvider):
             "temperature": 0.2,
             "system": system,
             "messages": conv,
+            "timeout": request_timeout(self.timeout),
         }
         # Try structured output if SDK supports it
         try:
@@ -66,7 +163,15 @@ class AnthropicProvider(LLMProvider):
             kwargs["response_format"] = {"type": "json_object"}
         except Exception:
             pass
-        resp = self._client.messages.create(**kwargs)  # type: ignore[arg-type]
+        return kwargs
+
+    def generate_json(self, system: str, messages: List[Dict[str, str]]) -> Dict[str, Any]:
+        return self._parse(self._client.messages.create(**self._request(system, messages)))  # type: ignore[arg-type]
+
+    async def agenerate_json(self, system: str, messages: List[Dict[str, str]]) -> Dict[str, Any]:
+        return self._parse(await self._async_client.messages.create(**self._request(system, messages)))  # type: ignore[arg-type]
+
+    def _parse(self, resp: Any) -> Dict[str, Any]:
         # Extract text
         parts = getattr(resp, "content", None)
         text = None
@@ -84,27 +189,311 @@ class AnthropicProvider(LLMProvider):
             raise RuntimeError("Empty response from Claude")
         return json.loads(text)
 
+    def stream_text(self, system: str, messages: List[Dict[str, str]]) -> Iterator[str]:
+        with self._client.messages.stream(**self._request(system, messages)) as stream:  # type: ignore[arg-type]
+            for text in stream.text_stream:
+                if text:
+                    yield text
+
+
+class StubProvider(LLMProvider):
+    # Offline provider for the sim: returns a fixed plan after an injected delay
+    DEFAULT_PLAN: Dict[str, Any] = {
+        "steps": [
+            {"action": "press", "params": {"role": "Button", "title": "New"}, "expect": {"appears": {"role": "StaticText", "title": "Ready"}}},
+        ]
+    }
+
+    def __init__(self, plan: Optional[Dict[str, Any]] = None, latency: Optional[float] = None, chunk_size: int = 16, clock: Optional[Clock] = None) -> None:
+        env_plan = os.getenv("DESKTOP_TETRA_STUB_PLAN")
+        self.plan = plan if plan is not None else (json.loads(env_plan) if env_plan else self.DEFAULT_PLAN)
+        self.latency = latency if latency is not None else float(os.getenv("DESKTOP_TETRA_STUB_LATENCY", "0.5"))
+        self.chunk_size = max(1, chunk_size)
+        # Latency is spent on this clock, so under a VirtualClock the sim keeps ticking while the "model" thinks
+        self.clock: Clock = clock if clock is not None else SYSTEM_CLOCK
+        self.calls = 0
+
+    def generate_json(self, system: str, messages: List[Dict[str, str]]) -> Dict[str, Any]:
+        self.calls += 1
+        self.clock.sleep(self.latency)
+        return json.loads(json.dumps(self.plan))
 
-def build_provider(provider: str, model: str, api_key: Optional[str] = None, base_url: Optional[str] = None) -> LLMProvider:
+    async def agenerate_json(self, system: str, messages: List[Dict[str, str]]) -> Dict[str, Any]:
+        self.calls += 1
+        if self.clock.virtual:
+            self.clock.sleep(self.latency)
+        else:
+            await asyncio.sleep(self.latency)
+        return json.loads(json.dumps(self.plan))
+
+    def stream_text(self, system: str, messages: List[Dict[str, str]]) -> Iterator[str]:
+        # Spreads the latency across chunks, like a model generating tokens
+        self.calls += 1
+        text = json.dumps(self.plan)
+        chunks = [text[i:i + self.chunk_size] for i in range(0, len(text), self.chunk_size)]
+        for chunk in chunks:
+            self.clock.sleep(self.latency / len(chunks))
+            yield chunk
+
+
+def _retryable(exc: BaseException) -> bool:
+    status = getattr(exc, "status_code", None) or getattr(getattr(exc, "response", None), "status_code", None)
+    return status not in NON_RETRYABLE_STATUS
+
+
+def _attempt(call: Callable[[], Any], limit: float, picked: threading.Event) -> Any:
+    picked.set()
+    token = _ATTEMPT_TIMEOUT.set(limit)
+    try:
+        return call()
+    finally:
+        _ATTEMPT_TIMEOUT.reset(token)
+
+
+class ResilientProvider(LLMProvider):
+    # Per-attempt timeout, overall deadline and full-jitter exponential backoff around another provider
+    def __init__(self, inner: LLMProvider, retries: int = DEFAULT_RETRIES, timeout: float = DEFAULT_REQUEST_TIMEOUT, deadline: Optional[float] = None, backoff: float = 0.25, max_backoff: float = 4.0) -> None:
+        self.inner = inner
+        self.retries = max(0, retries)
+        self.timeout = timeout
+        self.deadline = deadline if deadline is not None else timeout * (self.retries + 1)
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.stats: Dict[str, int] = {"calls": 0, "attempts": 0, "retries": 0, "timeouts": 0, "failures": 0}
+
+    def _delay(self, attempt: int, remaining: float) -> float:
+        return min(remaining, random.uniform(0.0, min(self.max_backoff, self.backoff * (2 ** attempt))))
+
+    def _run(self, call: Callable[[], Any]) -> Any:
+        self.stats["calls"] += 1
+        started = time.time()
+        last: Optional[BaseException] = None
+        for attempt in range(self.retries + 1):
+            remaining = self.deadline - (time.time() - started)
+            if remaining <= 0:
+                break
+            self.stats["attempts"] += 1
+            limit = min(self.timeout, remaining)
+            picked = threading.Event()
+            future = _CALL_POOL.submit(_attempt, call, limit, picked)
+            try:
+                # The attempt's clock starts once a worker has it; queueing for one only counts against the deadline
+                if not picked.wait(remaining):
+                    raise CallTimeout()
+                # Enforced here too, since not every provider honours its own timeout
+                return future.result(timeout=min(limit, max(0.0, self.deadline - (time.time() - started))))
+            except CallTimeout:
+                # Drops it from the queue if no worker took it; a running attempt ends on its request timeout
+                future.cancel()
+                self.stats["timeouts"] += 1
+                last = TimeoutError(f"attempt timed out after {limit:.1f}s")
+            except Exception as e:  # noqa: BLE001
+                last = e
+                if not _retryable(e):
+                    break
+            if attempt < self.retries:
+                self.stats["retries"] += 1
+                time.sleep(self._delay(attempt, max(0.0, self.deadline - (time.time() - started))))
+        self.stats["failures"] += 1
+        raise RuntimeError(f"LLM request failed after {self.stats['attempts']} attempt(s): {last}") from last
+
+    def generate_json(self, system: str, messages: List[Dict[str, str]]) -> Dict[str, Any]:
+        return self._run(lambda: self.inner.generate_json(system=system, messages=messages))
+
+    async def agenerate_json(self, system: str, messages: List[Dict[str, str]]) -> Dict[str, Any]:
+        self.stats["calls"] += 1
+        started = time.time()
+        last: Optional[BaseException] = None
+        for attempt in range(self.retries + 1):
+            remaining = self.deadline - (time.time() - started)
+            if remaining <= 0:
+                break
+            self.stats["attempts"] += 1
+            limit = min(self.timeout, remaining)
+            token = _ATTEMPT_TIMEOUT.set(limit)
+            try:
+                return await asyncio.wait_for(self.inner.agenerate_json(system=system, messages=messages), timeout=limit)
+            except asyncio.TimeoutError:
+                self.stats["timeouts"] += 1
+                last = TimeoutError(f"attempt timed out after {limit:.1f}s")
+            except Exception as e:  # noqa: BLE001
+                last = e
+                if not _retryable(e):
+                    break
+            finally:
+                _ATTEMPT_TIMEOUT.reset(token)
+            if attempt < self.retries:
+                self.stats["retries"] += 1
+                await asyncio.sleep(self._delay(attempt, max(0.0, self.deadline - (time.time() - started))))
+        self.stats["failures"] += 1
+        raise RuntimeError(f"LLM request failed after {self.stats['attempts']} attempt(s): {last}") from last
+
+    def stream_text(self, system: str, messages: List[Dict[str, str]]) -> Iterator[str]:
+        # Retrying is only safe until the first chunk has been handed to the caller
+        it, head = self._run(lambda: _open_stream(self.inner, system, messages))
+        yield head
+        yield from it
+
+
+def _close_stream(future: Future) -> None:
+    if future.exception() is None:
+        close = getattr(future.result()[0], "close", None)
+        if close is not None:
+            close()
+
+
+class HedgedProvider(LLMProvider):
+    # Sends the prompt to a second provider once the first is slower than hedge_after; first answer wins
+    def __init__(self, primary: LLMProvider, secondary: LLMProvider, hedge_after: float = 2.0) -> None:
+        self.primary = primary
+        self.secondary = secondary
+        self.hedge_after = hedge_after
+        self.hedged = (primary, secondary)
+        self.stats: Dict[str, int] = {"calls": 0, "hedged": 0, "primary_wins": 0, "secondary_wins": 0}
+
+    def _record(self, winner: int) -> None:
+        self.stats["primary_wins" if winner == 0 else "secondary_wins"] += 1
+
+    def generate_json(self, system: str, messages: List[Dict[str, str]]) -> Dict[str, Any]:
+        self.stats["calls"] += 1
+        futures: List[Future] = [_HEDGE_POOL.submit(self.primary.generate_json, system, messages)]
+        done, _ = wait(futures, timeout=self.hedge_after)
+        if not done or futures[0].exception() is not None:
+            self.stats["hedged"] += 1
+            futures.append(_HEDGE_POOL.submit(self.secondary.generate_json, system, messages))
+        pending = set(futures)
+        last: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    self._record(futures.index(future))
+                    return future.result()
+                last = future.exception()
+        raise RuntimeError(f"All hedged LLM requests failed: {last}") from last
+
+    def stream_text(self, system: str, messages: List[Dict[str, str]]) -> Iterator[str]:
+        # Races time-to-first-chunk; the losing stream is closed once it opens and never read
+        self.stats["calls"] += 1
+        futures: List[Future] = [_HEDGE_POOL.submit(_open_stream, self.primary, system, messages)]
+        done, _ = wait(futures, timeout=self.hedge_after)
+        if not done or futures[0].exception() is not None:
+            self.stats["hedged"] += 1
+            futures.append(_HEDGE_POOL.submit(_open_stream, self.secondary, system, messages))
+        pending = set(futures)
+        last: Optional[BaseException] = None
+        winner: Optional[Tuple[Iterator[str], str]] = None
+        while pending and winner is None:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None and winner is None:
+                    self._record(futures.index(future))
+                    winner = future.result()
+                elif future.exception() is not None:
+                    last = future.exception()
+                else:
+                    _close_stream(future)
+        for future in pending:
+            future.add_done_callback(_close_stream)
+        if winner is None:
+            raise RuntimeError(f"All hedged LLM requests failed: {last}") from last
+        it, head = winner
+        yield head
+        yield from it
+
+    async def agenerate_json(self, system: str, messages: List[Dict[str, str]]) -> Dict[str, Any]:
+        self.stats["calls"] += 1
+        tasks = [asyncio.ensure_future(self.primary.agenerate_json(system=system, messages=messages))]
+        done, _ = await asyncio.wait(tasks, timeout=self.hedge_after)
+        if not done or tasks[0].exception() is not None:
+            self.stats["hedged"] += 1
+            tasks.append(asyncio.ensure_future(self.secondary.agenerate_json(system=system, messages=messages)))
+        pending = set(tasks)
+        last: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        self._record(tasks.index(task))
+                        return task.result()
+                    last = task.exception()
+        finally:
+            for task in pending:
+                task.cancel()
+        raise RuntimeError(f"All hedged LLM requests failed: {last}") from last
+
+
+_PROVIDER_ALIASES = {
+    "openai_compat": "openai", "x-ai": "xai", "lm-studio": "lmstudio", "lm_studio": "lmstudio",
+    "claude": "anthropic", "local-openai": "local", "local_openai": "local",
+}
+
+
+def _provider_family(provider: str) -> str:
+    p = provider.lower()
+    return _PROVIDER_ALIASES.get(p, p)
+
+
+def _build_base(provider: str, model: str, api_key: Optional[str] = None, base_url: Optional[str] = None, timeout: float = DEFAULT_REQUEST_TIMEOUT, clock: Optional[Clock] = None) -> LLMProvider:
     p = provider.lower()
     if p in ("openai", "openai_compat"):
-        return OpenAICompatProvider(model=model, api_key=api_key, base_url=base_url)
+        return OpenAICompatProvider(model=model, api_key=api_key, base_url=base_url, timeout=timeout)
     if p in ("xai", "x-ai"):
         # xAI Grok is OpenAI-compatible
         base = base_url or os.getenv("XAI_BASE_URL", "https://api.x.ai/v1")
         key = api_key or os.getenv("XAI_API_KEY")
-        return OpenAICompatProvider(model=model, api_key=key, base_url=base)
+        return OpenAICompatProvider(model=model, api_key=key, base_url=base, timeout=timeout)
     if p in ("lmstudio", "lm-studio", "lm_studio"):
         # LM Studio local server speaks OpenAI API by default
         base = base_url or os.getenv("LMSTUDIO_BASE_URL", "http://localhost:1234/v1")
         key = api_key or os.getenv("LMSTUDIO_API_KEY")
-        return OpenAICompatProvider(model=model, api_key=key, base_url=base)
+        return OpenAICompatProvider(model=model, api_key=key, base_url=base, timeout=timeout)
     if p in ("anthropic", "claude"):
         key = api_key or os.getenv("ANTHROPIC_API_KEY")
-        return AnthropicProvider(model=model, api_key=key)
+        return AnthropicProvider(model=model, api_key=key, timeout=timeout)
     if p in ("local", "local-openai", "local_openai"):
         # Generic local OpenAI-compatible endpoint
         base = base_url or os.getenv("OPENAI_BASE_URL", "http://localhost:11434/v1")
         key = api_key or os.getenv("OPENAI_API_KEY")
-        return OpenAICompatProvider(model=model, api_key=key, base_url=base)
+        return OpenAICompatProvider(model=model, api_key=key, base_url=base, timeout=timeout)
+    if p == "stub":
+        return StubProvider(clock=clock)
     raise ValueError(f"Unknown provider: {provider}")
+
+
+def build_provider(
+    provider: str,
+    model: str,
+    api_key: Optional[str] = None,
+    base_url: Optional[str] = None,
+    timeout: float = DEFAULT_REQUEST_TIMEOUT,
+    retries: int = DEFAULT_RETRIES,
+    hedge: Optional[str] = None,
+    hedge_after: float = 2.0,
+    cassette: Optional[str] = None,
+    cassette_mode: str = "passthrough",
+    clock: Optional[Clock] = None,
+) -> LLMProvider:
+    if cassette and cassette_mode == "replay":
+        # Offline: no SDK client is constructed, so no key or network is needed
+        from .cassette import CassetteProvider
+
+        return CassetteProvider(cassette, mode="replay", model=model)
+    # hedge is "provider" or "provider:model"; it uses that provider's own env-configured key/base URL
+    hedge_provider, _, hedge_model = (hedge or "").partition(":")
+    if hedge and not hedge_model:
+        if _provider_family(hedge_provider) not in (_provider_family(provider), "stub"):
+            # The primary's model name means nothing to another vendor's API
+            raise ValueError(f"Hedge provider {hedge_provider!r} differs from {provider!r}; pass it as provider:model")
+        hedge_model = model
+    # clock only affects the stub provider; real providers spend real time regardless
+    primary: LLMProvider = ResilientProvider(_build_base(provider, model, api_key=api_key, base_url=base_url, timeout=timeout, clock=clock), retries=retries, timeout=timeout)
+    if hedge:
+        secondary = ResilientProvider(_build_base(hedge_provider, hedge_model, timeout=timeout, clock=clock), retries=retries, timeout=timeout)
+        primary = HedgedProvider(primary, secondary, hedge_after=hedge_after)
+    if cassette and cassette_mode == "record":
+        from .cassette import CassetteProvider
+
+        return CassetteProvider(cassette, mode="record", inner=primary, model=model)
+    return primary
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import json
+import math
+import os
+import threading
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, IO, Iterator, List, Optional, Sequence
+
+from .clock import SYSTEM_CLOCK, Clock
+
+
+def percentile(values: Sequence[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    # Nearest-rank, so every reported value is one that was actually observed
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100.0 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+class _Span:
+    __slots__ = ("attrs",)
+
+    def __init__(self, attrs: Dict[str, Any]) -> None:
+        self.attrs = attrs
+
+    def set(self, **attrs: Any) -> None:
+        self.attrs.update(attrs)
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def set(self, **attrs: Any) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        return None
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class NoopTracer:
+    enabled = False
+
+    def span(self, name: str, **attrs: Any) -> _NoopSpan:
+        return _NOOP_SPAN
+
+    def record(self, name: str, start: float, end: float, **attrs: Any) -> None:
+        pass
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        return {}
+
+    def close(self) -> None:
+        pass
+
+
+NOOP_TRACER = NoopTracer()
+
+
+class Tracer:
+    # Spans go to a JSONL file (one object per finished span) and feed per-name latency summaries
+    enabled = True
+
+    def __init__(self, path: Optional[str] = None, clock: Optional[Clock] = None) -> None:
+        self.path = os.path.expanduser(path) if path else None
+        self.clock: Clock = clock if clock is not None else SYSTEM_CLOCK
+        self.trace_id = uuid.uuid4().hex[:16]
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._durations: Dict[str, List[float]] = {}
+        self._file: Optional[IO[str]] = None
+        if self.path:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._file = open(self.path, "a", encoding="utf-8")
+
+    def _stack(self) -> List[str]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def record(self, name: str, start: float, end: float, parent: Optional[str] = None, span_id: Optional[str] = None, **attrs: Any) -> None:
+        duration_ms = (end - start) * 1000.0
+        event = {
+            "trace": self.trace_id,
+            "span": span_id or uuid.uuid4().hex[:12],
+            "parent": parent,
+            "name": name,
+            "start": round(start, 6),
+            "dur_ms": round(duration_ms, 3),
+            "thread": threading.current_thread().name,
+        }
+        if attrs:
+            event["attrs"] = attrs
+        with self._lock:
+            self._durations.setdefault(name, []).append(duration_ms)
+            if self._file is not None:
+                self._file.write(json.dumps(event, default=str, separators=(",", ":")) + "\n")
+
+    @contextmanager
+    def span(self, name: str, **attrs: Any) -> Iterator[_Span]:
+        stack = self._stack()
+        parent = stack[-1] if stack else None
+        span_id = uuid.uuid4().hex[:12]
+        stack.append(span_id)
+        handle = _Span(dict(attrs))
+        start = self.clock.time()
+        try:
+            yield handle
+        except BaseException as e:
+            handle.attrs["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            stack.pop()
+            self.record(name, start, self.clock.time(), parent=parent, span_id=span_id, **handle.attrs)
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            out: Dict[str, Dict[str, Any]] = {}
+            for name, values in sorted(self._durations.items()):
+                out[name] = {
+                    "count": len(values),
+                    "p50_ms": round(percentile(values, 50) or 0.0, 3),
+                    "p95_ms": round(percentile(values, 95) or 0.0, 3),
+                    "total_ms": round(sum(values), 3),
+                }
+            return out
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class TracedConnector:
+    # Wraps every connector method call in a "conn.<method>" span; only installed when tracing is on
+    def __init__(self, conn: Any, tracer: Tracer) -> None:
+        self._conn = conn
+        self._tracer = tracer
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._conn, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+        tracer = self._tracer
+
+        def traced(*args: Any, **kwargs: Any) -> Any:
+            with tracer.span(f"conn.{name}"):
+                return attr(*args, **kwargs)
+
+        return traced
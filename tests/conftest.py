@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+
+import pytest
+
+try:
+    import ApplicationServices  # noqa: F401
+    import AppKit  # noqa: F401
+    import CoreFoundation  # noqa: F401
+except ImportError:
+    # Off macOS the connectors package still imports; tests drive the AX code through tests.fakes.pyobjc
+    from tests.fakes import pyobjc
+
+    pyobjc.install()
+
+# The agent and live perception import the visual pipeline
+VISUAL_MODULES = ("mss", "numpy", "cv2", "PIL", "pytesseract")
+
+
+def needs_visual() -> None:
+    for module in VISUAL_MODULES:
+        pytest.importorskip(module)
+
+
+def ocr_screen(*words: str) -> list:
+    # What live perception reports for a screen: OCR words plus an untitled CV region
+    nodes = [{"id": f"ocr:{i}", "role": "StaticText", "title": w, "frame": {"x": 10, "y": 20 * i, "w": 60, "h": 16}, "source": "ocr"} for i, w in enumerate(words)]
+    return nodes + [{"id": "region:0", "role": "Region", "title": None, "frame": {"x": 0, "y": 0, "w": 400, "h": 300}, "source": "cv"}]
+
+
+@pytest.fixture
+def screen() -> Iterator[Callable[[Iterable[Dict[str, Any]]], None]]:
+    # A fresh LiveEngine that is never started; show(nodes) replaces what perception "sees"
+    needs_visual()
+    from desktop_tetra.interaction.engine import LiveEngine
+
+    previous = LiveEngine._instance
+    LiveEngine._instance = LiveEngine()
+    store = LiveEngine._instance.feed.crdt
+
+    def show(nodes: Iterable[Dict[str, Any]]) -> None:
+        store.apply((), [n["id"] for n in store.iter_nodes()])
+        store.apply(dict(n) for n in nodes)
+
+    yield show
+    LiveEngine._instance = previous
+
+
+@pytest.fixture
+def sim() -> Iterator[Callable[..., Any]]:
+    # start(**kwargs) runs a fresh SimEngine on a VirtualClock; stopped and dropped afterwards
+    from desktop_tetra.clock import VirtualClock
+    from desktop_tetra.interaction.sim.engine import SimEngine
+
+    def start(clock: Optional[Any] = None, **kwargs: Any) -> SimEngine:
+        engine = SimEngine.reset(clock=clock if clock is not None else VirtualClock(), **kwargs)
+        engine.start()
+        return engine
+
+    yield start
+    with SimEngine._lock:
+        if SimEngine._instance is not None:
+            SimEngine._instance.stop()
+        SimEngine._instance = None
+
+
+def stub_agent(plan: Optional[Dict[str, Any]] = None, latency: float = 0.0, **kwargs: Any) -> Any:
+    # An Agent on the sim connector whose provider is a StubProvider returning `plan`
+    needs_visual()
+    from desktop_tetra.agent import Agent
+    from desktop_tetra.llm import StubProvider
+
+    agent = Agent(provider="stub", os_override="sim", **kwargs)
+    agent.provider = StubProvider(plan=plan, latency=latency, clock=agent.clock)
+    return agent
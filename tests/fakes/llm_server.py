@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Optional
+
+from desktop_tetra.llm import LLMProvider, request_timeout
+
+# Local OpenAI-style /chat/completions endpoint, plus a dependency-free client for it
+
+PLAN: Dict[str, Any] = {"steps": [{"action": "press", "params": {"role": "Button", "title": "New"}}, {"action": "scan", "params": {}}]}
+
+
+class StubLLMServer:
+    # Each request takes the next scripted reply ({"status": 503}, {"delay": 1.0}, ...); once the script runs out,
+    # every request gets the plan after the default delay. Streamed replies spread the delay across chunks.
+    def __init__(self, name: str = "stub", delay: float = 0.0, script: Optional[List[Dict[str, Any]]] = None, chunk_size: int = 12) -> None:
+        self.name = name
+        self.delay = delay
+        self.script = list(script or [])
+        self.chunk_size = chunk_size
+        self.requests = 0
+        self.bodies: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}/v1"
+
+    @property
+    def plan(self) -> Dict[str, Any]:
+        return dict(PLAN, server=self.name)
+
+    def __enter__(self) -> "StubLLMServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _next(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            self.requests += 1
+            self.bodies.append(body)
+            return self.script.pop(0) if self.script else {}
+
+    def _handler(self) -> type:
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args: Any) -> None:
+                pass
+
+            def _send(self, status: int, body: bytes, content_type: str = "application/json") -> None:
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self) -> None:
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+                reply = stub._next(body)
+                delay = float(reply.get("delay", stub.delay))
+                status = int(reply.get("status", 200))
+                if status != 200:
+                    time.sleep(delay)
+                    self._send(status, json.dumps({"error": {"message": f"scripted {status}", "type": "server_error", "code": status}}).encode())
+                    return
+                text = json.dumps(stub.plan)
+                if not body.get("stream"):
+                    time.sleep(delay)
+                    self._send(200, json.dumps({
+                        "id": "stub", "object": "chat.completion", "created": 0, "model": body.get("model", "stub"),
+                        "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                    }).encode())
+                    return
+                chunks = [text[i:i + stub.chunk_size] for i in range(0, len(text), stub.chunk_size)]
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                try:
+                    for chunk in chunks:
+                        time.sleep(delay / len(chunks))
+                        event = {
+                            "id": "stub", "object": "chat.completion.chunk", "created": 0, "model": body.get("model", "stub"),
+                            "choices": [{"index": 0, "delta": {"content": chunk}, "finish_reason": None}],
+                        }
+                        self.wfile.write(f"data: {json.dumps(event)}\n\n".encode())
+                        self.wfile.flush()
+                    self.wfile.write(b"data: [DONE]\n\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                self.close_connection = True
+
+        return Handler
+
+
+class HTTPStatusError(RuntimeError):
+    def __init__(self, status_code: int) -> None:
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+class HTTPChatProvider(LLMProvider):
+    # Minimal OpenAI-compatible client over urllib; ResilientProvider reads status_code like it does on SDK errors
+    def __init__(self, base_url: str, model: str = "stub-model", timeout: float = 30.0) -> None:
+        self.base_url = base_url
+        self.model = model
+        self.timeout = timeout
+
+    def _open(self, system: str, messages: List[Dict[str, str]], stream: bool) -> Any:
+        body = {"model": self.model, "messages": [{"role": "system", "content": system}] + messages, "stream": stream}
+        request = urllib.request.Request(f"{self.base_url}/chat/completions", data=json.dumps(body).encode(), headers={"Content-Type": "application/json"}, method="POST")
+        try:
+            return urllib.request.urlopen(request, timeout=request_timeout(self.timeout))
+        except urllib.error.HTTPError as e:
+            raise HTTPStatusError(e.code) from e
+
+    def generate_json(self, system: str, messages: List[Dict[str, str]]) -> Dict[str, Any]:
+        with self._open(system, messages, stream=False) as response:
+            return json.loads(json.loads(response.read())["choices"][0]["message"]["content"])
+
+    def stream_text(self, system: str, messages: List[Dict[str, str]]) -> Iterator[str]:
+        with self._open(system, messages, stream=True) as response:
+            for raw in response:
+                line = raw.decode().strip()
+                if not line.startswith("data: ") or line == "data: [DONE]":
+                    continue
+                text = json.loads(line[len("data: "):])["choices"][0]["delta"].get("content")
+                if text:
+                    yield text
@@ -0,0 +1,270 @@
+from __future__ import annotations
+
+import sys
+import threading
+import time
+import types
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Stand-ins for the pyobjc modules (ApplicationServices, AppKit, CoreFoundation) the macOS code imports
+
+kAXChildrenAttribute = "AXChildren"
+kAXFocusedWindowAttribute = "AXFocusedWindow"
+kAXMenuBarAttribute = "AXMenuBar"
+kAXParentAttribute = "AXParent"
+kAXRoleAttribute = "AXRole"
+kAXTitleAttribute = "AXTitle"
+kAXValueCGRectType = 1
+kAXValueAXErrorType = 5
+
+AX_ERROR_ATTRIBUTE_UNSUPPORTED = -25205
+AX_ERROR_NO_VALUE = -25212
+
+
+class AXValueRef:
+    def __init__(self, kind: int, value: Any = None) -> None:
+        self.kind = kind
+        self.value = value
+
+
+class Rect:
+    def __init__(self, x: float, y: float, w: float, h: float) -> None:
+        self.origin = types.SimpleNamespace(x=x, y=y)
+        self.size = types.SimpleNamespace(width=w, height=h)
+
+
+class FakeElement:
+    def __init__(self, role: str, title: Optional[str] = None, children: Tuple["FakeElement", ...] = (), actions: Tuple[str, ...] = (), **attrs: Any) -> None:
+        self.attrs: Dict[str, Any] = {kAXRoleAttribute: role, kAXTitleAttribute: title, kAXChildrenAttribute: [], "AXFrame": AXValueRef(kAXValueCGRectType, Rect(0, 0, 10, 10))}
+        self.attrs.update(attrs)
+        self.actions = list(actions)
+        self.performed: List[str] = []
+        self.pid = 1
+        for child in children:
+            self.append(child)
+
+    def append(self, child: "FakeElement") -> "FakeElement":
+        child.attrs[kAXParentAttribute] = self
+        self.attrs[kAXChildrenAttribute].append(child)
+        return child
+
+    def insert(self, index: int, child: "FakeElement") -> "FakeElement":
+        child.attrs[kAXParentAttribute] = self
+        self.attrs[kAXChildrenAttribute].insert(index, child)
+        return child
+
+    def walk(self) -> List["FakeElement"]:
+        out = [self]
+        for child in self.attrs[kAXChildrenAttribute]:
+            out.extend(child.walk())
+        return out
+
+    def __repr__(self) -> str:
+        return f"FakeElement({self.attrs[kAXRoleAttribute]!r}, {self.attrs[kAXTitleAttribute]!r})"
+
+
+class FakeObserver:
+    def __init__(self, pid: int, callback: Callable[..., Any]) -> None:
+        self.pid = pid
+        self.callback = callback
+        self.notifications: List[str] = []
+
+
+class FakeAX:
+    # Same functions as ApplicationServices; every call that would cross into the target app is counted by name
+    AXValueRef = AXValueRef
+
+    def __init__(self, latency: float = 0.0) -> None:
+        self.latency = latency
+        self.apps: Dict[int, FakeElement] = {}
+        self.hit: Optional[FakeElement] = None
+        self.observers: List[FakeObserver] = []
+        self.calls: Counter = Counter()
+        self._lock = threading.Lock()
+
+    @property
+    def ipc(self) -> int:
+        with self._lock:
+            return sum(self.calls.values())
+
+    def reset(self) -> None:
+        with self._lock:
+            self.calls.clear()
+
+    def _ipc(self, name: str) -> None:
+        with self._lock:
+            self.calls[name] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def add_app(self, pid: int, root: FakeElement) -> FakeElement:
+        for element in root.walk():
+            element.pid = pid
+        self.apps[pid] = root
+        return root
+
+    def fire(self, element: FakeElement, notification: str) -> None:
+        for observer in list(self.observers):
+            observer.callback(observer, element, notification, None)
+
+    def AXIsProcessTrusted(self) -> bool:
+        return True
+
+    def AXUIElementCreateSystemWide(self) -> FakeElement:
+        return FakeElement("AXSystemWide")
+
+    def AXUIElementCreateApplication(self, pid: int) -> FakeElement:
+        return self.apps[pid]
+
+    def AXUIElementGetPid(self, element: FakeElement, _out: Any) -> Tuple[int, int]:
+        return 0, element.pid
+
+    def AXUIElementCopyAttributeValue(self, element: FakeElement, name: str, _out: Any) -> Tuple[int, Any]:
+        self._ipc("AXUIElementCopyAttributeValue")
+        if name not in element.attrs:
+            return AX_ERROR_ATTRIBUTE_UNSUPPORTED, None
+        return 0, element.attrs[name]
+
+    def AXUIElementCopyMultipleAttributeValues(self, element: FakeElement, names: List[str], _options: int, _out: Any) -> Tuple[int, List[Any]]:
+        self._ipc("AXUIElementCopyMultipleAttributeValues")
+        return 0, [element.attrs[n] if n in element.attrs else AXValueRef(kAXValueAXErrorType, AX_ERROR_NO_VALUE) for n in names]
+
+    def AXUIElementCopyParameterizedAttributeValue(self, element: FakeElement, name: str, param: Any, _out: Any) -> Tuple[int, Any]:
+        self._ipc("AXUIElementCopyParameterizedAttributeValue")
+        return AX_ERROR_ATTRIBUTE_UNSUPPORTED, None
+
+    def AXUIElementCopyActionNames(self, element: FakeElement, _out: Any) -> Tuple[int, List[str]]:
+        self._ipc("AXUIElementCopyActionNames")
+        return 0, list(element.actions)
+
+    def AXUIElementPerformAction(self, element: FakeElement, action: str) -> int:
+        self._ipc("AXUIElementPerformAction")
+        element.performed.append(action)
+        return 0
+
+    def AXUIElementSetAttributeValue(self, element: FakeElement, name: str, value: Any) -> int:
+        self._ipc("AXUIElementSetAttributeValue")
+        element.attrs[name] = value
+        return 0
+
+    def AXUIElementCopyElementAtPosition(self, system_wide: Any, x: float, y: float, _out: Any) -> Tuple[int, Any]:
+        self._ipc("AXUIElementCopyElementAtPosition")
+        return (0, self.hit) if self.hit is not None else (-25204, None)
+
+    def AXValueGetType(self, value: AXValueRef) -> int:
+        return value.kind
+
+    def AXValueGetValue(self, value: AXValueRef, kind: int, _out: Any) -> Tuple[bool, Any]:
+        return value.kind == kind, value.value
+
+    def AXObserverCreate(self, pid: int, callback: Callable[..., Any], _out: Any) -> Tuple[int, FakeObserver]:
+        observer = FakeObserver(pid, callback)
+        self.observers.append(observer)
+        return 0, observer
+
+    def AXObserverAddNotification(self, observer: FakeObserver, element: FakeElement, name: str, _refcon: Any) -> int:
+        observer.notifications.append(name)
+        return 0
+
+    def AXObserverGetRunLoopSource(self, observer: FakeObserver) -> object:
+        return object()
+
+
+class FakeRunningApp:
+    def __init__(self, pid: int, bundle: Optional[str], name: Optional[str]) -> None:
+        self.pid = pid
+        self.bundle = bundle
+        self.name = name
+        self.activations = 0
+
+    def processIdentifier(self) -> int:
+        return self.pid
+
+    def bundleIdentifier(self) -> Optional[str]:
+        return self.bundle
+
+    def localizedName(self) -> Optional[str]:
+        return self.name
+
+    def activateWithOptions_(self, options: int) -> bool:
+        self.activations += 1
+        return True
+
+
+class FakeNotificationCenter:
+    def __init__(self) -> None:
+        self.observers: List[Tuple[str, Callable[[Any], Any]]] = []
+
+    def addObserverForName_object_queue_usingBlock_(self, name: str, obj: Any, queue: Any, block: Callable[[Any], Any]) -> int:
+        self.observers.append((name, block))
+        return len(self.observers)
+
+    def post(self, name: str, app: FakeRunningApp) -> None:
+        note = types.SimpleNamespace(userInfo=lambda: {"NSWorkspaceApplicationKey": app})
+        for observed, block in list(self.observers):
+            if observed == name:
+                block(note)
+
+
+class FakeWorkspace:
+    # NSWorkspace.sharedWorkspace(); counts runningApplications() listings
+    def __init__(self, apps: Optional[List[FakeRunningApp]] = None) -> None:
+        self.apps = list(apps or [])
+        self.front: Optional[FakeRunningApp] = self.apps[0] if self.apps else None
+        self.center = FakeNotificationCenter()
+        self.listings = 0
+
+    def runningApplications(self) -> List[FakeRunningApp]:
+        self.listings += 1
+        return list(self.apps)
+
+    def frontmostApplication(self) -> Optional[FakeRunningApp]:
+        return self.front
+
+    def notificationCenter(self) -> FakeNotificationCenter:
+        return self.center
+
+    def launchApplication_(self, path: str) -> bool:
+        return True
+
+
+def ax_finder(root: FakeElement, latency: float = 0.0, **kwargs: Any) -> Tuple[FakeAX, Any]:
+    # An AXFinder reading root as the frontmost app (pid 1) through its own counting backend
+    from desktop_tetra.app_registry import AppRegistry
+    from desktop_tetra.ax import AXFinder
+
+    ax = FakeAX(latency=latency)
+    ax.add_app(1, root)
+    workspace = FakeWorkspace([FakeRunningApp(1, "com.example.app", "Example")])
+    return ax, AXFinder(backend=ax, registry=AppRegistry(workspace=workspace, backend=ax), **kwargs)
+
+
+DEFAULT_AX = FakeAX()
+DEFAULT_WORKSPACE = FakeWorkspace()
+
+
+def _module(name: str, attrs: Dict[str, Any]) -> types.ModuleType:
+    module = types.ModuleType(name)
+    module.__dict__.update(attrs)
+    return module
+
+
+def install() -> None:
+    # Only used where pyobjc is missing; module-level calls go to DEFAULT_AX / DEFAULT_WORKSPACE
+    constants = {k: v for k, v in globals().items() if k.startswith("kAX")}
+    functions = {name: getattr(DEFAULT_AX, name) for name in dir(FakeAX) if name.startswith("AX")}
+    sys.modules["ApplicationServices"] = _module("ApplicationServices", dict(constants, **functions))
+    sys.modules["AppKit"] = _module("AppKit", {
+        "NSWorkspace": types.SimpleNamespace(sharedWorkspace=lambda: DEFAULT_WORKSPACE),
+        "NSWorkspaceDidLaunchApplicationNotification": "NSWorkspaceDidLaunchApplicationNotification",
+        "NSWorkspaceDidTerminateApplicationNotification": "NSWorkspaceDidTerminateApplicationNotification",
+    })
+    sys.modules["CoreFoundation"] = _module("CoreFoundation", {
+        "CFRunLoopAddSource": lambda *a: None,
+        "CFRunLoopGetCurrent": lambda: object(),
+        "CFRunLoopRunInMode": lambda *a: time.sleep(0.01),
+        "CFRunLoopWakeUp": lambda *a: None,
+        "CFRunLoopSourceInvalidate": lambda *a: None,
+        "kCFRunLoopDefaultMode": "kCFRunLoopDefaultMode",
+    })
@@ -0,0 +1,248 @@
+from __future__ import annotations
+
+import threading
+import types
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional
+
+# Stand-ins for the uiautomation package (and the comtypes calls the event source makes) used by the Windows connector
+
+CONTROL_TYPES = {"WindowControl": 50032, "ButtonControl": 50000, "TextControl": 50020, "EditControl": 50004, "MenuItemControl": 50011}
+COINIT_MULTITHREADED = 0
+
+
+class Rect:
+    def __init__(self, left: int, top: int, right: int, bottom: int) -> None:
+        self.left, self.top, self.right, self.bottom = left, top, right, bottom
+
+    def width(self) -> int:
+        return self.right - self.left
+
+    def height(self) -> int:
+        return self.bottom - self.top
+
+
+class _Array:
+    def __init__(self, items: List["FakeUIAElement"]) -> None:
+        self._items = items
+        self.Length = len(items)
+
+    def GetElement(self, i: int) -> "FakeUIAElement":
+        return self._items[i]
+
+
+class FakeUIAElement:
+    # A raw IUIAutomationElement; BuildUpdatedCache is the only call counted as a cross-process round trip
+    def __init__(self, kind: str, name: str = "", children: tuple = (), pid: int = 0, class_name: str = "", hwnd: int = 0, automation: Optional["FakeAutomation"] = None) -> None:
+        self.kind = kind
+        self.name = name
+        self.children = list(children)
+        self.pid = pid
+        self.class_name = class_name
+        self.hwnd = hwnd
+        self.automation = automation
+        for child in self.children:
+            child.pid = child.pid or pid
+
+    @property
+    def CachedName(self) -> str:
+        return self.name
+
+    @property
+    def CachedProcessId(self) -> int:
+        return self.pid
+
+    @property
+    def CachedClassName(self) -> str:
+        return self.class_name
+
+    @property
+    def CachedControlType(self) -> int:
+        return CONTROL_TYPES[self.kind]
+
+    @property
+    def CachedAutomationId(self) -> str:
+        return ""
+
+    @property
+    def CachedBoundingRectangle(self) -> Rect:
+        return Rect(0, 0, 100, 20)
+
+    @property
+    def CurrentNativeWindowHandle(self) -> int:
+        return self.hwnd
+
+    def GetCachedChildren(self) -> _Array:
+        return _Array(self.children)
+
+    def BuildUpdatedCache(self, request: Any) -> "FakeUIAElement":
+        if self.automation is not None:
+            self.automation.count("BuildUpdatedCache")
+        return self
+
+    def walk(self) -> List["FakeUIAElement"]:
+        out = [self]
+        for child in self.children:
+            out.extend(child.walk())
+        return out
+
+
+class FakeAutomation:
+    # IUIAutomation; records which thread registered handlers so tests can check the apartment
+    def __init__(self) -> None:
+        self.calls: Counter = Counter()
+        self.desktop = FakeUIAElement("WindowControl", "Desktop", automation=self)
+        self.handlers: List[Any] = []
+        self.threads: Dict[str, str] = {}
+        self.foreground: Optional[FakeUIAElement] = None
+        self.ControlViewCondition = object()
+        self._lock = threading.Lock()
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            self.calls[name] += 1
+            self.threads[name] = threading.current_thread().name
+
+    def add_window(self, window: FakeUIAElement) -> FakeUIAElement:
+        for element in window.walk():
+            element.automation = self
+        self.desktop.children.append(window)
+        if self.foreground is None:
+            self.foreground = window
+        return window
+
+    def fire(self) -> None:
+        for handler in list(self.handlers):
+            handler.IUIAutomationStructureChangedEventHandler_HandleStructureChangedEvent(None, 0, None)
+
+    def GetRootElement(self) -> FakeUIAElement:
+        return self.desktop
+
+    def CreateCacheRequest(self) -> Any:
+        return types.SimpleNamespace(AddProperty=lambda prop: None, TreeScope=None, TreeFilter=None)
+
+    def ElementFromHandle(self, hwnd: int) -> FakeUIAElement:
+        self.count("ElementFromHandle")
+        return next(w for w in self.desktop.children if w.hwnd == hwnd)
+
+    def AddStructureChangedEventHandler(self, element: Any, scope: Any, request: Any, handler: Any) -> None:
+        self.count("AddStructureChangedEventHandler")
+        self.handlers.append(handler)
+
+    def AddPropertyChangedEventHandler(self, element: Any, scope: Any, request: Any, handler: Any, properties: Any) -> None:
+        self.count("AddPropertyChangedEventHandler")
+
+    def AddAutomationEventHandler(self, event: int, element: Any, scope: Any, request: Any, handler: Any) -> None:
+        self.count("AddAutomationEventHandler")
+
+    def RemoveAllEventHandlers(self) -> None:
+        self.count("RemoveAllEventHandlers")
+        self.handlers.clear()
+
+
+class _Condition:
+    def __init__(self, test: Callable[[FakeUIAElement], bool]) -> None:
+        self.test = test
+
+    def __and__(self, other: "_Condition") -> "_Condition":
+        return _Condition(lambda e: self.test(e) and other.test(e))
+
+
+class _Property:
+    def __init__(self, read: Callable[[FakeUIAElement], Any]) -> None:
+        self.read = read
+
+    def __eq__(self, value: Any) -> _Condition:  # type: ignore[override]
+        return _Condition(lambda e: self.read(e) == value)
+
+
+class FakeControl:
+    # A uiautomation.Control, as returned by searches and the per-property fallback walk
+    def __init__(self, element: Optional[FakeUIAElement]) -> None:
+        self.element = element
+
+    def Exists(self, timeout: float = 0) -> bool:
+        return self.element is not None
+
+    @property
+    def Element(self) -> Optional[FakeUIAElement]:
+        return self.element
+
+    @property
+    def Name(self) -> str:
+        return self.element.name if self.element is not None else ""
+
+    @property
+    def ControlTypeName(self) -> str:
+        return self.element.kind if self.element is not None else ""
+
+    @property
+    def ProcessId(self) -> int:
+        return self.element.pid if self.element is not None else 0
+
+    @property
+    def ClassName(self) -> str:
+        return self.element.class_name if self.element is not None else ""
+
+    @property
+    def AutomationId(self) -> str:
+        return ""
+
+    @property
+    def BoundingRectangle(self) -> Rect:
+        return Rect(0, 0, 100, 20)
+
+    def GetChildren(self) -> List["FakeControl"]:
+        return [FakeControl(c) for c in self.element.children] if self.element is not None else []
+
+    def GetTopLevelControl(self) -> "FakeControl":
+        automation = self.element.automation  # type: ignore[union-attr]
+        return next(FakeControl(w) for w in automation.desktop.children if self.element in w.walk())
+
+
+def fake_uiautomation(automation: FakeAutomation) -> types.ModuleType:
+    uia = types.ModuleType("uiautomation")
+    core = types.SimpleNamespace(
+        IUIAutomationStructureChangedEventHandler=object(), IUIAutomationPropertyChangedEventHandler=object(),
+        IUIAutomationEventHandler=object(), CUIAutomation=object(), IUIAutomation=object(),
+    )
+    uia._AutomationClient = types.SimpleNamespace(instance=lambda: types.SimpleNamespace(IUIAutomation=automation, UIAutomationCore=core))  # type: ignore[attr-defined]
+    uia.TreeScope = types.SimpleNamespace(Element=1, Children=2, Descendants=4, Subtree=7)  # type: ignore[attr-defined]
+    uia.PropertyId = types.SimpleNamespace(  # type: ignore[attr-defined]
+        NameProperty=30005, AutomationIdProperty=30011, ControlTypeProperty=30003, BoundingRectangleProperty=30001,
+        ProcessIdProperty=30002, ClassNameProperty=30012, IsOffscreenProperty=30022,
+    )
+    uia.ControlTypeNames = {v: k for k, v in CONTROL_TYPES.items()}  # type: ignore[attr-defined]
+    uia.ControlType = types.SimpleNamespace(**{k[: -len("Control")]: v for k, v in CONTROL_TYPES.items()})  # type: ignore[attr-defined]
+    uia.ControlTypeProperty = _Property(lambda e: CONTROL_TYPES[e.kind])  # type: ignore[attr-defined]
+    uia.AutomationIdProperty = _Property(lambda e: "")  # type: ignore[attr-defined]
+    uia.NameContains = lambda text: _Condition(lambda e: text in e.name)  # type: ignore[attr-defined]
+    uia.NameEquals = lambda text: _Condition(lambda e: e.name == text)  # type: ignore[attr-defined]
+
+    def control(searchFromControl: Any = None, searchDepth: int = 10, foundIndex: int = 1, condition: Optional[_Condition] = None) -> FakeControl:
+        automation.count("Search")
+        root = searchFromControl.element if isinstance(searchFromControl, FakeControl) else automation.desktop
+        for element in root.walk()[1:]:
+            if condition is None or condition.test(element):
+                return FakeControl(element)
+        return FakeControl(None)
+
+    control.CreateControlFromElement = lambda element: FakeControl(element)  # type: ignore[attr-defined]
+    uia.Control = control  # type: ignore[attr-defined]
+    uia.GetRootControl = lambda: FakeControl(automation.desktop)  # type: ignore[attr-defined]
+    uia.GetForegroundControl = lambda: FakeControl(automation.foreground)  # type: ignore[attr-defined]
+    return uia
+
+
+def fake_comtypes(automation: FakeAutomation) -> Dict[str, types.ModuleType]:
+    # CoInitializeEx records the calling thread's apartment; CreateObject hands back the shared fake automation
+    comtypes = types.ModuleType("comtypes")
+    client = types.ModuleType("comtypes.client")
+    comtypes.COINIT_MULTITHREADED = COINIT_MULTITHREADED  # type: ignore[attr-defined]
+    comtypes.apartments = {}  # type: ignore[attr-defined]
+    comtypes.CoInitializeEx = lambda flags=None: comtypes.apartments.__setitem__(threading.current_thread().name, flags)  # type: ignore[attr-defined]
+    comtypes.CoUninitialize = lambda: comtypes.apartments.pop(threading.current_thread().name, None)  # type: ignore[attr-defined]
+    comtypes.COMObject = type("COMObject", (), {})  # type: ignore[attr-defined]
+    client.CreateObject = lambda cls, interface=None: automation  # type: ignore[attr-defined]
+    comtypes.client = client  # type: ignore[attr-defined]
+    return {"comtypes": comtypes, "comtypes.client": client}
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+import time
+
+from desktop_tetra.app_registry import AppRegistry
+from tests.fakes.pyobjc import FakeAX, FakeElement, FakeRunningApp, FakeWorkspace
+
+LAUNCHED = "NSWorkspaceDidLaunchApplicationNotification"
+TERMINATED = "NSWorkspaceDidTerminateApplicationNotification"
+
+
+def dead_pid() -> int:
+    proc = subprocess.Popen([sys.executable, "-c", ""])
+    proc.wait()
+    return proc.pid
+
+
+def registry(*apps: FakeRunningApp, **kwargs) -> AppRegistry:
+    ax = FakeAX()
+    for app in apps:
+        ax.add_app(app.pid, FakeElement("AXApplication", app.name))
+    return AppRegistry(workspace=FakeWorkspace(list(apps)), backend=ax, **kwargs)
+
+
+def test_launch_and_terminate_notifications_update_the_index_without_relisting():
+    finder = FakeRunningApp(os.getppid(), "com.apple.finder", "Finder")
+    reg = registry(finder)
+    assert reg.names() == ["Finder"]
+    notes = FakeRunningApp(os.getpid(), "com.apple.Notes", "Notes")
+    reg.workspace.center.post(LAUNCHED, notes)
+    assert reg.find("Notes") is notes
+    assert reg.find("com.apple.Notes") is notes
+    assert sorted(reg.names()) == ["Finder", "Notes"]
+    terminated = []
+    reg.add_terminate_listener(terminated.append)
+    reg.workspace.center.post(TERMINATED, notes)
+    assert terminated == [notes.pid]
+    assert reg.names() == ["Finder"]
+    assert reg.workspace.listings == 1
+
+
+def test_terminate_drops_the_cached_ax_element():
+    app = FakeRunningApp(os.getpid(), "com.example.app", "Example")
+    reg = registry(app)
+    element = reg.ax_element_for("Example")
+    assert reg.ax_element_for("Example") is element
+    reg.workspace.center.post(TERMINATED, app)
+    assert reg.ax_element_for("Example") is None
+    assert os.getpid() not in reg._elements
+
+
+def test_missed_exit_is_pruned_by_the_liveness_probe():
+    ghost = FakeRunningApp(dead_pid(), "com.example.ghost", "Ghost")
+    reg = registry()
+    reg.names()
+    reg.workspace.center.post(LAUNCHED, ghost)
+    terminated = []
+    reg.add_terminate_listener(terminated.append)
+    assert reg.find("Ghost") is None
+    assert terminated == [ghost.pid]
+    assert "Ghost" not in reg.names()
+
+
+def test_misses_relist_at_a_bounded_rate():
+    reg = registry(refresh_interval=0.2)
+    reg.names()
+    assert reg.workspace.listings == 1
+    for _ in range(5):
+        assert reg.find("Missing") is None
+    assert reg.workspace.listings == 1
+    late = FakeRunningApp(os.getpid(), "com.example.late", "Late")
+    # Launched without a notification reaching us; found once the interval has passed
+    reg.workspace.apps.append(late)
+    time.sleep(0.25)
+    assert reg.find("Late") is late
+    assert reg.workspace.listings == 2
+    assert reg.stats["misses"] == 5 and reg.stats["hits"] == 1
+
+
+def test_without_notifications_every_miss_relists():
+    class Silent(FakeWorkspace):
+        def notificationCenter(self):
+            raise RuntimeError("no run loop")
+
+    reg = AppRegistry(workspace=Silent(), backend=FakeAX(), refresh_interval=60.0)
+    for _ in range(3):
+        reg.find("Missing")
+    assert reg.workspace.listings == 4
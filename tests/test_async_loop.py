@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from desktop_tetra.clock import SYSTEM_CLOCK
+from tests.conftest import stub_agent
+
+PRESS_NEW = {"steps": [{"action": "press", "params": {"role": "Button", "title": "New"}}]}
+NEVER = {"appears": {"role": "Dialog", "title": "Never"}}
+
+
+def test_async_loop_overlaps_planning_with_the_success_check(sim, screen):
+    # Real time: each cycle pays 0.5 s of model latency plus a 0.5 s success check that never passes
+    sim(clock=SYSTEM_CLOCK)
+    elapsed = {}
+    for mode in ("sync", "async"):
+        agent = stub_agent(plan=PRESS_NEW, latency=0.5)
+        # Every cycle pays for a model call, so only the overlap can make a difference
+        agent._store_outcome = lambda *args: None
+        started = time.perf_counter()
+        if mode == "sync":
+            out = agent.run_continuous("press new", success=NEVER, max_cycles=4, stagnation_limit=99)
+        else:
+            out = asyncio.run(agent.arun_continuous("press new", success=NEVER, max_cycles=4, stagnation_limit=99))
+            assert out["speculation"] == {"requested": 4, "used": 3, "stale": 0, "discarded": 1}
+        elapsed[mode] = time.perf_counter() - started
+        assert out["cycles"] == 4 and not out["done"]
+        assert all(r["ok"] for cycle in out["history"] for r in cycle["results"])
+    # About 4.5 s back to back against 3 s overlapped
+    assert elapsed["async"] < 0.8 * elapsed["sync"]
+
+
+@pytest.mark.parametrize("change", [False, True])
+def test_speculative_plan_is_stale_once_the_screen_changes(sim, screen, change):
+    engine = sim()
+    agent = stub_agent(plan=PRESS_NEW)
+    keyed = threading.Event()
+    keys = []
+    cached_plan = agent._cached_plan
+
+    def tracked(goal, context):
+        out = cached_plan(goal, context)
+        keys.append(out[0])
+        if len(keys) == 2:
+            keyed.set()
+        return out
+
+    checks = []
+
+    def check(success, timeout_seconds=0.5):
+        checks.append(success)
+        if len(checks) == 2:
+            # After cycle 1's steps: the speculative request has fingerprinted the screen; now it changes
+            assert keyed.wait(2.0)
+            if change:
+                engine.store.apply([{"id": "dlg:saved", "role": "Dialog", "title": "Saved", "frame": {"x": 200, "y": 200, "w": 300, "h": 120}}])
+        return False
+
+    agent._cached_plan = tracked
+    agent.is_goal_satisfied = check
+    out = asyncio.run(agent.arun_continuous("press new", max_cycles=2))
+    assert out["cycles"] == 2
+    if change:
+        assert out["speculation"] == {"requested": 2, "used": 0, "stale": 1, "discarded": 1}
+        # Re-planned against the screen as it is now
+        assert keys[2] != keys[1]
+    else:
+        assert out["speculation"] == {"requested": 2, "used": 1, "stale": 0, "discarded": 1}
@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import time
+from typing import Any, Callable, Dict
+
+from desktop_tetra.app_registry import AppRegistry
+from desktop_tetra.ax import NODE_ATTRIBUTES, AXFinder
+from desktop_tetra.ax_cache import AXTreeCache
+from tests.fakes.pyobjc import FakeAX, FakeElement, FakeRunningApp, FakeWorkspace, ax_finder
+
+
+def grid(width: int, depth: int, leaf: str = "AXButton") -> FakeElement:
+    if depth == 0:
+        return FakeElement(leaf, "leaf")
+    return FakeElement("AXGroup", None, tuple(grid(width, depth - 1, leaf) for _ in range(width)))
+
+
+def count_nodes(node: Dict[str, Any]) -> int:
+    return 1 + sum(count_nodes(c) for c in node.get("children", []))
+
+
+def app_with(*children: FakeElement) -> FakeElement:
+    return FakeElement("AXApplication", "Example", (FakeElement("AXWindow", "Main", children),))
+
+
+def test_build_semantic_map_reads_each_element_in_one_round_trip():
+    root = app_with(grid(3, 3), FakeElement("AXButton", "OK"))
+    ax, finder = ax_finder(root, max_workers=1)
+    elements = len(root.walk())
+    tree = finder.build_semantic_map(max_depth=10)
+    assert count_nodes(tree) == elements
+    # One batched attribute read plus one action listing per element, instead of one read per attribute
+    assert ax.calls["AXUIElementCopyMultipleAttributeValues"] == elements
+    assert ax.calls["AXUIElementCopyAttributeValue"] == 0
+    assert ax.ipc == 2 * elements < len(NODE_ATTRIBUTES) * elements
+
+
+def test_parallel_scan_matches_sequential_scan():
+    root = app_with(grid(4, 3), FakeElement("AXButton", "OK"))
+    _, sequential = ax_finder(root, max_workers=1)
+    ax, parallel = ax_finder(root, latency=0.001, max_workers=8, per_app_concurrency=4)
+    assert parallel.build_semantic_map(max_depth=10) == sequential.build_semantic_map(max_depth=10)
+    assert ax.calls["AXUIElementCopyMultipleAttributeValues"] == len(root.walk())
+    parallel.close()
+
+
+def timed(fn: Callable[[], Any]) -> float:
+    started = time.perf_counter()
+    fn()
+    return time.perf_counter() - started
+
+
+def test_parallel_traversal_cuts_wall_time_under_per_call_latency():
+    # 4 ms per AX call, roughly what a busy app costs per cross-process read
+    def tree() -> FakeElement:
+        inner = grid(4, 3)
+        inner.attrs["AXChildren"][-1].attrs["AXChildren"][-1].append(FakeElement("AXCheckBox", "Target"))
+        return app_with(inner)
+
+    walls = {}
+    for workers, per_app in ((1, 1), (8, 4)):
+        _, scan = ax_finder(tree(), latency=0.004, max_workers=workers, per_app_concurrency=per_app)
+        _, search = ax_finder(tree(), latency=0.004, max_workers=workers, per_app_concurrency=per_app)
+        walls[workers] = (timed(lambda: scan.build_semantic_map(max_depth=10)), timed(lambda: search.find_element(title="Target", role="AXCheckBox")))
+        scan.close()
+        search.close()
+    (map_serial, find_serial), (map_parallel, find_parallel) = walls[1], walls[8]
+    # Four reads in flight per app: ideally 4x, asserted at 2x to stay robust on a loaded machine
+    assert map_parallel < map_serial / 2
+    assert find_parallel < find_serial / 2
+
+
+def test_path_hint_resolves_again_in_depth_round_trips():
+    target = FakeElement("AXButton", "Save")
+    toolbar = FakeElement("AXGroup", "Toolbar", (FakeElement("AXGroup", "Inner", (target,)),))
+    window = FakeElement("AXWindow", "Main", (grid(4, 3), toolbar))
+    root = FakeElement("AXApplication", "Example", (window,))
+    ax, finder = ax_finder(root, max_workers=1)
+    assert finder.find_element(title="Save", role="AXButton") is target
+    first = ax.ipc
+    ax.reset()
+    assert finder.find_element(title="Save", role="AXButton") is target
+    # The root plus one read per level of the recorded path (window, toolbar, inner, button)
+    assert ax.ipc == 1 + 4 < first
+    # A sibling inserted ahead of the path shifts indices; the hint still finds it by role and title
+    window.insert(0, FakeElement("AXGroup", "New"))
+    ax.reset()
+    assert finder.find_element(title="Save", role="AXButton") is target
+    assert ax.ipc < first
+
+
+def test_stale_path_hint_falls_back_to_a_search():
+    target = FakeElement("AXButton", "Save")
+    group = FakeElement("AXGroup", "Toolbar", (target,))
+    root = app_with(group)
+    _, finder = ax_finder(root, max_workers=1)
+    assert finder.find_element(title="Save", role="AXButton") is target
+    group.attrs["AXChildren"].remove(target)
+    moved = root.attrs["AXChildren"][0].append(FakeElement("AXButton", "Save"))
+    assert finder.find_element(title="Save", role="AXButton") is moved
+    assert finder.find_element(title="Missing", role="AXButton") is None
+
+
+def test_role_search_prunes_leaf_controls_but_not_text_fields():
+    label = FakeElement("AXStaticText", "Inner")
+    link = FakeElement("AXLink", "Docs")
+    buttons = tuple(FakeElement("AXButton", f"b{i}", (FakeElement("AXStaticText", f"t{i}"),)) for i in range(10))
+    root = app_with(FakeElement("AXButton", "Outer", (label,)), FakeElement("AXTextArea", None, (link,)), *buttons)
+    ax, finder = ax_finder(root, max_workers=1)
+    # Links can sit inside editors, so the text area is searched
+    assert finder.find_element(title="Docs", role="AXLink") is link
+    ax.reset()
+    assert finder.find_element(title="Nothing", role="AXLink") is None
+    # Button labels are never read when looking for a link
+    assert ax.calls["AXUIElementCopyMultipleAttributeValues"] == len(root.walk()) - len(buttons) - 1
+    # Without a role any subtree may hold the match
+    assert finder.find_element(title="Inner") is label
+
+
+def test_tree_cache_serves_repeat_reads_and_rescans_after_a_missed_change():
+    target = FakeElement("AXButton", "Save")
+    root = app_with(grid(3, 2), target)
+    ax = FakeAX()
+    ax.add_app(1, root)
+    cache = AXTreeCache(backend=ax, run_loop=False, max_age=60.0)
+    workspace = FakeWorkspace([FakeRunningApp(1, "com.example.app", "Example")])
+    finder = AXFinder(backend=ax, cache=cache, registry=AppRegistry(workspace=workspace, backend=ax), max_workers=1)
+    assert finder.find_element(title="Save", role="AXButton") is target
+    finder.build_semantic_map(max_depth=10)
+    ax.reset()
+    finder.build_semantic_map(max_depth=10)
+    assert ax.ipc == 0
+    # Renamed without a notification: the cached title is wrong, so the miss triggers one uncached rescan
+    target.attrs["AXTitle"] = "Save As"
+    assert finder.find_element(title="Save As", role="AXButton") is target
+    assert cache.stats["invalidations"] >= 1
+    version = cache.version
+    ax.fire(target, "AXTitleChanged")
+    assert cache.version > version
@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import ApplicationServices
+import pytest
+
+from desktop_tetra.batch import run_batch, run_goal, summarize
+from tests.conftest import needs_visual
+
+READY = {"appears": {"role": "StaticText", "title": "Ready"}}
+# Spawned workers import the package afresh, without the pyobjc fakes conftest installs
+REAL_PYOBJC = getattr(ApplicationServices, "__file__", None) is not None
+
+
+def test_summarize_reports_nearest_rank_percentiles_and_throughput():
+    results = [{"index": i, "elapsed_s": float(i), "cycles": 1 + i % 2, "done": i != 7, "llm_calls": 1, "error": "TimeoutError" if i == 7 else None} for i in range(1, 21)]
+    summary = summarize(results, wall_seconds=4.0)
+    assert summary["latency_s"] == {"p50": 10.0, "p90": 18.0, "p95": 19.0, "p99": 20.0, "max": 20.0}
+    assert summary["throughput_goals_per_s"] == 5.0
+    assert (summary["goals"], summary["succeeded"], summary["errors"]) == (20, 19, 1)
+    assert summary["success_rate"] == 0.95
+    assert (summary["cycles_total"], summary["cycles_mean"], summary["llm_calls"]) == (30, 1.5, 20)
+    assert summarize([], wall_seconds=0.0)["latency_s"]["p50"] is None
+
+
+def test_run_goal_on_virtual_time_feeds_the_summary():
+    needs_visual()
+    results = [run_goal({"goal": "press New", "success": READY, "index": i}, {"provider": "stub", "virtual_time": True, "max_cycles": 2}) for i in range(3)]
+    for result in results:
+        assert result["error"] is None and result["done"]
+        # The stub's 0.5 s of "thinking" is virtual, so the run takes seconds of sim time but little wall time
+        assert result["sim_s"] >= 0.5
+        assert result["elapsed_s"] < result["sim_s"]
+    summary = summarize(results, wall_seconds=sum(r["elapsed_s"] for r in results))
+    assert summary["succeeded"] == 3
+    assert summary["latency_s"]["p50"] <= summary["latency_s"]["max"]
+
+
+@pytest.mark.skipif(not REAL_PYOBJC, reason="spawned workers need pyobjc")
+def test_run_batch_runs_sim_goals_across_workers():
+    needs_visual()
+    goals = [{"goal": "press New", "success": READY, "seed": i} for i in range(4)]
+    out = run_batch(goals, workers=2, provider="stub", virtual_time=True, max_cycles=2)
+    results = out["results"]
+    assert [r["index"] for r in results] == [0, 1, 2, 3]
+    assert all(r["error"] is None and r["done"] for r in results), results
+    summary = out["summary"]
+    assert summary["goals"] == 4 and summary["succeeded"] == 4
+    assert summary["latency_s"]["p50"] <= summary["latency_s"]["p95"] <= summary["latency_s"]["max"]
+    assert summary["throughput_goals_per_s"] > 0
@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+from desktop_tetra.llm import StubProvider
+from tests.conftest import stub_agent
+
+SAVED = {"appears": {"role": "StaticText", "title": "Saved Groceries"}}
+# Saves before typing anything; the notes-save app refuses that. Its UI shows up after a delay, hence the expects.
+HASTY = {"steps": [
+    {"action": "press", "params": {"role": "Button", "title": "New Note"}, "expect": {"appears": {"role": "Button", "title": "Save"}}},
+    {"action": "press", "params": {"role": "Button", "title": "Save"}},
+    {"action": "set_value", "params": {"role": "TextField", "title": "Name", "value": "Groceries"}},
+]}
+REPAIR = {"steps": [
+    {"action": "set_value", "params": {"role": "TextArea", "title": "Body", "value": "milk, eggs"}},
+    {"action": "press", "params": {"role": "Button", "title": "Save"}, "expect": {"appears": {"role": "TextField", "title": "Name"}}},
+    {"action": "set_value", "params": {"role": "TextField", "title": "Name", "value": "Groceries"}},
+    {"action": "press", "params": {"role": "Button", "title": "Confirm"}, "expect": SAVED},
+]}
+
+
+class ScriptedProvider(StubProvider):
+    # Streams the next plan on each call and keeps the prompts it was sent
+    def __init__(self, *plans):
+        super().__init__(plan=plans[0], latency=0.0)
+        self.plans = list(plans)
+        self.prompts = []
+
+    def stream_text(self, system, messages):
+        self.prompts.append(messages)
+        self.plan = self.plans[min(len(self.prompts), len(self.plans)) - 1]
+        return super().stream_text(system, messages)
+
+
+def test_failed_step_is_repaired_from_the_app_state_it_left(sim):
+    engine = sim(behavior="notes-save")
+    agent = stub_agent()
+    agent.provider = ScriptedProvider(HASTY, REPAIR)
+    out = agent.run_continuous("save a note called Groceries", success=SAVED, max_cycles=3)
+    assert out["done"] and out["cycles"] == 2
+    assert [r["ok"] for r in out["history"][0]["results"]] == [True, False]
+    assert [r["ok"] for r in out["history"][1]["results"]] == [True] * 4
+    # The repair prompt quotes what ran and what the app refused, and asks only for what is left
+    evidence = agent.provider.prompts[1][-1]["content"]
+    assert 'OK press {"role":"Button","title":"New Note"}' in evidence
+    assert 'FAILED press {"role":"Button","title":"Save"} -> action returned false' in evidence
+    assert "only the steps to run next" in evidence
+    assert engine.behavior.state == "saved"
+    # The route that worked, repair included, is what gets cached
+    assert list(agent.plan_cache._entries.values())[0]["plan"]["steps"] == HASTY["steps"][:1] + REPAIR["steps"]
@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import pytest
+
+from desktop_tetra.cassette import PROMPT_SCOPE, CassetteProvider
+from desktop_tetra.llm import StubProvider
+from tests.conftest import ocr_screen, stub_agent
+
+EDITOR = ocr_screen("Untitled", "Bold", "Italic", "Save")
+INBOX = ocr_screen("Inbox", "Compose", "Archive")
+PLAN = {"steps": [{"action": "press", "params": {"role": "Button", "title": "Save"}}]}
+
+
+def cassette_agent(path, mode):
+    agent = stub_agent()
+    inner = StubProvider(plan=PLAN, latency=0.0) if mode == "record" else None
+    agent.provider = CassetteProvider(str(path), mode=mode, inner=inner, model=agent.model)
+    return agent, inner
+
+
+def test_records_then_replays_then_misses_on_another_screen(screen, tmp_path):
+    path = tmp_path / "plans.jsonl"
+    screen(EDITOR)
+    agent, inner = cassette_agent(path, "record")
+    assert agent.plan("save the document") == PLAN
+    assert inner.calls == 1 and agent.provider.stats["recorded"] == 1
+    # The scope only lives for the call it keyed
+    assert PROMPT_SCOPE.get() is None
+
+    agent, _ = cassette_agent(path, "replay")
+    assert agent.plan("save the document") == PLAN
+    assert agent.provider.stats == {"hits": 1, "misses": 0, "recorded": 0}
+    # Another goal, or the same goal on another screen, was never recorded
+    with pytest.raises(RuntimeError, match="No cassette entry"):
+        agent.plan("archive the message")
+    screen(INBOX)
+    with pytest.raises(RuntimeError, match="No cassette entry"):
+        agent.plan("save the document")
+    assert agent.provider.stats["misses"] == 2
+
+
+def test_scope_is_reset_when_the_provider_fails(screen, tmp_path):
+    (tmp_path / "empty.jsonl").write_text("")
+    screen(EDITOR)
+    agent, _ = cassette_agent(tmp_path / "empty.jsonl", "replay")
+    with pytest.raises(RuntimeError):
+        agent.plan("save the document")
+    assert PROMPT_SCOPE.get() is None
@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import time
+
+from desktop_tetra.clock import VirtualClock
+from tests.conftest import stub_agent
+
+
+def test_pending_counts_only_events_still_due():
+    clock = VirtualClock()
+    fired = []
+    once = clock.call_later(1.0, lambda: fired.append("once"))
+    tick = clock.call_later(0.5, lambda: fired.append("tick"), period=0.5)
+    dropped = clock.call_later(2.0, lambda: fired.append("dropped"))
+    assert clock.pending() == 3
+    clock.cancel(dropped)
+    clock.cancel(dropped)
+    assert clock.pending() == 2
+    clock.advance(1.2)
+    assert fired == ["tick", "once", "tick"]
+    # Cancelling what already fired, or was never scheduled, changes nothing
+    clock.cancel(once)
+    clock.cancel(999)
+    assert clock.pending() == 1
+    clock.cancel(tick)
+    assert clock.pending() == 0
+    clock.advance(5.0)
+    assert fired == ["tick", "once", "tick"]
+
+
+def test_two_minute_sim_scenario_runs_in_well_under_a_second_of_wall_time(sim):
+    clock = VirtualClock()
+    sim(clock=clock)
+    # Every cycle spends 5 s "thinking" and a 0.5 s success check on the virtual clock
+    agent = stub_agent(latency=5.0)
+    started = time.perf_counter()
+    out = agent.run_continuous("press new", success={"appears": {"role": "Dialog", "title": "Never"}}, max_cycles=1000, max_time_seconds=120.0)
+    elapsed = time.perf_counter() - started
+    assert not out["done"]
+    assert clock.time() >= 120.0 and out["cycles"] >= 20
+    assert elapsed < 1.0
+    # Only the sim's own tick is left scheduled
+    assert clock.pending() == 1
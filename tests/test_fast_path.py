@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import pytest
+
+from desktop_tetra.agent_core.fast_path import FastPathPlanner
+from tests.conftest import stub_agent
+
+SCREEN = [
+    {"id": "win", "role": "AXWindow", "title": "Untitled", "app": "TextEdit"},
+    {"id": "save", "role": "AXButton", "title": "Save"},
+    {"id": "save-as", "role": "AXButton", "title": "Save As…"},
+    {"id": "name", "role": "AXTextField", "title": "Name"},
+    {"id": "remember", "role": "AXCheckBox", "title": "Remember me"},
+]
+CONTEXT = {"app": "TextEdit", "apps": ["Safari", "TextEdit"]}
+
+CORPUS = [
+    # Menus go to the current app
+    ("select File > Save As...", [{"action": "focus_app", "params": {"app": "TextEdit"}}, {"action": "menu_select", "params": {"path": ["File", "Save As..."], "app": "TextEdit"}}]),
+    ("choose File → Export…", [{"action": "focus_app", "params": {"app": "TextEdit"}}, {"action": "menu_select", "params": {"path": ["File", "Export…"], "app": "TextEdit"}}]),
+    ("File > Save As... in Preview.", [
+        {"action": "focus_app", "params": {"app": "Preview"}},
+        {"action": "menu_select", "params": {"path": ["File", "Save As..."], "app": "Preview"}},
+    ]),
+    ('open "Edit" > "Find..."', [{"action": "focus_app", "params": {"app": "TextEdit"}}, {"action": "menu_select", "params": {"path": ["Edit", "Find..."], "app": "TextEdit"}}]),
+    ("click Save.", [{"action": "press", "params": {"role": "Button", "title": "Save", "contains": False}}]),
+    ("press the Save As… button", [{"action": "press", "params": {"role": "Button", "title": "Save As…", "contains": False}}]),
+    ("check Remember me!", [{"action": "press", "params": {"role": "CheckBox", "title": "Remember me", "contains": False}}]),
+    ("type 'Q3 report' into the Name field", [{"action": "set_value", "params": {"role": "TextField", "title": "Name", "value": "Q3 report", "contains": False}}]),
+    ("open Safari", [{"action": "focus_app", "params": {"app": "Safari"}}]),
+    ("click Save then type Bob into Name", [
+        {"action": "press", "params": {"role": "Button", "title": "Save", "contains": False}},
+        {"action": "set_value", "params": {"role": "TextField", "title": "Name", "value": "Bob", "contains": False}},
+    ]),
+]
+# Left to the model: nothing on screen or in the text is certain enough
+UNSURE = ["wait for 5 seconds", "click Publish", "make the report look nicer", "open a new document"]
+
+
+@pytest.mark.parametrize("goal,steps", CORPUS)
+def test_simple_goals_are_planned_without_the_model(goal, steps):
+    plan = FastPathPlanner().plan(goal, SCREEN, CONTEXT)
+    assert plan is not None and plan["steps"] == steps
+
+
+def test_unsure_goals_fall_back_to_the_model():
+    planner = FastPathPlanner()
+    assert [planner.plan(goal, SCREEN, CONTEXT) for goal in UNSURE] == [None] * len(UNSURE)
+    assert planner.stats == {"planned": 0, "fallbacks": len(UNSURE)}
+
+
+def test_agent_acts_on_a_fast_path_plan_before_the_model_would_answer(sim):
+    sim()
+    agent = stub_agent(latency=2.0, fast_path=FastPathPlanner())
+    out = agent.run_continuous("click New", success={"appears": {"role": "StaticText", "title": "Ready"}})
+    assert out["done"] and out["fast_path"] == {"planned": 1, "fallbacks": 0}
+    assert agent.provider.calls == 0
+    # Cheap to rebuild, so never cached
+    assert len(agent.plan_cache) == 0
+    _, results, fast = agent.plan_and_execute("click New")
+    assert [r["ok"] for r in results] == [True]
+    _, _, slow = agent.plan_and_execute("get the app ready")
+    assert agent.provider.calls == 1
+    # Time to first action on the sim clock: none for the rule, most of the stub's 2 s for the model
+    assert fast["first_action_s"] < 0.1 < 1.0 < slow["first_action_s"]
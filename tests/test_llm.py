@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import time
+
+import pytest
+
+from desktop_tetra.llm import HedgedProvider, ResilientProvider, build_provider, supports_streaming
+from tests.fakes.llm_server import HTTPChatProvider, StubLLMServer
+
+MESSAGES = [{"role": "user", "content": "goal"}]
+
+
+def resilient(server: StubLLMServer, **kwargs) -> ResilientProvider:
+    kwargs.setdefault("backoff", 0.01)
+    return ResilientProvider(HTTPChatProvider(server.url), **kwargs)
+
+
+def test_retries_server_errors_until_a_reply():
+    with StubLLMServer(script=[{"status": 503}, {"status": 502}]) as server:
+        provider = resilient(server, retries=3, timeout=2.0)
+        assert provider.generate_json("system", MESSAGES) == server.plan
+    assert server.requests == 3
+    assert provider.stats["attempts"] == 3 and provider.stats["retries"] == 2 and provider.stats["failures"] == 0
+
+
+def test_does_not_retry_client_errors():
+    with StubLLMServer(script=[{"status": 401}]) as server:
+        provider = resilient(server, retries=3, timeout=2.0)
+        with pytest.raises(RuntimeError, match="1 attempt"):
+            provider.generate_json("system", MESSAGES)
+    assert server.requests == 1
+
+
+def test_times_out_each_attempt_and_gives_up_at_the_deadline():
+    with StubLLMServer(delay=3.0) as server:
+        provider = resilient(server, retries=1, timeout=0.3)
+        started = time.time()
+        with pytest.raises(RuntimeError, match="timed out"):
+            provider.generate_json("system", MESSAGES)
+        elapsed = time.time() - started
+    assert elapsed < 1.5
+    assert provider.stats["timeouts"] == 2 and provider.stats["failures"] == 1
+
+
+def test_timed_out_attempts_give_their_workers_back():
+    # More hung calls than the call pool has workers; each request gives up with its attempt
+    with StubLLMServer("hung", delay=10.0) as hung, StubLLMServer("quick") as quick:
+        provider = resilient(hung, retries=0, timeout=0.2)
+        for _ in range(20):
+            with pytest.raises(RuntimeError, match="timed out"):
+                provider.generate_json("system", MESSAGES)
+        assert provider.stats["timeouts"] == 20
+        # Would wait on a pool still blocked by the hung requests
+        started = time.time()
+        assert resilient(quick, retries=0, timeout=1.0).generate_json("system", MESSAGES) == quick.plan
+        assert time.time() - started < 0.5
+    assert hung.requests == 20
+
+
+def test_hedge_answers_from_the_faster_server():
+    with StubLLMServer("slow", delay=2.0) as slow, StubLLMServer("fast", delay=0.05) as fast:
+        hedged = HedgedProvider(resilient(slow, retries=0, timeout=5.0), resilient(fast, retries=0, timeout=5.0), hedge_after=0.2)
+        started = time.time()
+        assert hedged.generate_json("system", MESSAGES)["server"] == "fast"
+        assert time.time() - started < 1.0
+    assert hedged.stats["hedged"] == 1 and hedged.stats["secondary_wins"] == 1
+
+
+def test_hedge_is_not_sent_when_the_primary_is_quick():
+    with StubLLMServer("primary", delay=0.0) as primary, StubLLMServer("secondary") as secondary:
+        hedged = HedgedProvider(resilient(primary), resilient(secondary), hedge_after=0.5)
+        assert hedged.generate_json("system", MESSAGES)["server"] == "primary"
+    assert secondary.requests == 0
+    assert hedged.stats["hedged"] == 0 and hedged.stats["primary_wins"] == 1
+
+
+def test_hedge_is_sent_at_once_when_the_primary_fails():
+    with StubLLMServer("primary", script=[{"status": 401}]) as primary, StubLLMServer("secondary") as secondary:
+        hedged = HedgedProvider(resilient(primary), resilient(secondary), hedge_after=5.0)
+        started = time.time()
+        assert hedged.generate_json("system", MESSAGES)["server"] == "secondary"
+        assert time.time() - started < 1.0
+
+
+def test_hedged_stream_races_the_first_chunk():
+    with StubLLMServer("slow", delay=20.0) as slow, StubLLMServer("fast", delay=0.2) as fast:
+        hedged = HedgedProvider(resilient(slow, retries=0, timeout=5.0), resilient(fast, retries=0, timeout=5.0), hedge_after=0.1)
+        assert supports_streaming(hedged)
+        started = time.time()
+        stream = hedged.generate_json_stream("system", MESSAGES)
+        steps = list(stream)
+        assert time.time() - started < 1.5
+    assert steps == fast.plan["steps"]
+    assert stream.plan == fast.plan
+    assert slow.bodies[0]["stream"] and fast.bodies[0]["stream"]
+
+
+def test_stream_retries_only_before_the_first_chunk():
+    with StubLLMServer(script=[{"status": 503}]) as server:
+        provider = resilient(server, retries=2, timeout=2.0)
+        assert list(provider.generate_json_stream("system", MESSAGES)) == server.plan["steps"]
+    assert server.requests == 2
+
+
+def test_cross_vendor_hedge_needs_a_model():
+    with pytest.raises(ValueError, match="provider:model"):
+        build_provider("openai", "gpt-4o-mini", hedge="anthropic")
+    assert isinstance(build_provider("stub", "m", hedge="stub"), HedgedProvider)
+
+
+def test_openai_client_against_the_stub_server():
+    pytest.importorskip("openai")
+    with StubLLMServer(script=[{"status": 503}]) as server:
+        provider = build_provider("openai", "stub-model", api_key="test", base_url=server.url, timeout=2.0, retries=2)
+        assert provider.generate_json("system", MESSAGES) == server.plan
+        assert list(provider.generate_json_stream("system", MESSAGES)) == server.plan["steps"]
+    assert server.requests == 3
+    assert server.bodies[0]["model"] == "stub-model"
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Dict, Tuple
+
+from desktop_tetra import ax as ax_module
+from desktop_tetra.app_registry import AppRegistry
+from desktop_tetra.ax import AXFinder
+from tests.fakes.pyobjc import FakeAX, FakeElement, FakeRunningApp, FakeWorkspace
+
+
+class MenuAX(FakeAX):
+    # Submenus attach when their item is pressed, like AppKit populating a menu as it opens.
+    # drop_presses: items whose next N presses are swallowed (the menu never opens)
+    def __init__(self) -> None:
+        super().__init__()
+        self.submenus: Dict[FakeElement, FakeElement] = {}
+        self.open_delay: Dict[FakeElement, float] = {}
+        self.drop_presses: Dict[FakeElement, int] = {}
+
+    def AXUIElementPerformAction(self, element: FakeElement, action: str) -> int:
+        err = super().AXUIElementPerformAction(element, action)
+        if self.drop_presses.get(element):
+            self.drop_presses[element] -= 1
+            return err
+        submenu = self.submenus.get(element)
+        if submenu is not None and submenu not in element.attrs["AXChildren"]:
+            delay = self.open_delay.get(element, 0.0)
+            if delay:
+                threading.Timer(delay, element.append, (submenu,)).start()
+            else:
+                element.append(submenu)
+        return err
+
+
+def menu_app() -> Tuple[MenuAX, AXFinder, Dict[str, FakeElement]]:
+    ax = MenuAX()
+    items = {
+        "File": FakeElement("AXMenuBarItem", "File"),
+        "New": FakeElement("AXMenuItem", "New"),
+        "Export": FakeElement("AXMenuItem", "Export"),
+        "PDF": FakeElement("AXMenuItem", "PDF…"),
+        "HTML": FakeElement("AXMenuItem", "HTML"),
+    }
+    ax.submenus[items["File"]] = FakeElement("AXMenu", None, (items["New"], items["Export"]))
+    ax.submenus[items["Export"]] = FakeElement("AXMenu", None, (items["PDF"], items["HTML"]))
+    menu_bar = FakeElement("AXMenuBar", None, (FakeElement("AXMenuBarItem", "Apple"), items["File"]))
+    root = FakeElement("AXApplication", "Example", (FakeElement("AXWindow", "Main"),), AXMenuBar=menu_bar)
+    ax.add_app(1, root)
+    for submenu in ax.submenus.values():
+        for element in submenu.walk():
+            element.pid = 1
+    workspace = FakeWorkspace([FakeRunningApp(1, "com.example.app", "Example")])
+    return ax, AXFinder(backend=ax, registry=AppRegistry(workspace=workspace, backend=ax), max_workers=1), items
+
+
+def presses(items: Dict[str, FakeElement]) -> Dict[str, int]:
+    return {name: len(el.performed) for name, el in items.items() if el.performed}
+
+
+def test_nested_path_presses_each_level_once():
+    _, finder, items = menu_app()
+    assert finder.menu_select(["File", "Export", "PDF…"], timeout_seconds=2.0)
+    assert presses(items) == {"File": 1, "Export": 1, "PDF": 1}
+
+
+def test_missing_item_fails_within_the_timeout():
+    _, finder, items = menu_app()
+    started = time.perf_counter()
+    assert not finder.menu_select(["File", "Export", "Word"], timeout_seconds=0.3)
+    assert time.perf_counter() - started < 1.0
+    assert presses(items) == {"File": 1, "Export": 1}
+
+
+def test_slow_submenu_is_polled_rather_than_pressed_again():
+    ax, finder, items = menu_app()
+    ax.open_delay[items["Export"]] = 0.2
+    assert finder.menu_select(["File", "Export", "HTML"], timeout_seconds=2.0)
+    assert presses(items) == {"File": 1, "Export": 1, "HTML": 1}
+
+
+def test_submenu_that_never_opened_is_pressed_again(monkeypatch):
+    monkeypatch.setattr(ax_module, "MENU_REOPEN_AFTER", 0.1)
+    ax, finder, items = menu_app()
+    ax.drop_presses[items["Export"]] = 1
+    assert finder.menu_select(["File", "Export", "PDF…"], timeout_seconds=2.0)
+    assert presses(items) == {"File": 1, "Export": 2, "PDF": 1}
+
+
+def test_resolved_items_are_reused_without_walking_the_menu_bar():
+    ax, finder, items = menu_app()
+    assert finder.menu_select(["File", "New"], timeout_seconds=2.0)
+    ax.reset()
+    assert finder.menu_select(["File", "New"], timeout_seconds=2.0)
+    # Two presses and nothing read
+    assert ax.calls == {"AXUIElementPerformAction": 2}
+    assert presses(items) == {"File": 2, "New": 2}
@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+from desktop_tetra.agent_core.plan_cache import ui_fingerprint
+from tests.conftest import ocr_screen, stub_agent
+
+INBOX = ocr_screen("Inbox", "Compose", "Archive", "12:01")
+EDITOR = ocr_screen("Untitled", "Bold", "Italic", "Save", "12:01")
+SETTINGS = ocr_screen("Settings", "General", "Accounts", "12:01")
+
+
+def test_ocr_screens_get_different_fingerprints():
+    keys = {ui_fingerprint(nodes) for nodes in (INBOX, EDITOR, SETTINGS)}
+    assert len(keys) == 3
+    assert ui_fingerprint([]) not in keys
+    # The clock ticking over is the same screen
+    assert ui_fingerprint(ocr_screen("Inbox", "Compose", "Archive", "12:02")) == ui_fingerprint(INBOX)
+
+
+def test_structural_fingerprint_ignores_free_text():
+    window = [{"role": "AXWindow", "title": "Notes"}, {"role": "AXButton", "title": "New"}]
+    status = [{"role": "AXStaticText", "title": "Saved 3 minutes ago"}]
+    assert ui_fingerprint(window + status) == ui_fingerprint(window)
+
+
+def test_cached_plan_is_only_replayed_on_the_same_screen(screen):
+    agent = stub_agent()
+    goal = "save the document"
+    screen(EDITOR)
+    plan = agent.plan(goal)
+    agent.record_outcome(goal, plan, [{"ok": True}])
+    assert agent.provider.calls == 1
+    assert agent.plan(goal) == plan
+    assert agent.provider.calls == 1
+    for other in (INBOX, SETTINGS):
+        screen(other)
+        agent.plan(goal)
+    assert agent.provider.calls == 3
+    screen(EDITOR)
+    agent.plan(goal)
+    assert agent.provider.calls == 3
+    assert agent.plan_cache.stats["hits"] == 2
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+from desktop_tetra.agent_core.prompt_state import PromptStateBuilder, estimate_tokens
+
+SCREEN = [
+    {"role": "AXWindow", "title": "Untitled"},
+    {"role": "AXGroup"},
+    {"role": "AXButton", "title": "Save", "id": "save"},
+    {"role": "AXTextField", "title": "Name", "id": "name", "value": ""},
+    {"role": "AXStaticText", "title": "Ready"},
+]
+
+
+def test_render_ranks_actionable_elements_and_drops_unlabelled_containers():
+    text = PromptStateBuilder().render(SCREEN)
+    lines = text.splitlines()
+    assert lines[0] == "UI state (4 elements, most salient first):"
+    assert lines[1:] == ['Window "Untitled"', 'Button "Save" #save', 'TextField "Name" #name', 'StaticText "Ready"']
+
+
+def test_diff_reports_only_what_changed():
+    builder = PromptStateBuilder()
+    assert builder.diff(SCREEN) is None
+    builder.render(SCREEN)
+    assert builder.diff(SCREEN) == "UI changes since last cycle: none"
+    after = [n for n in SCREEN if n.get("title") != "Ready"] + [{"role": "AXSheet", "title": "Save As"}]
+    after[3] = dict(after[3], value="report")
+    diff = builder.diff(after)
+    assert diff.splitlines() == [
+        "UI changes since last cycle (1 added, 1 changed, 1 removed):",
+        '+ Sheet "Save As"',
+        "~ TextField \"Name\" #name value='report'",
+        '- StaticText "Ready"',
+    ]
+    # The diff is the new baseline
+    assert builder.diff(after) == "UI changes since last cycle: none"
+
+
+def test_state_stays_within_the_token_budget():
+    nodes = [{"role": "AXButton", "title": f"Button number {i}", "id": f"b{i}"} for i in range(500)]
+    builder = PromptStateBuilder(max_tokens=200)
+    text = builder.render(nodes)
+    assert estimate_tokens(text) <= 200 + estimate_tokens("... 999 more omitted")
+    assert text.splitlines()[-1].endswith("more omitted")
+    builder.render([])
+    diff = builder.diff(nodes)
+    assert estimate_tokens(diff) <= 200 + estimate_tokens("... 999 more omitted")
+
+
+def test_repeated_elements_are_counted_once():
+    nodes = [{"role": "AXCell", "title": "row"}] * 30
+    assert PromptStateBuilder().render(nodes).splitlines()[1] == 'Cell "row" x30'
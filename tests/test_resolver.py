@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+from desktop_tetra.app_registry import AppRegistry
+from desktop_tetra.ax import AXFinder
+from desktop_tetra.ax_cache import AXTreeCache
+from desktop_tetra.connectors.macos import MacOSConnector
+from desktop_tetra.connectors.resolver import ElementResolver
+from tests.fakes.pyobjc import FakeAX, FakeElement, FakeRunningApp, FakeWorkspace
+
+SAVE = {"role": "AXButton", "title": "Save"}
+
+
+class HitAX(FakeAX):
+    # Records where the resolver hit-tests
+    def __init__(self) -> None:
+        super().__init__()
+        self.positions = []
+
+    def AXUIElementCopyElementAtPosition(self, system_wide, x, y, _out):
+        self.positions.append((x, y))
+        return super().AXUIElementCopyElementAtPosition(system_wide, x, y, _out)
+
+
+def connector():
+    save = FakeElement("AXButton", "Save", actions=("AXPress",))
+    # Same text, wrong kind of control
+    field = FakeElement("AXTextField", "Save")
+    ax = HitAX()
+    ax.add_app(1, FakeElement("AXApplication", "Editor", (FakeElement("AXWindow", "Doc", (save, field)),)))
+    workspace = FakeWorkspace([FakeRunningApp(1, "com.example.editor", "Editor")])
+    conn = MacOSConnector.__new__(MacOSConnector)
+    conn.ax = AXFinder(backend=ax, cache=AXTreeCache(backend=ax, run_loop=False), registry=AppRegistry(workspace=workspace, backend=ax), max_workers=1)
+    return conn, ax, save, field
+
+
+def node(x=200, y=100, title="Save"):
+    return {"id": "ocr:3", "role": "StaticText", "title": title, "frame": {"x": x, "y": y, "w": 100, "h": 40}, "source": "ocr"}
+
+
+def test_hit_test_resolves_a_node_and_reuses_it_while_it_stays_put():
+    conn, ax, save, _ = connector()
+    ax.hit = save
+    resolver = ElementResolver(conn)
+    assert resolver.resolve(node(), selector=SAVE) is save
+    assert resolver.resolve(node(), selector=SAVE) is save
+    # Only the first lookup crossed into the app to hit-test
+    assert ax.calls["AXUIElementCopyElementAtPosition"] == 1
+    assert ax.positions == [(250.0, 120.0)]
+    assert resolver.stats["hit_tests"] == 1 and resolver.stats["hits"] == 1 and resolver.stats["fallbacks"] == 0
+
+
+def test_moved_node_whose_hit_does_not_match_falls_back_to_a_search():
+    conn, ax, save, field = connector()
+    ax.hit = save
+    resolver = ElementResolver(conn)
+    assert resolver.resolve(node(), selector=SAVE) is save
+    # The node moved and what is now under its centre is a text field, not the button
+    ax.hit = field
+    assert resolver.resolve(node(x=400), selector=SAVE, timeout_seconds=0.0) is save
+    assert resolver.stats["rejected"] == 1 and resolver.stats["fallbacks"] == 1
+    assert ax.positions[-1] == (450.0, 120.0)
+    # Without a fallback the mismatch resolves to nothing
+    assert resolver.resolve(node(x=600), selector=SAVE, fallback=False) is None
+    assert resolver.stats["unresolved"] == 1
+
+
+def test_perception_pixels_are_scaled_to_screen_points():
+    conn, ax, save, _ = connector()
+    ax.hit = save
+    resolver = ElementResolver(conn, scale=2.0, origin=(0.0, 25.0))
+    assert resolver.resolve(node(), selector=SAVE) is save
+    assert ax.positions == [(125.0, 85.0)]
+
+
+def test_invalidate_forces_a_fresh_hit_test():
+    conn, ax, save, _ = connector()
+    ax.hit = save
+    resolver = ElementResolver(conn)
+    resolver.resolve(node(), selector=SAVE)
+    resolver.invalidate(resolver.node_key(node()))
+    resolver.invalidate("ocr:unknown")
+    assert resolver.resolve(node(), selector=SAVE) is save
+    resolver.invalidate()
+    assert resolver.resolve(node(), selector=SAVE) is save
+    assert ax.calls["AXUIElementCopyElementAtPosition"] == 3
+    assert resolver.stats["invalidations"] == 2 and resolver.stats["hits"] == 0
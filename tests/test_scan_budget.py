@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import json
+import time
+
+from desktop_tetra.connectors.base import ScanBudget, nodes_to_tree
+from tests.fakes.pyobjc import FakeElement, ax_finder
+from tests.test_ax import app_with, grid
+
+
+def test_node_budget_stops_reading_the_tree():
+    root = app_with(grid(4, 4))
+    ax, finder = ax_finder(root, max_workers=1)
+    budget = ScanBudget(max_nodes=10)
+    nodes = list(budget.stream(finder.iter_semantic_map(max_depth=10)))
+    assert len(nodes) == 10 and budget.truncated == "max_nodes"
+    # Streamed: one element past the budget is read, not the other ~330
+    assert ax.calls["AXUIElementCopyMultipleAttributeValues"] == 11 < len(root.walk())
+
+
+def test_byte_budget_keeps_output_under_the_limit():
+    root = app_with(grid(3, 3))
+    _, finder = ax_finder(root, max_workers=1)
+    budget = ScanBudget(max_bytes=2000)
+    nodes = list(budget.stream(finder.iter_semantic_map(max_depth=10)))
+    assert budget.truncated == "max_bytes"
+    assert 0 < sum(len(json.dumps(n, default=str)) for n in nodes) == budget.bytes <= 2000
+
+
+def test_time_budget_cuts_a_slow_scan_short():
+    root = app_with(grid(4, 4))
+    _, finder = ax_finder(root, latency=0.005, max_workers=1)
+    budget = ScanBudget(max_seconds=0.1)
+    started = time.perf_counter()
+    nodes = list(budget.stream(finder.iter_semantic_map(max_depth=10)))
+    assert budget.truncated == "max_seconds"
+    assert 0 < len(nodes) < len(root.walk())
+    assert time.perf_counter() - started < 0.5
+
+
+def test_unbounded_stream_rebuilds_the_semantic_map():
+    root = app_with(grid(3, 2), FakeElement("AXButton", "OK"))
+    _, finder = ax_finder(root, max_workers=1)
+    budget = ScanBudget(max_nodes=1000)
+    nodes = list(budget.stream(finder.iter_semantic_map(max_depth=10)))
+    assert budget.truncated is None and budget.nodes == len(root.walk())
+    assert nodes_to_tree(nodes) == finder.build_semantic_map(max_depth=10)
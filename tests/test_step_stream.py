@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import json
+import random
+
+import pytest
+
+from desktop_tetra.agent_core.step_stream import StepParser, StepStream
+from desktop_tetra.llm import LLMProvider
+from tests.conftest import ocr_screen, stub_agent
+
+PLAN = {
+    "steps": [
+        {"action": "press", "params": {"title": "a } \" ] {"}},
+        {"action": "wait_for", "params": {"role": "X", "nested": {"k": [1, {"z": 2}]}}},
+        {"action": "scan", "params": {}},
+    ],
+    "note": "x",
+}
+
+
+def test_parser_emits_each_step_whatever_the_chunking():
+    text = "```json\n" + json.dumps(PLAN, indent=1) + "\n```"
+    rng = random.Random(0)
+    for _ in range(200):
+        parser = StepParser()
+        out = []
+        pos = 0
+        while pos < len(text):
+            size = rng.randint(1, 7)
+            out += parser.feed(text[pos:pos + size])
+            pos += size
+        assert out == PLAN["steps"]
+        assert parser.result() == PLAN
+
+
+def test_stream_yields_a_step_before_generation_finishes():
+    text = json.dumps(PLAN)
+    chunks = [text[i:i + 8] for i in range(0, len(text), 8)]
+    consumed = []
+
+    def generate():
+        for chunk in chunks:
+            consumed.append(chunk)
+            yield chunk
+
+    stream = StepStream(generate())
+    steps = iter(stream)
+    assert next(steps) == PLAN["steps"][0]
+    assert len(consumed) < len(chunks) // 2
+    assert list(steps) == PLAN["steps"][1:]
+    assert stream.plan == PLAN
+
+
+def test_truncated_stream_keeps_the_steps_that_closed():
+    text = json.dumps(PLAN)
+    cut = text.index('{"action": "scan"')
+    stream = StepStream([text[:cut + 5]])
+    assert list(stream) == PLAN["steps"][:2]
+    assert stream.plan == {"steps": PLAN["steps"][:2]}
+
+
+def test_agent_starts_acting_while_the_plan_is_still_streaming(monkeypatch):
+    # The agent imports the visual pipeline
+    for module in ("mss", "numpy", "cv2", "PIL", "pytesseract"):
+        pytest.importorskip(module)
+    from desktop_tetra.agent import Agent
+    from desktop_tetra.clock import VirtualClock
+    from desktop_tetra.interaction.sim.engine import SimEngine
+
+    plan = {"steps": [{"action": "focus_app", "params": {"app": "SimApp"}}] + [{"action": "scan", "params": {}}] * 12}
+    monkeypatch.setenv("DESKTOP_TETRA_STUB_PLAN", json.dumps(plan))
+    monkeypatch.setenv("DESKTOP_TETRA_STUB_LATENCY", "2.0")
+    engine = SimEngine.reset(clock=VirtualClock())
+    engine.start()
+    try:
+        agent = Agent(provider="stub", os_override="sim")
+        result_plan, results, timing = agent.plan_and_execute("focus the sim app")
+    finally:
+        engine.stop()
+    assert result_plan == plan
+    assert [r["action"] for r in results] == [s["action"] for s in plan["steps"]]
+    # The first step ran a fraction of the way into the 2s generation, not after all of it
+    assert timing["total_s"] >= 2.0
+    assert timing["first_action_s"] < timing["total_s"] / 4
+
+
+class RecordingStream(LLMProvider):
+    # Streams the plan in small chunks and records how much was generated and whether the stream was closed
+    def __init__(self, plan):
+        self.text = json.dumps(plan)
+        self.chunks = [self.text[i:i + 8] for i in range(0, len(self.text), 8)]
+        self.sent = []
+        self.closed = []
+        self.prompts = []
+
+    def stream_text(self, system, messages):
+        self.prompts.append(messages)
+        sent = 0
+        try:
+            for chunk in self.chunks:
+                sent += 1
+                yield chunk
+        finally:
+            self.sent.append(sent)
+            self.closed.append(sent < len(self.chunks))
+
+
+FAILING_PLAN = {"steps": [{"action": "press", "params": {"role": "Button", "title": "Missing"}}] + [{"action": "scan", "params": {"note": "x" * 40}}] * 8}
+
+
+def test_plan_stopped_on_failure_closes_the_stream_and_is_marked_truncated(sim):
+    sim()
+    agent = stub_agent()
+    agent.provider = RecordingStream(FAILING_PLAN)
+    plan, results, timing = agent.plan_and_execute("press missing", stop_on_failure=True)
+    assert [r["ok"] for r in results] == [False]
+    assert timing["stopped"] == "failure" and timing["truncated"]
+    assert plan == {"steps": FAILING_PLAN["steps"][:1], "truncated": True}
+    # Generation stopped with the failure instead of running to the end
+    assert agent.provider.closed == [True]
+    assert agent.provider.sent[0] < len(agent.provider.chunks) / 2
+    assert len(agent.plan_cache) == 0
+
+
+def test_repair_after_a_truncated_plan_says_the_rest_was_never_generated(sim):
+    sim()
+    agent = stub_agent()
+    agent.provider = RecordingStream(FAILING_PLAN)
+    out = agent.run_continuous("press missing", success={"role": "StaticText", "title": "Never"}, max_cycles=2)
+    assert out["cycles"] == 2
+    evidence = agent.provider.prompts[1][-1]["content"]
+    assert "FAILED press" in evidence and "never generated" in evidence
+    assert agent.provider.closed == [True, True]
+
+
+def test_role_or_ocr_evidence_alone_does_not_end_the_plan(sim, screen):
+    sim()
+    # Perception sees static text, just not the text the goal is waiting for
+    screen(ocr_screen("Untitled", "Draft"))
+    agent = stub_agent()
+    plan = {"steps": [{"action": "press", "params": {"role": "Button", "title": "New"}}, {"action": "scan", "params": {}}]}
+    agent.provider = RecordingStream(plan)
+    ran, results, timing = agent.plan_and_execute("save it", success={"appears": {"role": "StaticText", "title": "Saved"}})
+    assert len(results) == 2 and timing["stopped"] is None
+    assert ran == plan and agent.provider.closed == [False]
+    screen(ocr_screen("Saved"))
+    assert agent.is_goal_satisfied({"appears": {"role": "StaticText", "title": "Saved"}}, timeout_seconds=0.0)
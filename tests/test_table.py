@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import json
+import random
+import tracemalloc
+from typing import Any, Dict
+
+from desktop_tetra.connectors.table import SemanticTable
+from tests.fakes.pyobjc import FakeElement, ax_finder
+
+
+def random_tree(rng: random.Random, depth: int) -> FakeElement:
+    if depth == 0:
+        role = rng.choice(["AXStaticText", "AXButton", "AXImage"])
+        return FakeElement(role, f"t{rng.randrange(1000)}", actions=("AXPress", "AXShowMenu"), AXEnabled=rng.choice([True, False]))
+    return FakeElement("AXGroup", None, tuple(random_tree(rng, depth - 1) for _ in range(4)), actions=("AXShowMenu",))
+
+
+def count(node: Dict[str, Any]) -> int:
+    return 1 + sum(count(c) for c in node.get("children", []))
+
+
+def scanned(depth: int):
+    root = FakeElement("AXApplication", "Example", (FakeElement("AXWindow", "Main", (random_tree(random.Random(1), depth),)),))
+    _, finder = ax_finder(root, max_workers=1)
+    return finder
+
+
+def test_streamed_table_rebuilds_the_same_tree():
+    finder = scanned(4)
+    tree = finder.build_semantic_map(max_depth=20)
+    table = SemanticTable.from_stream(finder.iter_semantic_map(max_depth=20))
+    assert len(table) == 2 + 4 ** 5 // 3
+    assert table.to_tree() == tree
+    assert SemanticTable.from_tree(tree).to_tree() == tree
+
+
+def test_table_json_round_trip_is_smaller_than_the_tree():
+    finder = scanned(4)
+    tree = finder.build_semantic_map(max_depth=20)
+    table = SemanticTable.from_stream(finder.iter_semantic_map(max_depth=20))
+    data = json.loads(json.dumps(table.to_json()))
+    assert SemanticTable.from_json(data).to_tree() == tree
+    assert len(json.dumps(table.to_json(), separators=(",", ":"))) < len(json.dumps(tree, separators=(",", ":")))
+
+
+def test_table_holds_less_memory_than_the_tree():
+    finder = scanned(5)
+    tracemalloc.start()
+    tree = finder.build_semantic_map(max_depth=20)
+    tree_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    tracemalloc.start()
+    table = SemanticTable.from_stream(finder.iter_semantic_map(max_depth=20))
+    table_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    assert len(table) == count(tree)
+    assert table_bytes < tree_bytes
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from desktop_tetra.clock import VirtualClock
+from desktop_tetra.tracing import Tracer
+from tests.conftest import stub_agent
+
+
+def spans(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_spans_are_written_as_jsonl_and_summarised(tmp_path):
+    clock = VirtualClock()
+    tracer = Tracer(str(tmp_path / "trace.jsonl"), clock=clock)
+    for ms in range(1, 21):
+        with tracer.span("step", n=ms) as span:
+            with tracer.span("conn.press"):
+                clock.sleep(ms / 1000.0)
+            span.set(ok=ms % 5 != 0)
+    with pytest.raises(ValueError):
+        with tracer.span("verify"):
+            raise ValueError("no match")
+    tracer.close()
+
+    events = spans(tmp_path / "trace.jsonl")
+    assert len(events) == 41
+    assert {e["trace"] for e in events} == {tracer.trace_id}
+    steps = {e["span"]: e for e in events if e["name"] == "step"}
+    presses = [e for e in events if e["name"] == "conn.press"]
+    # Children are written first and point at their enclosing span
+    assert all(e["parent"] in steps for e in presses)
+    assert steps[presses[4]["parent"]]["attrs"] == {"n": 5, "ok": False}
+    assert events[-1]["attrs"] == {"error": "ValueError: no match"}
+
+    summary = tracer.summary()
+    assert summary["step"]["count"] == 20
+    assert (summary["step"]["p50_ms"], summary["step"]["p95_ms"]) == (10.0, 19.0)
+    assert summary["step"]["total_ms"] == 210.0
+    assert summary["verify"]["count"] == 1
+
+
+def test_traced_agent_reports_each_stage(sim, tmp_path):
+    sim()
+    tracer = Tracer(str(tmp_path / "agent.jsonl"))
+    agent = stub_agent(latency=0.5, tracer=tracer)
+    out = agent.run_continuous("press new", success={"appears": {"role": "StaticText", "title": "Ready"}}, max_cycles=2)
+    tracer.close()
+    assert out["done"]
+    # Spans are timed on the sim's virtual clock, so the stub's 0.5 s shows up exactly
+    assert out["trace"]["llm.stream"]["p50_ms"] == pytest.approx(500.0, abs=1.0)
+    assert {"cycle", "step", "conn.find_element", "conn.press", "success_check"} <= set(out["trace"])
+    names = [e["name"] for e in spans(tmp_path / "agent.jsonl")]
+    assert names.count("cycle") == out["trace"]["cycle"]["count"] == out["cycles"]
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import threading
+import time
+
+from desktop_tetra.app_registry import AppRegistry
+from desktop_tetra.ax import AXFinder
+from desktop_tetra.ax_cache import AXTreeCache
+from desktop_tetra.connectors.base import wait_until
+from desktop_tetra.connectors.macos import MacOSConnector
+from desktop_tetra.connectors.sim import SimConnector
+from desktop_tetra.interaction.crdt import CRDTStore
+from tests.fakes.pyobjc import FakeAX, FakeElement, FakeRunningApp, FakeWorkspace
+
+
+def later(seconds: float, fn) -> threading.Timer:
+    timer = threading.Timer(seconds, fn)
+    timer.start()
+    return timer
+
+
+def test_wait_until_wakes_on_a_version_bump_instead_of_polling():
+    store = CRDTStore()
+    checks = []
+
+    def check() -> bool:
+        checks.append(time.perf_counter())
+        return store.get("done") is not None
+
+    later(0.2, lambda: store.upsert_node({"id": "done", "role": "StaticText", "title": "Done"}))
+    started = time.perf_counter()
+    # A 30 s backoff: only the change notification can get it back in time
+    assert wait_until(check, source=store, timeout_seconds=30.0, initial_backoff=30.0, max_backoff=30.0)
+    assert time.perf_counter() - started < 1.0
+    assert len(checks) == 2
+
+
+def test_macos_wait_for_wakes_on_an_ax_notification():
+    window = FakeElement("AXWindow", "Main", (FakeElement("AXButton", "Start"),))
+    root = FakeElement("AXApplication", "Example", (window,))
+    ax = FakeAX()
+    ax.add_app(1, root)
+    # Cached reads never expire here, so only the notification can reveal the new button
+    cache = AXTreeCache(backend=ax, run_loop=False, max_age=60.0)
+    workspace = FakeWorkspace([FakeRunningApp(1, "com.example.app", "Example")])
+    conn = MacOSConnector.__new__(MacOSConnector)
+    conn.ax = AXFinder(backend=ax, cache=cache, registry=AppRegistry(workspace=workspace, backend=ax), max_workers=1)
+    conn.changes = cache
+    assert conn.find_element({"role": "AXButton", "title": "Start"}, timeout_seconds=0.0) is not None
+
+    def appear() -> None:
+        done = window.append(FakeElement("AXButton", "Done"))
+        done.pid = 1
+        ax.fire(done, "AXCreated")
+
+    later(0.4, appear)
+    started = time.perf_counter()
+    assert conn.wait_for({"appears": {"role": "AXButton", "title": "Done"}}, timeout_seconds=5.0)
+    # Backoff alone would next look at ~0.75 s
+    assert time.perf_counter() - started < 0.65
+    assert cache.stats["notifications"] == 1
+
+
+def test_sim_wait_for_runs_on_the_virtual_clock(sim):
+    engine = sim()
+    clock = engine.clock
+    conn = SimConnector()
+    assert conn.clock is clock
+    clock.call_later(5.0, lambda: engine.store.upsert_node({"id": "saved", "role": "StaticText", "title": "Saved"}))
+    wall = time.perf_counter()
+    assert conn.wait_for({"appears": {"role": "StaticText", "title": "Saved"}}, timeout_seconds=30.0)
+    # Woken by the store change at virtual t=5, not the end of the timeout
+    assert 5.0 <= clock.time() < 5.5
+    assert not conn.wait_for({"appears": {"role": "StaticText", "title": "Never"}}, timeout_seconds=60.0)
+    assert clock.time() >= 65.0
+    assert time.perf_counter() - wall < 1.0
@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import sys
+import threading
+import time
+import types
+
+import pytest
+
+from desktop_tetra.connectors.uia_events import UIAEventSource
+from tests.fakes.uia import FakeAutomation, FakeUIAElement, fake_comtypes, fake_uiautomation
+
+
+@pytest.fixture
+def desktop(monkeypatch):
+    automation = FakeAutomation()
+    uia = fake_uiautomation(automation)
+    monkeypatch.setitem(sys.modules, "uiautomation", uia)
+    for name, module in fake_comtypes(automation).items():
+        monkeypatch.setitem(sys.modules, name, module)
+    processes = {}
+    psutil = types.SimpleNamespace(Process=lambda pid: types.SimpleNamespace(name=lambda: processes[pid]))
+    monkeypatch.setitem(sys.modules, "psutil", psutil)
+    return automation, uia, processes
+
+
+def window(pid: int, title: str, hwnd: int, *children: FakeUIAElement) -> FakeUIAElement:
+    return FakeUIAElement("WindowControl", title, children, pid=pid, hwnd=hwnd)
+
+
+def connector(uia, events=None):
+    from desktop_tetra.connectors.windows import WindowsConnector
+
+    return WindowsConnector(events=events if events is not None else UIAEventSource(uia))
+
+
+def test_scan_reads_each_app_window_in_one_cached_round_trip(desktop):
+    automation, uia, processes = desktop
+    processes.update({10: "notepad.exe", 20: "explorer.exe"})
+    buttons = [FakeUIAElement("ButtonControl", f"b{i}") for i in range(20)]
+    automation.add_window(window(10, "Untitled - Notepad", 1, *buttons))
+    automation.add_window(window(20, "Documents - Explorer", 2, FakeUIAElement("ButtonControl", "Back")))
+    conn = connector(uia)
+    nodes = list(conn.iter_semantic_map(app="Notepad", max_depth=4))
+    assert [n["title"] for n in nodes] == ["Untitled - Notepad"] + [f"b{i}" for i in range(20)]
+    # One call lists the top-level windows, one pulls the whole matching window; none per control
+    assert automation.calls["BuildUpdatedCache"] == 2
+
+
+def test_app_windows_match_by_process_then_whole_title_parts(desktop):
+    automation, uia, processes = desktop
+    processes.update({10: "StickyNotes.exe", 20: "explorer.exe", 30: "notes.exe"})
+    sticky = automation.add_window(window(10, "Sticky Notes", 1))
+    folder = automation.add_window(window(20, "Notes - File Explorer", 2))
+    conn = connector(uia)
+    # "Notes" is a whole part of the folder window's title, never a substring of "Sticky Notes"
+    assert conn._app_roots("Notes") == [folder]
+    assert conn._app_roots("Sticky Notes") == [sticky]
+    assert conn._app_roots("10") == [sticky]
+    assert conn._app_roots("Paint") == []
+    # A window of the named process outranks one that only shares a title word
+    notes = automation.add_window(window(30, "Shopping list", 3))
+    assert conn._app_roots("Notes") == [notes]
+
+
+def test_lookup_wakes_on_an_event_and_then_serves_from_cache(desktop):
+    automation, uia, processes = desktop
+    processes[10] = "notepad.exe"
+    win = automation.add_window(window(10, "Untitled - Notepad", 1))
+    events = UIAEventSource(uia)
+    conn = connector(uia, events)
+
+    def appear() -> None:
+        time.sleep(0.3)
+        win.children.append(FakeUIAElement("ButtonControl", "Save", pid=10, automation=automation))
+        automation.fire()
+
+    threading.Thread(target=appear, daemon=True).start()
+    started = time.time()
+    found = conn.find_element({"title": "Save", "app": "Notepad"}, timeout_seconds=3.0)
+    elapsed = time.time() - started
+    assert found is not None and found.Name == "Save"
+    # The backoff alone would not search again until ~0.75s; the event triggers the search right away
+    assert elapsed < 0.6
+    assert automation.calls["Search"] <= 5
+    searches = automation.calls["Search"]
+    for _ in range(50):
+        assert conn.find_element({"title": "Save", "app": "Notepad"}, timeout_seconds=0.0) is found
+    assert automation.calls["Search"] == searches
+    automation.fire()
+    conn.find_element({"title": "Save", "app": "Notepad"}, timeout_seconds=0.0)
+    assert automation.calls["Search"] == searches + 1
+    events.close()
+
+
+def test_event_handlers_are_registered_and_removed_on_an_mta_thread(desktop):
+    automation, uia, processes = desktop
+    comtypes = sys.modules["comtypes"]
+    events = UIAEventSource(uia)
+    win = automation.add_window(window(10, "Untitled - Notepad", 7))
+    assert events.watch(win, "notepad")
+    assert events.watch(win, "notepad")
+    assert automation.calls["AddStructureChangedEventHandler"] == 1
+    assert automation.threads["AddStructureChangedEventHandler"] == "uia-events"
+    assert comtypes.apartments == {"uia-events": comtypes.COINIT_MULTITHREADED}
+    version = events.version
+    automation.fire()
+    assert events.version == version + 1
+    events.close()
+    assert automation.threads["RemoveAllEventHandlers"] == "uia-events"
+    # Without a window handle there is nothing to subscribe to; lookups fall back to backoff rescans
+    assert not events.watch(FakeUIAElement("WindowControl", "Popup"), "popup")
+
+
+def test_unscoped_hits_are_cached_only_inside_the_watched_window(desktop):
+    automation, uia, processes = desktop
+    processes.update({10: "notepad.exe", 20: "explorer.exe"})
+    automation.add_window(window(10, "Untitled - Notepad", 1, FakeUIAElement("ButtonControl", "Save")))
+    automation.add_window(window(20, "Documents - Explorer", 2, FakeUIAElement("ButtonControl", "Back")))
+    conn = connector(uia)
+    # The foreground (Notepad) window is the one subscribed to; a hit in Explorer would never be invalidated
+    for _ in range(3):
+        assert conn.find_element({"title": "Back"}, timeout_seconds=0.0).Name == "Back"
+    assert automation.calls["Search"] == 3
+    for _ in range(3):
+        assert conn.find_element({"title": "Save"}, timeout_seconds=0.0).Name == "Save"
+    assert automation.calls["Search"] == 4
+    conn.close()
+
+
+def test_close_removes_handlers_and_stops_the_event_thread(desktop):
+    automation, uia, processes = desktop
+    processes[10] = "notepad.exe"
+    automation.add_window(window(10, "Untitled - Notepad", 1, FakeUIAElement("ButtonControl", "Save")))
+    events = UIAEventSource(uia)
+    conn = connector(uia, events)
+    assert conn.find_element({"title": "Save"}, timeout_seconds=0.0) is not None
+    thread = events._thread
+    assert thread is not None and thread.is_alive()
+    # Opened and closed windows are watched on the desktop as well as the foreground window's subtree
+    assert automation.calls["AddAutomationEventHandler"] == 2
+    conn.close()
+    assert not thread.is_alive()
+    assert automation.threads["RemoveAllEventHandlers"] == "uia-events"
+    assert automation.handlers == []
+
+
+def test_per_control_fallback_matches_apps_like_the_cached_scan(desktop, monkeypatch):
+    automation, uia, processes = desktop
+    processes.update({10: "StickyNotes.exe", 20: "explorer.exe"})
+    automation.add_window(window(10, "Sticky Notes", 1, FakeUIAElement("TextControl", "note")))
+    automation.add_window(window(20, "Notes - File Explorer", 2, FakeUIAElement("ButtonControl", "Back")))
+    conn = connector(uia)
+
+    def no_cache(roots):
+        raise RuntimeError("cache requests unavailable")
+
+    monkeypatch.setattr(conn, "_build_caches", no_cache)
+    assert [n["title"] for n in conn.iter_semantic_map(app="Notes")] == ["Notes - File Explorer", "Back"]
+    assert [n["title"] for n in conn.iter_semantic_map(app="StickyNotes")] == ["Sticky Notes", "note"]